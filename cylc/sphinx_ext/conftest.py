@@ -0,0 +1,54 @@
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+from sphinx.application import Sphinx
+from sphinx.util.docutils import docutils_namespace
+
+
+def _sphinx_build(
+    path,
+    files,
+    builder='html',
+    warning=None,
+    confoverrides=None,
+    freshenv=True,
+    events=None
+):
+    src = path / 'src'
+    src.mkdir(parents=True, exist_ok=True)
+    for filename, text in files.items():
+        (src / filename).write_text(text)
+    with docutils_namespace(), redirect_stdout(StringIO()):
+        app = Sphinx(
+            str(src),
+            str(src),
+            str(path / 'out'),
+            str(path / 'doctrees'),
+            builder,
+            status=None,
+            warning=warning,
+            freshenv=freshenv,
+            confoverrides=confoverrides
+        )
+        for event, callback in (events or {}).items():
+            app.connect(event, callback)
+        app.build()
+    return app
+
+
+@pytest.fixture
+def sphinx_build():
+    """Return a function which builds a Sphinx project.
+
+    The function is called with the directory to build in (the sources are
+    written to ``<path>/src``, the output to ``<path>/out``) and a dict of
+    {filename: text} for the source files (including ``conf.py``).
+    Further arguments set the builder, the ``warning`` stream, config
+    overrides, whether to start with a fresh environment and callbacks for
+    Sphinx events ({event: callback}).
+
+    Returns the Sphinx application.
+
+    """
+    return _sphinx_build
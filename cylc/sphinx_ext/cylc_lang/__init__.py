@@ -119,6 +119,21 @@ Sphinx domain for ``cylc`` configurations.
 
            A setting with a ``/`` in the name.
 
+     .. cylc:setting:: new-name
+        :aliases: old-name, my-conf0.cylc[bar]baz
+
+        A setting which used to be called ``old-name`` and before that
+        lived at ``my-conf0.cylc[bar]baz``.
+
+        References to the old paths, e.g. :cylc:conf:`my-conf1.cylc|old-name`
+        and :cylc:conf:`my-conf0.cylc[bar]baz` will link here.
+
+The ``conf``, ``section`` and ``setting`` directives accept an ``:aliases:``
+option, a comma separated list of old paths for the object. Absolute paths
+(i.e. starting with a configuration name) are used as-is, anything else is
+treated as an old name for the object in the same parent. Aliases of sections
+also apply to everything within them.
+
 
 Auto Documenters
 ----------------
@@ -131,6 +146,86 @@ Auto Documenters
 
       .. auto-cylc-conf:: name-of-conf python.namespace.SPEC
 
+   Items which sections inherit from their ``meta`` are not documented
+   again, they are listed in the section's "Inherited" field and references
+   to them resolve to the items they were inherited from.
+
+   .. rst:directive:option:: parse-rst
+      :type: flag
+
+      Generate an RST document for the whole spec and parse that rather
+      than building the nodes directly (slower, the output is the same).
+
+   .. rst:directive:option:: path
+
+      Only document this part of the spec, e.g:
+
+      .. code-block:: rst
+
+         .. auto-cylc-conf:: cylc.flow.cfgspec.workflow.SPEC
+            :path: [runtime][<namespace>]
+
+   .. rst:directive:option:: depth
+      :type: integer
+
+      Only document this many levels below the documented item,
+      ``0`` documents the item alone.
+
+   .. rst:directive:option:: file
+
+      Document a spec dump rather than importing the spec, this allows
+      specs from other versions of cylc-flow to be documented. The path is
+      relative to the document (or the source directory if it starts with
+      ``/``). Dumps are JSON Lines files, optionally gzip compressed,
+      written by ``cylc.sphinx_ext.cylc_lang.spec_dump.dump_spec``:
+
+      .. code-block:: python
+
+         from cylc.flow.cfgspec.workflow import SPEC
+         from cylc.sphinx_ext.cylc_lang.spec_dump import dump_spec
+         dump_spec(SPEC, 'flow.cylc.jsonl.gz')
+
+      .. code-block:: rst
+
+         .. auto-cylc-conf::
+            :file: flow.cylc.jsonl.gz
+
+      Dumps may also be provided in the directive content.
+
+   .. rst:directive:option:: compare
+
+      Compare the spec with an older version of it, either a Python
+      namespace or a spec dump (see ``file``). Settings and sections which
+      have been added or changed are marked with ``versionadded`` or
+      ``versionchanged``. Requires ``version``.
+
+   .. rst:directive:option:: version
+
+      The version the changes found by ``compare`` were made in.
+
+   .. rst:directive:option:: changelog
+      :type: flag
+
+      Rather than documenting the spec, list what has been added, changed
+      and removed since the ``compare`` spec, e.g:
+
+      .. code-block:: rst
+
+         .. auto-cylc-conf:: cylc.flow.cfgspec.workflow.SPEC
+            :compare: flow-8.0.jsonl.gz
+            :version: 8.1.0
+            :changelog:
+
+   .. rst:directive:option:: lazy-depth
+      :type: integer
+
+      For HTML output, only include items up to this depth in the page,
+      anything deeper is loaded on demand. This makes large references
+      quicker to load. Pages opened at (or navigating to) an anchor which
+      hasn't been loaded load the part of the reference it is in.
+
+   See also the ``cylc_conf_split`` configuration.
+
 .. rst:directive:: auto-cylc-type
 
    Directive for documenting Parsec types.
@@ -165,6 +260,13 @@ Auto Documenters
             cylc.flow.parsec.validate.ParsecValidator.V_TYPE_HELP
             cylc.flow.parsec.validate.CylcConfigValidator.V_TYPE_HELP
 
+   In nitpicky mode (``nitpicky = True`` or ``sphinx-build -n``),
+   references to types (e.g. the ``type`` fields of settings documented by
+   :rst:dir:`auto-cylc-conf`) which have no ``parsec:type`` definition are
+   reported once per type at the end of the read phase (rather than once per
+   reference), these warnings can be suppressed with
+   ``suppress_warnings = ['ref.parsec']``.
+
 
 Directives
 ----------
@@ -189,16 +291,73 @@ Directives
 
          This resets it to the hardcoded default which is ``flow.cylc``.
 
+
+Configuration
+-------------
+
+cylc_conf_cache_size
+   The RST generated by :rst:dir:`auto-cylc-conf` is cached in the doctree
+   directory between builds. This is the maximum size of the cache in
+   bytes, the least recently used entries are removed at the end of the
+   build to keep the cache within it (default 16 MiB).
+
+cylc_conf_export
+   If set, every object in the ``cylc`` domain will be written to this
+   file (relative to the build output directory) in
+   `JSON Lines <https://jsonlines.org/>`_ format at the end of the build.
+
+   Each line contains the ``name``, ``objtype``, ``docname``, ``anchor``
+   and ``uri`` of the object. Objects documented by
+   :rst:dir:`auto-cylc-conf` also carry the ``Path``, ``type``,
+   ``default``, ``options`` and ``Inherits`` fields where set.
+
+   .. code-block:: python
+
+      cylc_conf_export = 'cylc-conf.jsonl'
+
+cylc_conf_split
+   Dictionary of ``{directory: spec}`` where ``spec`` is the Python path
+   to a Parsec spec.
+
+   For each entry, documents are generated in the source directory which
+   document the spec across multiple pages, one per top-level section.
+   Include ``<directory>/index`` in a toctree to use them.
+
+   The pages are only re-written when their content changes, which along
+   with splitting the spec up allows parallel and incremental builds to
+   do less work. The generated files are listed in a ``.cylc-conf-split``
+   manifest in the directory, pages for items which are removed from the
+   spec are deleted.
+
+   .. code-block:: python
+
+      cylc_conf_split = {
+          'reference/config/workflow': 'cylc.flow.cfgspec.workflow.SPEC'
+      }
+
 '''
 
+from cylc.sphinx_ext import register_static
 from cylc.sphinx_ext.cylc_lang.autodocumenters import (
     CylcAutoDirective,
-    CylcAutoTypeDirective
+    CylcAutoTypeDirective,
+    evict_rst_cache,
+    generate_split_pages,
+    get_outdated_sources,
+    merge_sources,
+    purge_sources
 )
 from cylc.sphinx_ext.cylc_lang.domains import (
     ParsecDomain,
     CylcDomain,
-    CylcScopeDirective
+    CylcScopeDirective,
+    missing_parsec_reference
+)
+from cylc.sphinx_ext.cylc_lang.export import export_conf
+from cylc.sphinx_ext.cylc_lang.lazy import (
+    depart_html as lazy_depart_html,
+    lazy_subtree,
+    visit_html as lazy_visit_html
 )
 from cylc.sphinx_ext.cylc_lang.lexers import CylcLexer, CylcGraphLexer
 
@@ -223,4 +382,16 @@ def setup(app):
     app.add_directive('auto-cylc-conf', CylcAutoDirective)
     app.add_directive('auto-cylc-type', CylcAutoTypeDirective)
     app.add_directive('cylc-scope', CylcScopeDirective)
+    app.add_node(lazy_subtree, html=(lazy_visit_html, lazy_depart_html))
+    app.add_config_value('cylc_conf_cache_size', 16 * 1024 ** 2, '')
+    app.add_config_value('cylc_conf_export', None, 'env')
+    app.add_config_value('cylc_conf_split', {}, 'env')
+    app.connect('builder-inited', generate_split_pages)
+    app.connect('env-get-outdated', get_outdated_sources)
+    app.connect('env-purge-doc', purge_sources)
+    app.connect('env-merge-info', merge_sources)
+    app.connect('missing-reference', missing_parsec_reference)
+    app.connect('build-finished', export_conf)
+    app.connect('build-finished', evict_rst_cache)
+    register_static(app, __name__)
     return {'version': __version__, 'parallel_read_safe': True}
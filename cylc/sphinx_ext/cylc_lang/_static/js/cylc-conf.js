@@ -0,0 +1,109 @@
+/* ----------------------------------------------------------------------------
+ * THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+ * Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ * ------------------------------------------------------------------------- */
+
+/* Load the lazy subtrees of auto-cylc-conf references (see lazy.py).
+ *
+ * Subtrees are loaded when their button is pressed or when the page is
+ * opened at (or navigates to) an anchor within them.
+ */
+
+class CylcLazySubtree {
+    constructor(div) {
+        this.div = div;
+        this.prefix = div.getAttribute('data-prefix');
+        this.loaded = null;
+        var button = div.querySelector('.cylc-lazy-expand');
+        if (button) {
+            button.addEventListener('click', () => this.load());
+        }
+    }
+
+    /* Fetch the subtree and insert it into the page.
+     *
+     * Returns a promise which resolves once the subtree is in the page.
+     */
+    load() {
+        if (!this.loaded) {
+            this.div.classList.add('cylc-lazy-loading');
+            this.loaded = fetch(this.div.getAttribute('data-src'))
+                .then((response) => {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.text();
+                })
+                .then((html) => {
+                    this.div.innerHTML = html;
+                    this.div.classList.remove('cylc-lazy-loading');
+                    this.div.classList.add('cylc-lazy-loaded');
+                })
+                .catch((error) => {
+                    this.div.classList.remove('cylc-lazy-loading');
+                    this.loaded = null;
+                    throw error;
+                });
+        }
+        return this.loaded;
+    }
+}
+
+var cylc_lazy_subtrees = [];
+
+/* Return the id of the anchor in the URL (or null). */
+function cylc_lazy_target() {
+    if (!window.location.hash) {
+        return null;
+    }
+    return decodeURIComponent(window.location.hash.substring(1));
+}
+
+/* If the URL points at an anchor in an unloaded subtree, load it. */
+function cylc_lazy_expand_target() {
+    var target = cylc_lazy_target();
+    if (!target || document.getElementById(target)) {
+        return;
+    }
+    // the subtree with the longest matching prefix contains the target
+    var best = null;
+    for (let subtree of cylc_lazy_subtrees) {
+        if (
+            target.startsWith(subtree.prefix)
+            && (!best || subtree.prefix.length > best.prefix.length)
+        ) {
+            best = subtree;
+        }
+    }
+    if (best) {
+        best.load().then(() => {
+            var element = document.getElementById(target);
+            if (element) {
+                element.scrollIntoView();
+            }
+        }).catch((error) => console.error(error));
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    for (let div of document.querySelectorAll('.cylc-lazy')) {
+        cylc_lazy_subtrees.push(new CylcLazySubtree(div));
+    }
+    if (cylc_lazy_subtrees.length) {
+        cylc_lazy_expand_target();
+        window.addEventListener('hashchange', cylc_lazy_expand_target);
+    }
+});
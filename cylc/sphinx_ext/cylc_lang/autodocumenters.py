@@ -1,24 +1,118 @@
+from hashlib import sha256
 from importlib import import_module
 import json
+import os
+from pathlib import Path
+import re
+import sys
 from textwrap import (
     dedent,
     indent
 )
 
-from docutils.parsers.rst import Directive
+from docutils.parsers.rst import Directive, directives
 from docutils.statemachine import StringList
 
 from sphinx import addnodes
+from sphinx.util import logging
 
-from cylc.flow.parsec.config import ConfigNode
-from cylc.flow.parsec.validate import ParsecValidator, CylcConfigValidator
+from cylc.sphinx_ext import __version__
+from cylc.sphinx_ext.cylc_lang.domains import (
+    CylcDomain,
+    CylcScopeDirective,
+    detokenise,
+    tokenise
+)
+from cylc.sphinx_ext.cylc_lang.lazy import lazy_subtree
+from cylc.sphinx_ext.cylc_lang.spec_diff import (
+    ADDED,
+    CHANGED,
+    REMOVED,
+    diff_specs,
+    spec_hashes
+)
+from cylc.sphinx_ext.cylc_lang.spec_dump import SpecDump
+
+
+LOG = logging.getLogger(__name__)
+
+# generated RST for auto-cylc-conf {fingerprint: [(level, lines), ...]}
+RST_CACHE = {}
+
+# RST_CACHE is persisted to this directory within the doctree directory
+RST_CACHE_DIR = 'auto-cylc-conf'
+
+# namespaces resolved by import_obj
+IMPORT_CACHE = {
+    # {namespace: (module, obj)}
+    'resolved': {},
+    # names which could not be imported as modules (with this sys.path)
+    'not modules': set(),
+    'sys.path': [],
+}
+
+# NOTE: cylc.flow is imported within the functions which need it, this
+# avoids the import cost (and dependency) for projects which only use the
+# lexers or the domain.
+
+
+class TypeRegistry:
+    """Build-wide registry of Parsec types (i.e. validators).
+
+    Populated once per process from the ``V_TYPE_HELP`` dictionaries of the
+    cylc-flow validators. It is shared by ``auto-cylc-conf``, which needs the
+    type names of settings, and ``auto-cylc-type``, which documents the types,
+    the generated RST for each type is cached.
+
+    """
+
+    # where to find the types, earlier sources take precedence
+    SOURCES = (
+        'cylc.flow.parsec.validate.ParsecValidator.V_TYPE_HELP',
+        'cylc.flow.parsec.validate.CylcConfigValidator.V_TYPE_HELP'
+    )
+
+    def __init__(self):
+        # {vdr: (name, help, examples, references)}
+        self._types = None
+        # {type: [line, ...]}
+        self._rst = {}
+
+    @property
+    def types(self):
+        if self._types is None:
+            types = {}
+            for namespace in reversed(self.SOURCES):
+                types.update(get_obj_from_module(namespace))
+            self._types = types
+        return self._types
+
+    def info(self, vdr):
+        """Return the ``V_TYPE_HELP`` entry for a validator."""
+        return self.types[vdr]
+
+    def rst(self, typ):
+        """Return the RST documenting a type (see ``doc_type``)."""
+        key = json.dumps(typ, sort_keys=True, default=str)
+        try:
+            return self._rst[key]
+        except KeyError:
+            ret = self._rst[key] = doc_type(typ)
+            return ret
+
+
+TYPE_REGISTRY = TypeRegistry()
 
 
 def get_vdr_info(vdr):
-    try:
-        return ParsecValidator.V_TYPE_HELP[vdr]
-    except KeyError:
-        return CylcConfigValidator.V_TYPE_HELP[vdr]
+    """Return the ``V_TYPE_HELP`` entry for a validator.
+
+    Examples:
+        >>> get_vdr_info('V_STRING')[0]
+        'string'
+
+    """
+    return TYPE_REGISTRY.info(vdr)
 
 
 def get_obj_from_module(namespace):
@@ -33,17 +127,77 @@ def get_obj_from_module(namespace):
         <function join at ...>
 
     """
+    return import_obj(namespace)[1]
+
+
+def import_obj(namespace):
+    """Import something from a Python module.
+
+    Resolved namespaces are cached along with the names which are not
+    modules, see ``IMPORT_CACHE``.
+
+    Returns:
+        tuple - (module, obj)
+
+    Raises:
+        ImportError:
+            If the namespace cannot be resolved.
+
+    Examples:
+        >>> import_obj('os.path.join')  # doctest: +ELLIPSIS
+        (<module '...path' ...>, <function join at ...>)
+        >>> import_obj('os.nope')  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ImportError: Could not import "os.nope": module "os" has no attr...
+        >>> import_obj('nope.nope')
+        Traceback (most recent call last):
+        ImportError: Could not import "nope.nope": no module found
+
+    """
+    try:
+        module, obj = IMPORT_CACHE['resolved'][namespace]
+    except KeyError:
+        pass
+    else:
+        if sys.modules.get(module.__name__) is module:
+            return module, obj
+        # the module has been removed or reloaded
+        del IMPORT_CACHE['resolved'][namespace]
+
+    if IMPORT_CACHE['sys.path'] != sys.path:
+        # modules may have become importable
+        IMPORT_CACHE['not modules'].clear()
+        IMPORT_CACHE['sys.path'] = list(sys.path)
+
     head, tail = namespace.split('.'), []
     while head:
+        name = '.'.join(head)
+        if name in IMPORT_CACHE['not modules']:
+            tail.insert(0, head.pop())
+            continue
         try:
-            module = import_module('.'.join(head))
-        except ModuleNotFoundError:
+            module = import_module(name)
+        except ModuleNotFoundError as exc:
+            if exc.name != name and not name.startswith(f'{exc.name}.'):
+                # the module exists but something it imports does not
+                raise ImportError(
+                    f'Could not import "{namespace}": {exc}'
+                ) from None
+            IMPORT_CACHE['not modules'].add(name)
             tail.insert(0, head.pop())
         else:
-            ret = module
+            obj = module
             for item in tail:
-                ret = getattr(ret, item)
-            return ret
+                try:
+                    obj = getattr(obj, item)
+                except AttributeError:
+                    raise ImportError(
+                        f'Could not import "{namespace}": module "{name}"'
+                        f' has no attribute "{item}"'
+                    ) from None
+            IMPORT_CACHE['resolved'][namespace] = (module, obj)
+            return module, obj
+    raise ImportError(f'Could not import "{namespace}": no module found')
 
 
 def directive(
@@ -136,26 +290,84 @@ def repr_value(value):
     return str(value)
 
 
+def get_setting_fields(item):
+    """Return the fields documented for a setting as plain values.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> get_setting_fields(  # doctest: +NORMALIZE_WHITESPACE
+        ...     ConfigNode('a', default=[1, 2, 3], options=['x', 'y']))
+        {'Path': 'a',
+         'type': 'string',
+         'default': '1 .. 3',
+         'options': ['x', 'y']}
+
+    """
+    fields = {'Path': repr(item)}
+    if item.vdr:
+        # items read from spec dumps carry the type name with them
+        fields['type'] = (
+            getattr(item, 'type_name', None) or get_vdr_info(item.vdr)[0]
+        )
+    if item.default not in (None, '', item.UNSET):
+        fields['default'] = repr_value(item.default)
+    if item.options:
+        fields['options'] = list(item.options)
+    return fields
+
+
+def get_section_fields(item):
+    """Return the fields documented for a section as plain values.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> get_section_fields(ConfigNode('a'))
+        {'Path': 'a'}
+
+    """
+    fields = {'Path': repr(item)}
+    if item.meta:
+        fields['Inherits'] = repr(item.meta)
+    return fields
+
+
+def iter_spec_fields(spec):
+    """Yield (path, fields) for each section and setting in a spec.
+
+    This skips the same "too meta" items as ``doc_spec``.
+
+    """
+    for level, item in spec.walk():
+        if level == 0 and item.is_root():
+            continue
+        if item.is_leaf():
+            parents = list(item.parents())
+            if item.meta or (parents and parents[0].meta is True):
+                continue
+            yield repr(item), get_setting_fields(item)
+        elif item.meta is not True:
+            yield repr(item), get_section_fields(item)
+
+
 def doc_setting(item):
-    fields = {'Path': f'``{repr(item)}``'}
     parents = list(item.parents())
     if parents and parents[0].meta is True:
-        # too meta for us
-        # this is a setting in a section in a meta section
-        # TODO: this is a limitation which prevents us from documenting
-        # deeply nested stuff in meta sections
+        # this is a setting in a section in a meta section, it is documented
+        # with the meta section, sections which inherit it only link to it
+        # by alias (it is not registered in its own right under them)
         return []
-    if item.vdr:
-        vdr_info = get_vdr_info(item.vdr)
-        fields['type'] = f':parsec:type:`{vdr_info[0]}`'
-    if item.default not in (None, '', ConfigNode.UNSET):
-        fields['default'] = f'``{repr_value(item.default)}``'
-    if item.options:
+    info = get_setting_fields(item)
+    fields = {'Path': f'``{info["Path"]}``'}
+    if 'type' in info:
+        fields['type'] = f':parsec:type:`{info["type"]}`'
+    if 'default' in info:
+        fields['default'] = f'``{info["default"]}``'
+    if 'options' in info:
         fields['options'] = ', '.join(
             f'``{option}``'
             if option != ''
             else '`` ``'  # prevents ```` which is an RST error
-            for option in item.options
+            for option in info['options']
         )
 
     return directive(
@@ -167,14 +379,20 @@ def doc_setting(item):
     )
 
 
-def doc_section(item):
-    fields = {'Path': f'``{repr(item)}``'}
+def doc_section(item, inherited=None):
     if item.meta is True:
         # too meta for us
         # this is section inside a meta section
         return []
-    if item.meta:
-        fields['Inherits'] = f':cylc:conf:`{repr(item.meta)}`'
+    info = get_section_fields(item)
+    fields = {'Path': f'``{info["Path"]}``'}
+    if 'Inherits' in info:
+        fields['Inherits'] = f':cylc:conf:`{info["Inherits"]}`'
+    if inherited:
+        # relative references, these resolve to the inherited definitions
+        fields['Inherited'] = ', '.join(
+            f':cylc:conf:`{name}`' for name in inherited
+        )
     return directive(
         'cylc:section',
         [item.display_name],
@@ -184,6 +402,102 @@ def doc_section(item):
     )
 
 
+def item_tokens(item):
+    """Return the tokens for the path of an item.
+
+    Unlike ``tokenise(repr(item))`` this works at any depth.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> with ConfigNode('a') as spec:
+        ...     with ConfigNode('b'):
+        ...         _ = ConfigNode('<c>')
+        >>> item_tokens(spec.get('b', 'c'))
+        {'conf': 'a', 'section': ('b',), 'setting': '<c>', 'value': None}
+
+    """
+    names = [parent.display_name for parent in item.parents()][::-1]
+    names.append(item.display_name)
+    tokens = {
+        'conf': names[0],
+        'section': tuple(names[1:]) or None,
+        'setting': None,
+        'value': None
+    }
+    if item.is_leaf() and len(names) > 1:
+        tokens['setting'] = names[-1]
+        tokens['section'] = tuple(names[1:-1]) or None
+    return tokens
+
+
+def child_tokens(tokens, item):
+    """Return the tokens of an item within the section ``tokens``."""
+    ret = dict(tokens)
+    if item.is_leaf():
+        ret['setting'] = item.display_name
+    else:
+        ret['section'] = (tokens['section'] or ()) + (item.display_name,)
+    return ret
+
+
+def get_inheritance(spec):
+    """Yield the items in a spec which have been inherited from a meta.
+
+    Sections with a ``meta`` inherit copies of the items in it. This works
+    out which item each copy came from in a single walk over the spec.
+
+    Note the copies are copied along with their original parents, so
+    ``repr`` gives the path of the original for inherited items.
+
+    Yields:
+        tuple - (tokens, base_tokens, item) where ``tokens`` is the path of
+        the inherited item and ``base_tokens`` the path of the item it was
+        inherited from.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> with ConfigNode('a') as spec:
+        ...     with ConfigNode('<b>') as template:
+        ...         with ConfigNode('c'):
+        ...             _ = ConfigNode('d')
+        ...     with ConfigNode('e', meta=template):
+        ...         _ = ConfigNode('f')
+        >>> for tokens, base, _ in get_inheritance(spec):
+        ...     print(detokenise(tokens), '<-', detokenise(base))
+        a[e][c] <- a[<b>][c]
+        a[e][c]d <- a[<b>][c]d
+
+    """
+    # for each item on the path to the current one:
+    # (tokens, tokens its children inherit from, whether it is inherited)
+    stack = []
+    for level, item in spec.walk():
+        del stack[level:]
+        if stack:
+            parent_tokens, parent_base, parent_inherited = stack[-1]
+            tokens = child_tokens(parent_tokens, item)
+        else:
+            parent_base, parent_inherited = None, False
+            tokens = item_tokens(item)
+        inherited = (
+            parent_base is not None
+            and (item.meta is True or parent_inherited)
+        )
+        if inherited:
+            base = child_tokens(parent_base, item)
+            yield tokens, base, item
+        elif item.meta:
+            # the section has a meta, its children may be inherited from it
+            if isinstance(item.meta, str):
+                # spec dumps record the meta as a path
+                base = tokenise(item.meta)
+            else:
+                base = item_tokens(item.meta)
+        else:
+            base = None
+        stack.append((tokens, base, inherited))
+
+
 def doc_conf(item):
     return directive(
         'cylc:conf',
@@ -194,33 +508,409 @@ def doc_conf(item):
     )
 
 
-def doc_spec(spec):
+def doc_spec_directives(spec, depth=None, versions=None):
+    """Return the directives which document a spec.
+
+    Items which are "too meta" to document are skipped along with
+    everything within them.
+
+    Args:
+        spec (ConfigNode):
+            The spec to document, this may be a section or setting within
+            a larger spec.
+        depth (int):
+            Only document items up to this many levels below ``spec``.
+        versions (dict):
+            Version annotations to add to items, ``{path: (directive,
+            version)}`` e.g. ``{'a[b]c': ('versionadded', '8.1.0')}``.
+
+    Returns:
+        list - [(level, lines), ...] where ``lines`` is the RST for a
+        single directive and ``level`` is its depth below ``spec``.
+
+    """
+    # {section: [names of the items it inherits]}
+    inherited = {}
+    for tokens, _, item in get_inheritance(spec):
+        if item.meta is True:
+            # inherited directly from the meta of the parent section
+            parent = detokenise(dict(tokens, setting=None, section=(
+                tokens['section'] if item.is_leaf()
+                else tokens['section'][:-1]
+            )))
+            inherited.setdefault(parent, []).append(
+                item.display_name if item.is_leaf()
+                else f'[{item.display_name}]'
+            )
+
     ret = []
+    skip = depth
     for level, item in spec.walk():
-        if level == 0:
-            ret.extend(
-                doc_conf(item)
-            )
+        if skip is not None:
+            if level > skip:
+                continue
+            skip = depth
+        if level == 0 and item.is_root():
+            lines = doc_conf(item)
         elif item.is_leaf() and not item.meta:
             # setting
-            ret.extend([
-                indent(line, '   ' * level)
-                for line in doc_setting(item)
-            ])
+            lines = doc_setting(item)
         elif not item.is_leaf():
             # section
-            ret.extend([
-                indent(line, '   ' * level)
-                for line in doc_section(item)
-            ])
+            lines = doc_section(item, inherited.get(repr(item)))
+        else:
+            continue
+        if lines:
+            if versions and repr(item) in versions:
+                name, version = versions[repr(item)]
+                lines = lines + [
+                    f'   {line}' if line else line
+                    for line in directive(name, [version])
+                ]
+            ret.append((level, lines))
+        else:
+            skip = level
+    return ret
+
+
+def doc_changes(changes, version):
+    """Return RST listing changes between two versions of a spec.
+
+    Args:
+        changes (list):
+            The output of ``spec_diff.diff_specs``.
+        version (str):
+            The version the changes were made in.
+
+    Examples:
+        >>> for line in doc_changes([('added', 'a|b')], '8.1.0'):
+        ...     print(line)
+        .. rubric:: Added in 8.1.0
+        <BLANKLINE>
+        * :cylc:conf:`a|b`
+        <BLANKLINE>
+
+    """
+    ret = []
+    for change in (ADDED, CHANGED, REMOVED):
+        paths = [path for change_, path in changes if change_ == change]
+        if not paths:
+            continue
+        ret.extend([f'.. rubric:: {change.capitalize()} in {version}', ''])
+        ret.extend(
+            # removed items can't be referenced
+            f'* ``{path}``' if change == REMOVED else f'* :cylc:conf:`{path}`'
+            for path in paths
+        )
+        ret.append('')
+    return ret
+
+
+def get_subtree(spec, path):
+    """Return the item at the given path within a spec.
+
+    Args:
+        spec (ConfigNode):
+            The root of the spec.
+        path (str):
+            A path relative to the root, e.g. ``[runtime][<namespace>]``.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> with ConfigNode('a') as spec:
+        ...     with ConfigNode('<name>'):
+        ...         _ = ConfigNode('c')
+        >>> get_subtree(spec, '[<name>]c')
+        a[<name>]c
+        >>> get_subtree(spec, '[<name>]d')
+        Traceback (most recent call last):
+        KeyError: 'd'
+
+    """
+    tokens = tokenise(path)
+    names = list(tokens['section'] or ())
+    if tokens['setting']:
+        names.append(tokens['setting'])
+    return spec.get(*names)
+
+
+def page_name(item):
+    """Return a file name for documenting an item in.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> page_name(ConfigNode('<task name>'))
+        'task-name'
+
+    """
+    return re.sub(r'[^\w]+', '-', item.display_name.lower()).strip('-')
+
+
+def directives_to_rst(spec_directives):
+    """Indent the output of doc_spec_directives to form one document."""
+    return [
+        indent(line, '   ' * level)
+        for level, lines in spec_directives
+        for line in lines
+    ]
+
+
+def doc_spec(spec):
+    return directives_to_rst(doc_spec_directives(spec))
+
+
+def spec_fingerprint(spec):
+    """Return a hash of everything in a spec which doc_spec uses.
+
+    This also includes the versions of this project and of cylc-flow as
+    these determine how the spec is documented.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> with ConfigNode('a') as spec:
+        ...     _ = ConfigNode('b', desc='foo')
+        >>> key = spec_fingerprint(spec)
+        >>> key == spec_fingerprint(spec)
+        True
+        >>> spec['b'].desc = 'bar'
+        >>> key == spec_fingerprint(spec)
+        False
+
+    """
+    if isinstance(spec, SpecDump):
+        # hash the file rather than walking it
+        return sha256(
+            f'{__version__} {spec.fingerprint()}'.encode()
+        ).hexdigest()
+    from cylc.flow import __version__ as cylc_version
+    hasher = sha256(f'{__version__} {cylc_version} {spec!r}'.encode())
+    for level, item in spec.walk():
+        meta = item.meta
+        if meta and meta is not True:
+            meta = repr(meta)
+        hasher.update(repr((
+            level,
+            item.is_leaf(),
+            item.name,
+            item.display_name,
+            item.desc,
+            item.default,
+            item.options,
+            item.vdr,
+            meta
+        )).encode())
+    return hasher.hexdigest()
+
+
+def get_spec_directives(spec, cache_dir=None, depth=None, versions=None):
+    """Return doc_spec_directives(spec), using cached output if possible.
+
+    Args:
+        spec (ConfigNode):
+            The spec to document.
+        cache_dir (Path):
+            Directory to cache generated RST in between builds.
+        depth (int):
+            See ``doc_spec_directives``.
+        versions (dict):
+            See ``doc_spec_directives``.
+
+    """
+    key = spec_fingerprint(spec)
+    if depth is not None:
+        key += f'-{depth}'
+    if versions:
+        key += '-' + sha256(
+            repr(sorted(versions.items())).encode()
+        ).hexdigest()[:16]
+    if key in RST_CACHE:
+        LOG.info(f'auto-cylc-conf: using cached RST for {spec.name}')
+        return RST_CACHE[key]
+
+    cache_file = None
+    if cache_dir:
+        cache_file = Path(cache_dir, f'{key}.json')
+        try:
+            with open(cache_file, 'r') as cache:
+                RST_CACHE[key] = [
+                    (level, lines)
+                    for level, lines in json.load(cache)
+                ]
+            # mark the entry as recently used
+            os.utime(cache_file)
+        except (OSError, ValueError):
+            pass
+        else:
+            LOG.info(
+                f'auto-cylc-conf: using cached RST for {spec.name}'
+                f' ({cache_file})'
+            )
+            return RST_CACHE[key]
+
+    RST_CACHE[key] = doc_spec_directives(spec, depth, versions)
+    if cache_file:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w') as cache:
+            json.dump(RST_CACHE[key], cache)
+    return RST_CACHE[key]
+
+
+def evict_rst_cache(app, exception):
+    """Trim the on-disk RST cache at the end of the build.
+
+    The least recently used entries are removed until the cache is within
+    ``cylc_conf_cache_size`` bytes.
+
+    Returns:
+        int - The number of entries removed.
+
+    """
+    if exception:
+        return 0
+    try:
+        entries = [
+            (path.stat(), path)
+            for path in Path(app.doctreedir, RST_CACHE_DIR).iterdir()
+            if path.is_file()
+        ]
+    except FileNotFoundError:
+        return 0
+    size = sum(stat.st_size for stat, _ in entries)
+    removed = 0
+    for stat, path in sorted(entries, key=lambda x: x[0].st_mtime_ns):
+        if size <= app.config.cylc_conf_cache_size:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        size -= stat.st_size
+        removed += 1
+    return removed
+
+
+def obj_fingerprint(obj):
+    """Return a hash of an object documented by an auto-documenter.
+
+    Examples:
+        >>> obj_fingerprint({'a': 1}) == obj_fingerprint({'a': 1})
+        True
+        >>> obj_fingerprint({'a': 1}) == obj_fingerprint({'a': 2})
+        False
+
+    """
+    if hasattr(obj, 'walk'):
+        return spec_fingerprint(obj)
+    return sha256(f'{__version__} {obj!r}'.encode()).hexdigest()
+
+
+def note_source(env, namespace, module, obj, path=None):
+    """Record the module an auto-documented object was imported from.
+
+    The module file is stored along with its modification time and a
+    fingerprint of the object, see ``get_outdated_sources``.
+
+    """
+    try:
+        filename = Path(module.__file__)
+        mtime = filename.stat().st_mtime_ns
+    except (AttributeError, TypeError, OSError):
+        # built-in or namespace module, nothing to track
+        return
+    if not hasattr(env, 'cylc_autodoc_sources'):
+        env.cylc_autodoc_sources = {}
+    env.cylc_autodoc_sources.setdefault(env.docname, {})[
+        (namespace, path)
+    ] = (str(filename), mtime, obj_fingerprint(obj))
+
+
+def purge_sources(app, env, docname):
+    """Forget the sources of a document (env-purge-doc handler)."""
+    getattr(env, 'cylc_autodoc_sources', {}).pop(docname, None)
+
+
+def merge_sources(app, env, docnames, other):
+    """Merge sources from a parallel read (env-merge-info handler)."""
+    if not hasattr(env, 'cylc_autodoc_sources'):
+        env.cylc_autodoc_sources = {}
+    env.cylc_autodoc_sources.update(
+        (docname, sources)
+        for docname, sources in getattr(
+            other, 'cylc_autodoc_sources', {}
+        ).items()
+        if docname in docnames
+    )
+
+
+def get_outdated_sources(app, env, added, changed, removed):
+    """Return documents whose auto-documented objects have changed.
+
+    (env-get-outdated handler)
+
+    Module files are not registered with ``env.note_dependency`` as that
+    would re-read a document whenever its module is touched (e.g. every
+    time cylc-flow is re-installed). Instead the object is only re-imported
+    if the module's modification time has changed and the document is only
+    re-read if the fingerprint of the object differs.
+
+    """
+    ret = []
+    for docname, sources in getattr(env, 'cylc_autodoc_sources', {}).items():
+        if docname in changed or docname in removed:
+            continue
+        for key, (filename, mtime, fingerprint) in list(sources.items()):
+            namespace, path = key
+            try:
+                new_mtime = Path(filename).stat().st_mtime_ns
+                if new_mtime == mtime:
+                    continue
+                obj = get_obj_from_module(namespace)
+                if path:
+                    obj = get_subtree(obj, path)
+                new_fingerprint = obj_fingerprint(obj)
+            except Exception:
+                # the object cannot be imported, re-read to report this
+                new_fingerprint = None
+            if new_fingerprint != fingerprint:
+                LOG.info(f'[auto-cylc] {namespace} has changed')
+                ret.append(docname)
+                break
+            sources[key] = (filename, new_mtime, fingerprint)
     return ret
 
 
 class CylcAutoDirective(Directive):
     """Auto-documenter for Parsec configuration schemas.
 
-    This implementation translates a Parsec ``SPEC`` into an RST document then
-    parses that document.
+    The Parsec ``SPEC`` is translated into a list of Cylc domain directives
+    (one per configuration, section and setting) which are run directly
+    (see ``build_nodes``). Only the content of each directive (the fields
+    and description) goes through the RST parser.
+
+    The Cylc domain relies on nesting to determine structure, so the nodes
+    of each directive are placed in the content node of its parent and the
+    ``ref_context`` of each directive is set for its children while they
+    run, as it would be if the directives were nested in RST. This avoids
+    parsing a generated document as a whole, where every line gets
+    re-processed at each level of indentation it sits in.
+
+    The ``parse-rst`` option parses the directives as one RST document
+    instead, this produces the same doctree.
+
+    The ``path`` option documents only part of the spec. The cylc scope is
+    set to the parent of that part while it is documented.
+
+    The ``file`` option documents a spec dump (see ``spec_dump``) rather
+    than importing the spec, spec dumps may also be provided in the
+    directive content.
+
+    The ``compare`` option compares the spec with an older version of it
+    (see ``spec_diff``) and marks up the items which have been added or
+    changed. With the ``changelog`` option a list of the changes is
+    generated instead (``changelog`` cannot be used without ``compare``).
+
+    The ``lazy-depth`` option places everything below that depth in
+    ``lazy_subtree`` nodes which HTML pages load on demand (see ``lazy``).
 
     Why not extend ``sphinx.ext.autodoc.Documenter``:
 
@@ -229,41 +919,308 @@ class CylcAutoDirective(Directive):
       objects.
     * Might be more of an option when we go Python API.
 
-    Why construct an RST document rather doing it programatically:
-
-    * The Cylc Domain relies on nesting to determine structure.
-    * Once you run a directive it's already too late to add children.
-    * You can bodge it by placing child directives in block quote nodes and
-      by hacking the ``ref_context`` passed to the child at run-time
-      (at present the Rose equivalent is implement this way)
-      but this way feels less hacky as Sphinx is parsing the document
-      hierarchically, the way it was intended to be parsed.
-
     """
 
     has_content = True
-    option_spec = {}
-    required_arguments = 1
-    optional_arguments = 1
+    option_spec = {
+        'parse-rst': directives.flag,
+        'path': directives.unchanged,
+        'depth': directives.nonnegative_int,
+        'file': directives.path,
+        'compare': directives.unchanged_required,
+        'version': directives.unchanged_required,
+        'changelog': directives.flag,
+        'lazy-depth': directives.nonnegative_int
+    }
+    required_arguments = 0
+    optional_arguments = 2
+
+    def load_spec(self, namespace=None, filename=None):
+        """Import a spec or read it from a dump.
+
+        Returns the spec or the part of it selected by the ``path`` option.
+
+        """
+        env = self.state.document.settings.env
+        module = None
+        if filename:
+            rel_path, path = env.relfn2path(filename)
+            env.note_dependency(rel_path)
+            spec = SpecDump(path)
+        elif namespace:
+            module, spec = import_obj(namespace)
+        else:
+            spec = SpecDump(lines=list(self.content))
+
+        if 'path' in self.options:
+            spec = get_subtree(spec, self.options['path'])
+
+        if module:
+            note_source(env, namespace, module, spec, self.options.get('path'))
+        return spec
+
+    def get_versions(self, spec):
+        """Compare the spec to the one given by the ``compare`` option.
+
+        Returns:
+            tuple - (changes, versions) see ``spec_diff.diff_specs``
+            and ``doc_spec_directives``.
+
+        """
+        if 'version' not in self.options:
+            raise self.error('The "compare" option requires a "version"')
+        env = self.state.document.settings.env
+        version = self.options['version']
+        source = self.options['compare'].strip()
+        is_file = Path(env.relfn2path(source)[1]).is_file()
+        try:
+            old_hashes = spec_hashes(self.load_spec(
+                None if is_file else source,
+                source if is_file else None
+            ))
+        except KeyError:
+            # the documented part of the spec is new
+            old_hashes = {}
+        changes = diff_specs(old_hashes, spec_hashes(spec))
+        versions = {
+            path: (f'version{change}', version)
+            for change, path in changes
+            if change in (ADDED, CHANGED)
+        }
+        return changes, versions
 
     def run(self):
+        env = self.state.document.settings.env
+        namespace = None
         if len(self.arguments) == 1:
-            spec = get_obj_from_module(self.arguments[0].strip())
-        else:
-            spec = json.loads('\n'.join(self.content))
+            namespace = self.arguments[0].strip()
+        if 'changelog' in self.options and 'compare' not in self.options:
+            raise self.error('The "changelog" option requires "compare"')
+        versions = None
+        try:
+            spec = self.load_spec(namespace, self.options.get('file'))
+            if 'compare' in self.options:
+                changes, versions = self.get_versions(spec)
+        except ImportError as exc:
+            LOG.warning(
+                f'auto-cylc-conf: {exc}',
+                location=(env.docname, self.lineno)
+            )
+            return []
 
-        content = doc_spec(spec)
+        if versions is not None:
+            if 'changelog' in self.options:
+                node = addnodes.desc_content()
+                self.state.nested_parse(
+                    StringList(doc_changes(changes, self.options['version'])),
+                    self.content_offset,
+                    node
+                )
+                return [node]
 
-        # parse the RST text
-        node = addnodes.desc_content()
-        self.state.nested_parse(
-            StringList(content),
-            self.content_offset,
-            node
+        spec_directives = get_spec_directives(
+            spec,
+            Path(env.doctreedir, RST_CACHE_DIR),
+            self.options.get('depth'),
+            versions
         )
 
+        # references to inherited items resolve to the original definitions
+        domain = env.domains['cylc']
+        for tokens, base, _ in get_inheritance(spec):
+            domain.set_alias(tokens, base, env.docname)
+
+        if env.config.cylc_conf_export:
+            # record the fields for the machine-readable export
+            env.domains['cylc'].set_fields(iter_spec_fields(spec), env.docname)
+
+        # set the scope to the parent of the item we are documenting
+        ref_context = env.ref_context
+        scope = {
+            key: value
+            for key, value in ref_context.items()
+            if isinstance(key, tuple) and key[0] == 'cylc'
+        }
+        CylcScopeDirective.wipe_scope(ref_context)
+        if not spec.is_root():
+            parent = next(spec.parents())
+            for key in CylcScopeDirective.get_ref_context(repr(parent)):
+                ref_context[key] = None
+
+        node = addnodes.desc_content()
+        try:
+            if 'parse-rst' in self.options:
+                # parse the RST text
+                self.state.nested_parse(
+                    StringList(directives_to_rst(spec_directives)),
+                    self.content_offset,
+                    node
+                )
+            else:
+                node += self.build_nodes(
+                    spec_directives,
+                    self.options.get('lazy-depth')
+                )
+        finally:
+            # restore the scope
+            CylcScopeDirective.wipe_scope(ref_context)
+            ref_context.update(scope)
+
         return [node]
 
+    def build_nodes(self, spec_directives, lazy_depth=None):
+        """Run the directives, nesting them according to their level.
+
+        Args:
+            spec_directives (list):
+                The output of ``doc_spec_directives``.
+            lazy_depth (int):
+                Place the children of directives at this level in
+                ``lazy_subtree`` nodes.
+
+        Returns:
+            list - The top-level nodes.
+
+        """
+        ref_context = self.state.document.settings.env.ref_context
+        ret = []
+        # the open directives [(level, ref_context_key, content_node)]
+        stack = []
+        lazies = []
+        for level, lines in spec_directives:
+            # close any directives which this one is not inside of
+            while stack and stack[-1][0] >= level:
+                ref_context.pop(stack.pop()[1])
+
+            # lines[0] is the directive header e.g. ".. cylc:setting:: x"
+            name, argument = lines[0][3:].split(':: ', 1)
+            directive_class = CylcDomain.directives[name.split(':', 1)[1]]
+            directive_instance = directive_class(
+                name,
+                [argument],
+                {},
+                # the rest is the directive content (indented by 3)
+                StringList([line[3:] for line in lines[1:]]),
+                self.lineno,
+                self.content_offset,
+                '',
+                self.state,
+                self.state_machine
+            )
+            nodes = directive_instance.run()
+            if stack:
+                stack[-1][2].extend(nodes)
+            else:
+                ret.extend(nodes)
+
+            # open this directive's scope for its children
+            key = directive_instance.ref_context_key
+            ref_context[key] = id(directive_instance)
+            # nodes = [index, desc], desc = [signature, ..., content]
+            content = nodes[-1][-1]
+            if level == lazy_depth:
+                lazy = lazy_subtree(prefix=nodes[-1][0]['ids'][0])
+                content += lazy
+                lazies.append(lazy)
+                content = lazy
+            stack.append((level, key, content))
+
+        while stack:
+            ref_context.pop(stack.pop()[1])
+
+        for lazy in lazies:
+            lazy['count'] = len(list(lazy.findall(addnodes.desc)))
+            if not lazy['count']:
+                lazy.parent.remove(lazy)
+        return ret
+
+
+def write_if_changed(path, text):
+    """Write text to a file unless the file already contains it.
+
+    This avoids changing the modification time of generated documents
+    which have not changed so Sphinx does not re-read them.
+
+    """
+    try:
+        if path.read_text() == text:
+            return
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def title(text):
+    return [text, '=' * len(text), '']
+
+
+SPLIT_MANIFEST = '.cylc-conf-split'
+
+
+def generate_split_pages(app):
+    """Generate the documents for the ``cylc_conf_split`` config.
+
+    Each spec gets an index document which documents the configuration
+    itself, plus one document per top-level section (or setting).
+
+    The generated files are listed in a manifest so that documents for
+    items which have been removed from the spec can be deleted.
+
+    """
+    for docdir, spec_path in app.config.cylc_conf_split.items():
+        try:
+            spec = get_obj_from_module(spec_path)
+        except ImportError as exc:
+            LOG.warning(f'cylc_conf_split: {exc}')
+            continue
+        manifest = Path(app.srcdir, docdir, SPLIT_MANIFEST)
+        try:
+            old_files = set(manifest.read_text().splitlines())
+        except OSError:
+            old_files = set()
+        pages = []
+        for item in spec:
+            name = page_name(item)
+            pages.append(name)
+            if item.is_leaf():
+                path = item.display_name
+            else:
+                path = f'[{item.display_name}]'
+            lines = title(path)
+            lines.extend(directive(
+                'auto-cylc-conf',
+                [spec_path],
+                {'path': path}
+            ))
+            write_if_changed(
+                Path(app.srcdir, docdir, f'{name}.rst'),
+                '\n'.join(lines)
+            )
+        lines = title(spec.name)
+        lines.extend(directive('auto-cylc-conf', [spec_path], {'depth': 0}))
+        lines.extend(directive(
+            'toctree',
+            [],
+            {'maxdepth': 1},
+            content='\n'.join(pages)
+        ))
+        write_if_changed(
+            Path(app.srcdir, docdir, 'index.rst'),
+            '\n'.join(lines)
+        )
+
+        # remove documents for items which are no longer in the spec
+        files = {f'{name}.rst' for name in pages} | {'index.rst'}
+        for name in old_files - files:
+            # only remove files directly in the directory
+            if name and Path(name).name == name:
+                try:
+                    Path(app.srcdir, docdir, name).unlink()
+                except FileNotFoundError:
+                    pass
+        write_if_changed(manifest, '\n'.join(sorted(files)) + '\n')
+
 
 def doc_type(typ):
     content = []
@@ -329,14 +1286,24 @@ class CylcAutoTypeDirective(Directive):
         if len(self.arguments) == 0:
             types = json.loads('\n'.join(self.content))
         else:
-            types = self.iter_types([
-                get_obj_from_module(arg.strip())
-                for arg in self.arguments
-            ])
+            env = self.state.document.settings.env
+            objects = []
+            for arg in self.arguments:
+                try:
+                    module, obj = import_obj(arg.strip())
+                except ImportError as exc:
+                    LOG.warning(
+                        f'auto-cylc-type: {exc}',
+                        location=(env.docname, self.lineno)
+                    )
+                    continue
+                note_source(env, arg.strip(), module, obj)
+                objects.append(obj)
+            types = self.iter_types(objects)
 
         content = []
         for typ in types:
-            content.extend(doc_type(typ))
+            content.extend(TYPE_REGISTRY.rst(typ))
 
         node = addnodes.desc_content()
         self.state.nested_parse(
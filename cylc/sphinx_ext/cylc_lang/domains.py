@@ -4,10 +4,14 @@ from sphinx import addnodes
 from sphinx.directives import ObjectDescription
 from sphinx.domains import Domain, ObjType
 from sphinx.roles import XRefRole
+from sphinx.util import logging
 from sphinx.util.docutils import SphinxDirective
 from sphinx.util.nodes import make_refnode
 
 
+LOG = logging.getLogger(__name__)
+
+
 DEFAULT_SCOPE = 'flow.cylc'
 
 KEYS = {
@@ -245,6 +249,8 @@ def tokens_relative(base, override):
         'a.cylc[b][c]d'
         >>> test_tokens('a.cylc[b]c=d', '[..][..]e')
         'a.cylc[b]e'
+        >>> test_tokens('a.cylc[b][c][d]e', '[..][..][..]f')
+        'a.cylc[b]f'
 
     """
     # ensure that base is an aboslute path
@@ -255,38 +261,19 @@ def tokens_relative(base, override):
     if override.get('conf'):
         return override
 
-    base_list = []
-    over_list = []
-    for token in KEYS:
-        base_value = base.get(token)
-        over_value = override.get(token)
-        if token == 'section':
-            if base_value:
-                base_list.extend(base_value)
-            if over_value:
-                over_list.extend(over_value)
-        else:
-            if base_value:
-                base_list.append(base_value)
-            if over_value:
-                over_list.append(over_value)
-
-    path = base_list + over_list
-
-    kill = []
-    run = None
-    for ind, item in enumerate(list(path)):
-        if run is not None and item == '..':
-            run = ind
-            kill.extend([ind, ind - 3])
-        elif item == '..':
-            run = ind
-            kill.extend([ind, ind - 1])
-        else:
-            run = None
-
-    for ind in sorted([x for x in kill if x > 0], reverse=True):
-        del path[ind]
+    # walk the base path then the override path, each ".." backs up a level
+    path = []
+    for tokens in (base, override):
+        for token in KEYS:
+            value = tokens.get(token)
+            if not value:
+                continue
+            for item in (value if token == 'section' else (value,)):
+                if item != '..':
+                    path.append(item)
+                elif len(path) > 1:
+                    # (we cannot back up past the configuration)
+                    path.pop()
 
     tokens = {key: None for key in KEYS}
     tokens['conf'] = path.pop(0)
@@ -299,6 +286,21 @@ def tokens_relative(base, override):
     return tokens
 
 
+def alias_list(argument):
+    """Option converter for a comma or newline separated list of aliases.
+
+    Examples:
+        >>> alias_list('a, b\\n[c]d')
+        ['a', 'b', '[c]d']
+
+    """
+    return [
+        alias.strip()
+        for alias in re.split(r'[,\n]', argument or '')
+        if alias.strip()
+    ]
+
+
 class CylcDirective(ObjectDescription):
 
     NAME = None
@@ -375,6 +377,64 @@ class CylcDirective(ObjectDescription):
         self.env.domains['cylc'].set(tokens, self.env.docname)
         # associate this node with the fqdn (allows hyperlinks)
         signode['ids'].append(detokenise(tokens))
+        for alias in self.options.get('aliases', []):
+            alias_tokens = self.get_alias_tokens(tokens, alias)
+            self.env.domains['cylc'].set_alias(
+                alias_tokens,
+                tokens,
+                self.env.docname
+            )
+            # keep old anchors working
+            signode['ids'].append(detokenise(alias_tokens))
+
+    @classmethod
+    def get_alias_tokens(cls, tokens, alias):
+        """Return the tokens for an alias of this object.
+
+        Absolute aliases (i.e. ones which start with a configuration name)
+        are used as-is, otherwise the alias is an old name for this object
+        within the same parent. Setting aliases may include sections, these
+        are relative to the parent section.
+
+        Examples:
+            >>> def test_alias(directive, path, alias):
+            ...     return detokenise(directive.get_alias_tokens(
+            ...         tokenise(path), alias))
+
+            >>> test_alias(CylcSettingDirective, 'a.cylc[b]c', 'd')
+            'a.cylc[b]d'
+            >>> test_alias(CylcSectionDirective, 'a.cylc[b][c]', 'd')
+            'a.cylc[b][d]'
+            >>> test_alias(CylcConfDirective, 'a.cylc', 'b.rc')
+            'b.rc'
+            >>> test_alias(CylcSettingDirective, 'a.cylc[b]c', 'x.rc[y]z')
+            'x.rc[y]z'
+            >>> test_alias(CylcSettingDirective, 'a.cylc[b]c', '[x]old')
+            'a.cylc[b][x]old'
+            >>> test_alias(CylcSettingDirective, 'a.cylc[b]c', '[..][x]old')
+            'a.cylc[x]old'
+
+        """
+        alias_tokens = tokenise(alias)
+        if alias_tokens['conf']:
+            # absolute path
+            return alias_tokens
+        if cls.NAME == 'setting' and alias_tokens['section']:
+            # path relative to the parent section
+            return tokens_relative(
+                dict(tokens, setting=None, value=None),
+                alias_tokens
+            )
+        if alias_tokens['section']:
+            alias = alias_tokens['section'][-1]
+        else:
+            alias = alias_tokens['setting']
+        alias_tokens = dict(tokens)
+        if cls.NAME == 'section':
+            alias_tokens['section'] = tokens['section'][:-1] + (alias,)
+        else:
+            alias_tokens[cls.NAME] = alias
+        return alias_tokens
 
     def get_index_text(self, modname, name):
         return ''  # TODO?
@@ -390,16 +450,22 @@ class CylcDirective(ObjectDescription):
 class CylcConfDirective(CylcDirective):
 
     NAME = 'conf'
+    option_spec = dict(CylcDirective.option_spec)
+    option_spec['aliases'] = alias_list
 
 
 class CylcSectionDirective(CylcDirective):
 
     NAME = 'section'
+    option_spec = dict(CylcDirective.option_spec)
+    option_spec['aliases'] = alias_list
 
 
 class CylcSettingDirective(CylcDirective):
 
     NAME = 'setting'
+    option_spec = dict(CylcDirective.option_spec)
+    option_spec['aliases'] = alias_list
 
 
 class CylcValueDirective(CylcDirective):
@@ -526,40 +592,171 @@ class CylcDomain(Domain):
 
     initial_data = {
         # all registered cylc stuff should have an entry in this dictionary
-        'objects': {}
+        # {partials: (docname, name, object_type)}
+        'objects': {},
+        # extra information about auto-documented objects
+        # {name: (docname, fields)}
+        'fields': {},
+        # old paths of renamed objects
+        # {alias_partials: (docname, partials)}
+        'aliases': {}
     }
     """This sets ``self.data`` on initialisation."""
 
+    data_version = 3
+    """Bump this when the format of ``self.data`` changes."""
+
     def clear_doc(self, docname):
         """Wipe all entries for the specified docname."""
-        for partials, x_docname in list(self.data['objects'].items()):
+        for partials, (x_docname, *_) in list(self.data['objects'].items()):
             if docname == x_docname:
                 self.data['objects'].pop(partials)
+        for name, (x_docname, _) in list(self.data['fields'].items()):
+            if docname == x_docname:
+                self.data['fields'].pop(name)
+        for partials, (x_docname, _) in list(self.data['aliases'].items()):
+            if docname == x_docname:
+                self.data['aliases'].pop(partials)
+
+    def merge_domaindata(self, docnames, otherdata):
+        """Merge in data from a parallel read process."""
+        for key in ('objects', 'fields', 'aliases'):
+            for name, record in otherdata[key].items():
+                if record[0] in docnames:
+                    self.data[key][name] = record
 
     def get(self, tokens):
         partials = partials_from_tokens(tokens)
-        return self.data['objects'][partials]
+        return self.data['objects'][partials][0]
 
     def set(self, tokens, docname):
+        """Register an object with the domain.
+
+        The display name (which doubles as the anchor) and the object type
+        are worked out here, once, rather than every time Sphinx asks for
+        the list of objects.
+
+        """
         partials = partials_from_tokens(tokens)
-        self.data['objects'][partials] = docname
+        self.data['objects'][partials] = (
+            docname,
+            detokenise(tokens),
+            # the object type is the most specific token present
+            partials[-1][0]
+        )
+
+    def set_alias(self, alias_tokens, tokens, docname):
+        """Register an old path for an object."""
+        self.data['aliases'][partials_from_tokens(alias_tokens)] = (
+            docname,
+            partials_from_tokens(tokens)
+        )
+
+    def get_alias(self, tokens):
+        """Return the tokens of the object an old path now refers to.
+
+        If the object itself has not been aliased, this looks for aliases
+        of the sections (or configuration) it is in, so aliasing a section
+        also covers everything within it.
+
+        Raises:
+            KeyError: If no alias is registered.
+
+        """
+        aliases = self.data['aliases']
+        try:
+            _, partials = aliases[partials_from_tokens(tokens)]
+        except KeyError:
+            pass
+        else:
+            return tokens_from_partials(partials)
+
+        sections = tokens['section'] or ()
+        for ind in range(len(sections), -1, -1):
+            try:
+                _, partials = aliases[partials_from_tokens({
+                    'conf': tokens['conf'],
+                    'section': sections[:ind]
+                })]
+            except KeyError:
+                continue
+            ret = tokens_from_partials(partials)
+            ret['section'] += sections[ind:]
+            ret['setting'] = tokens['setting']
+            ret['value'] = tokens['value']
+            return ret
+
+        raise KeyError(detokenise(tokens))
+
+    def resolve_alias(self, tokens):
+        """Follow aliases until an object is found.
+
+        Objects may have been renamed more than once, or moved into a
+        renamed section so we may have to follow a chain of aliases.
+
+        Returns:
+            tuple - (tokens, docname)
+
+        Raises:
+            KeyError: If the aliases do not lead to a registered object.
+
+        """
+        seen = set()
+        while True:
+            tokens = self.get_alias(tokens)
+            partials = partials_from_tokens(tokens)
+            if partials in seen:
+                # circular aliases
+                raise KeyError(detokenise(tokens))
+            seen.add(partials)
+            try:
+                return tokens, self.get(tokens)
+            except KeyError:
+                pass
+
+    def set_fields(self, fields, docname):
+        """Record extra information about objects for the export.
+
+        Args:
+            fields (iterable):
+                (name, fields) pairs where fields is a dictionary of
+                JSON serialisable values.
+            docname (str):
+                The document these objects are documented in.
+
+        """
+        for name, values in fields:
+            self.data['fields'][name] = (docname, values)
+
+    def iter_export(self):
+        """Yield a dictionary for each object in the domain.
+
+        Used by the ``cylc_conf_export`` option.
+
+        """
+        for docname, name, type_ in self.data['objects'].values():
+            record = {
+                'name': name,
+                'objtype': type_,
+                'docname': docname,
+                'anchor': name
+            }
+            try:
+                record.update(self.data['fields'][name][1])
+            except KeyError:
+                pass
+            yield record
 
     def get_objects(self):
-        for partials, docname in self.data['objects'].items():
-            tokens = tokens_from_partials(partials)
-            name = detokenise(tokens)
-            dispname = name
-            for type_ in reversed(list(KEYS)):
-                if type_ in tokens and tokens[type_]:
-                    break
-            anchor = name
-            priority = 1
+        priority = 1
+        for docname, name, type_ in self.data['objects'].values():
+            # the name is used for the display name and the anchor
             yield (
                 name,
-                dispname,
+                name,
                 type_,
                 docname,
-                anchor,
+                name,
                 priority
             )
 
@@ -596,6 +793,12 @@ class CylcDomain(Domain):
                 tokens['value'] = None
                 docname = self.get(tokens)
         except KeyError:
+            # the object may have been renamed or moved
+            try:
+                tokens, docname = self.resolve_alias(tokens)
+            except KeyError:
+                docname = None
+        if docname is None:
             # object does not exist, "nitpicky" mode will pick this up
             # context = detokenise(ref_tokens)
             message = (
@@ -685,12 +888,72 @@ class ParsecDomain(Domain):
     }
 
     initial_data = {
-        'objects': {}
+        # {tokens: docname}
+        'objects': {},
+        # references to parsec objects
+        # {docname: [(tokens, line), ...]}
+        'references': {}
     }
 
+    data_version = 1
+
     dangling_warnings = {
     }
 
+    def clear_doc(self, docname):
+        for tokens, x_docname in list(self.data['objects'].items()):
+            if docname == x_docname:
+                self.data['objects'].pop(tokens)
+        self.data['references'].pop(docname, None)
+
+    def merge_domaindata(self, docnames, otherdata):
+        for tokens, docname in otherdata['objects'].items():
+            if docname in docnames:
+                self.data['objects'][tokens] = docname
+        for docname, references in otherdata['references'].items():
+            if docname in docnames:
+                self.data['references'][docname] = references
+
+    def process_doc(self, env, docname, document):
+        # record the references so check_consistency can find undefined
+        # objects without having to resolve every reference
+        references = [
+            ((self.name, node['reftype'], node['reftarget']), node.line)
+            for node in document.findall(addnodes.pending_xref)
+            if node.get('refdomain') == self.name
+        ]
+        if references:
+            self.data['references'][docname] = references
+
+    def check_consistency(self):
+        """Warn about references to objects which are not documented.
+
+        Each undefined object is reported once, at its first reference.
+        Only in nitpicky mode (like Sphinx's own reference warnings).
+
+        """
+        if not self.env.config.nitpicky:
+            return
+        undefined = {}
+        for docname, references in sorted(self.data['references'].items()):
+            for tokens, line in references:
+                if tokens in self.data['objects']:
+                    continue
+                if tokens in undefined:
+                    undefined[tokens][2] += 1
+                else:
+                    undefined[tokens] = [docname, line, 1]
+        for tokens, (docname, line, count) in undefined.items():
+            _, typ, target = tokens
+            LOG.warning(
+                f'{self.name}:{typ} "{target}" is referenced'
+                f' {count} time{"s" if count > 1 else ""}'
+                ' but is not documented',
+                location=(docname, line),
+                type='ref',
+                subtype=self.name
+            )
+
     def set(self, tokens, docname):
         self.data['objects'][tokens] = docname
 
@@ -721,7 +984,7 @@ class ParsecDomain(Domain):
         try:
             docname = self.get(tokens)
         except KeyError:
-            # object does not exist, "nitpicky" mode will pick this up
+            # object does not exist, see missing_parsec_reference
             return None
 
         # detokenise
@@ -736,3 +999,15 @@ class ParsecDomain(Domain):
             contnode,
             display
         )
+
+
+def missing_parsec_reference(app, env, node, contnode):
+    """Leave undefined parsec objects unlinked without a warning.
+
+    ``ParsecDomain.check_consistency`` reports each undefined object once,
+    this stops Sphinx from reporting every reference to it as well.
+
+    """
+    if node.get('refdomain') == ParsecDomain.name:
+        return contnode
+    return None
@@ -0,0 +1,62 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Machine-readable export of the objects in the cylc domain."""
+
+import json
+from pathlib import Path
+
+
+def write_export(records, path):
+    """Write records to a JSON Lines file one record at a time.
+
+    Examples:
+        >>> from tempfile import TemporaryDirectory
+        >>> with TemporaryDirectory() as tmp:
+        ...     path = Path(tmp, 'out.jsonl')
+        ...     write_export(iter([{'a': 1}, {'b': 2}]), path)
+        ...     print(path.read_text())
+        {"a": 1}
+        {"b": 2}
+        <BLANKLINE>
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as export_file:
+        for record in records:
+            export_file.write(json.dumps(record))
+            export_file.write('\n')
+
+
+def iter_records(app):
+    """Yield export records for every object in the cylc domain."""
+    for record in app.env.domains['cylc'].iter_export():
+        record['uri'] = (
+            app.builder.get_target_uri(record['docname'])
+            + '#' + record['anchor']
+        )
+        yield record
+
+
+def export_conf(app, exception):
+    """Write out the cylc domain if ``cylc_conf_export`` is configured."""
+    if exception or not app.config.cylc_conf_export:
+        return
+    write_export(
+        iter_records(app),
+        Path(app.builder.outdir, app.config.cylc_conf_export)
+    )
@@ -0,0 +1,104 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Subtrees of configuration references which HTML pages load on demand.
+
+The content of a ``lazy_subtree`` node is rendered as normal, then, for
+HTML pages (``LAZY_BUILDERS``), cut out of the page and written to a
+fragment in ``_static``.
+The page gets a placeholder which ``cylc-conf.js`` replaces with the
+fragment when it is expanded, or when the page is opened at an anchor
+within it.
+
+Other builders render the content inline, this includes builders which
+use the HTML translator but whose output cannot load fragments (e.g.
+``epub``, ``singlehtml``).
+
+"""
+
+from hashlib import sha256
+from html import escape
+from pathlib import Path
+
+from docutils import nodes
+from sphinx.util.osutil import relative_uri
+
+
+# fragments are written to this directory within _static
+FRAGMENT_DIR = 'cylc-conf'
+
+# the builders whose pages load fragments
+LAZY_BUILDERS = {'html', 'dirhtml'}
+
+
+class lazy_subtree(nodes.container):
+    """Content which HTML pages load on demand.
+
+    Attributes:
+        prefix:
+            The path of the section the content documents. Any anchor
+            starting with this path is within this subtree.
+
+    """
+
+
+def fragment_name(docname, prefix):
+    """Return the file name for a fragment.
+
+    Examples:
+        >>> fragment_name('a/b', 'x.cylc[y]')  # doctest: +ELLIPSIS
+        'a-b-...html'
+
+    """
+    key = sha256(f'{docname} {prefix}'.encode()).hexdigest()[:16]
+    return f'{docname.replace("/", "-")}-{key}.html'
+
+
+def visit_html(self, node):
+    if self.builder.name in LAZY_BUILDERS:
+        # remember where the content starts so we can cut it out afterwards
+        node['body_start'] = len(self.body)
+
+
+def depart_html(self, node):
+    start = node.get('body_start')
+    if start is None:
+        # leave the content inline
+        return
+    fragment = ''.join(self.body[start:])
+    del self.body[start:]
+    if not fragment.strip():
+        return
+
+    docname = self.builder.current_docname
+    name = fragment_name(docname, node['prefix'])
+    path = Path(self.builder.outdir, '_static', FRAGMENT_DIR, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(fragment)
+
+    src = relative_uri(
+        self.builder.get_target_uri(docname),
+        f'_static/{FRAGMENT_DIR}/{name}'
+    )
+    self.body.append(
+        f'<div class="cylc-lazy" data-src="{escape(src)}"'
+        f' data-prefix="{escape(node["prefix"])}">'
+        '<button class="cylc-lazy-expand" type="button">'
+        f'Show {node["count"]} more'
+        '</button>'
+        '</div>\n'
+    )
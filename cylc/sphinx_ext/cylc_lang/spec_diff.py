@@ -0,0 +1,194 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Compare two versions of a Parsec spec.
+
+Each item in a spec is given a Merkle hash, a hash of the item itself
+combined with the hashes of its children. Two specs are compared from the
+top down, subtrees with the same hash are skipped so the work done is
+proportional to the number of changes.
+
+"""
+
+from collections import namedtuple
+from hashlib import sha256
+
+
+HashNode = namedtuple(
+    'HashNode',
+    [
+        # hash of the item and everything below it
+        'merkle',
+        # hash of the documented fields of the item itself
+        'own',
+        # repr(item)
+        'path',
+        # the keys of the item's children
+        'children',
+        # False for items which doc_spec skips (i.e. "too meta")
+        'documented',
+        # the position of the item in spec.walk()
+        'index'
+    ]
+)
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def is_documented(item):
+    """Return True if doc_spec documents this item."""
+    if item.is_leaf():
+        parents = list(item.parents())
+        return not (item.meta or (parents and parents[0].meta is True))
+    return item.meta is not True
+
+
+def own_hash(item):
+    """Return a hash of the documented fields of an item.
+
+    Only the fields which appear in the documentation are used so that
+    specs imported from modules and read from dumps can be compared.
+
+    """
+    from cylc.sphinx_ext.cylc_lang.autodocumenters import (
+        get_section_fields,
+        get_setting_fields
+    )
+    if item.is_leaf():
+        fields = get_setting_fields(item)
+    else:
+        fields = get_section_fields(item)
+    fields.pop('Path')
+    if 'options' in fields:
+        # options may be defined as a set so their order can vary
+        fields['options'] = sorted(fields['options'], key=str)
+    return sha256(
+        repr((item.is_leaf(), sorted(fields.items()), item.desc)).encode()
+    ).hexdigest()
+
+
+def spec_hashes(spec):
+    """Return the Merkle hashes of a spec.
+
+    Args:
+        spec (ConfigNode):
+            The spec (or part of one).
+
+    Returns:
+        dict - {key: HashNode} where ``key`` is the tuple of display names
+        from ``spec`` down to the item (``()`` for ``spec`` itself). The
+        dict is in the order ``spec.walk()`` yields the items.
+
+    """
+    ret = {}
+    # the items whose children we are still walking
+    stack = []
+    # {key: [child_key, ...]}
+    child_keys = {}
+
+    def close(key, item, index):
+        children = child_keys.pop(key, [])
+        hasher = sha256(ret[key].encode())
+        for child_key in sorted(children):
+            hasher.update(ret[child_key].merkle.encode())
+        ret[key] = HashNode(
+            hasher.hexdigest(),
+            ret[key],
+            repr(item),
+            children,
+            is_documented(item),
+            index
+        )
+
+    for level, item in spec.walk():
+        while len(stack) > level:
+            close(*stack.pop())
+        if stack:
+            key = stack[-1][0] + (item.display_name,)
+            child_keys.setdefault(stack[-1][0], []).append(key)
+        else:
+            key = ()
+        # hold the item's place in the dict until its children are done
+        ret[key] = own_hash(item)
+        stack.append((key, item, len(ret) - 1))
+    while stack:
+        close(*stack.pop())
+    return ret
+
+
+def diff_specs(old, new):
+    """Compare two specs.
+
+    Args:
+        old (dict):
+            ``spec_hashes`` of the old spec.
+        new (dict):
+            ``spec_hashes`` of the new spec.
+
+    Returns:
+        list - [(change, path), ...] in the order the items appear in the
+        new spec (removed items in the order they appeared in the old).
+        If a section is added or removed, the items within it are not
+        listed. Items which are not documented are not listed.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> with ConfigNode('a') as old:
+        ...     _ = ConfigNode('b', desc='foo')
+        ...     _ = ConfigNode('c')
+        >>> with ConfigNode('a') as new:
+        ...     _ = ConfigNode('b', desc='bar')
+        ...     _ = ConfigNode('d')
+        >>> diff_specs(spec_hashes(old), spec_hashes(new))
+        [('changed', 'a|b'), ('added', 'a|d'), ('removed', 'a|c')]
+
+    """
+    changes = []
+    removed = []
+    stack = [()]
+    while stack:
+        key = stack.pop()
+        old_node = old.get(key)
+        new_node = new.get(key)
+        if old_node is None:
+            if new_node.documented:
+                changes.append((ADDED, key, new_node.path))
+            continue
+        if new_node is None:
+            if old_node.documented:
+                removed.append((REMOVED, key, old_node.path))
+            continue
+        if old_node.merkle == new_node.merkle:
+            # nothing has changed in this subtree
+            continue
+        if old_node.own != new_node.own and new_node.documented:
+            changes.append((CHANGED, key, new_node.path))
+        stack.extend(reversed(new_node.children))
+        stack.extend(
+            reversed([
+                child
+                for child in old_node.children
+                if child not in new
+            ])
+        )
+
+    # sort by position in the spec
+    changes.sort(key=lambda change: new[change[1]].index)
+    removed.sort(key=lambda change: old[change[1]].index)
+    return [(change, path) for change, _, path in changes + removed]
@@ -0,0 +1,338 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Serialised Parsec specs which can be documented without cylc-flow.
+
+A spec dump is a JSON Lines file with a header line followed by one line
+per item in the order ``spec.walk()`` yields them::
+
+    {"cylc-spec": 1, "cylc_version": "8.0.0"}
+    {"level": 0, "name": "flow.cylc", "path": "flow.cylc", ...}
+    {"level": 1, "name": "scheduler", "path": "flow.cylc[scheduler]", ...}
+
+Dumps may be gzip compressed (detected from the file contents).
+
+Dumps are read a line at a time, only the ancestors of the current item are
+held in memory.
+
+"""
+
+import gzip
+import json
+from hashlib import sha256
+
+
+FORMAT_VERSION = 1
+
+# the first two bytes of a gzip file
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SpecPath(str):
+    """A path which represents itself without quotes.
+
+    Used for the ``meta`` of a section so that ``repr(item.meta)`` gives
+    the path of the template as it does for a ``ConfigNode``.
+
+    """
+
+    def __repr__(self):
+        return str(self)
+
+
+class SpecItem:
+    """A section or setting read from a spec dump.
+
+    Provides the parts of the ``ConfigNode`` interface which the
+    auto-documenters use.
+
+    """
+
+    UNSET = None
+
+    __slots__ = (
+        'level',
+        'parent',
+        'name',
+        'display_name',
+        'path',
+        'leaf',
+        'desc',
+        'default',
+        'options',
+        'vdr',
+        'type_name',
+        'meta'
+    )
+
+    def __init__(self, record, parent=None):
+        self.level = record['level']
+        self.parent = parent
+        self.name = record['name']
+        self.display_name = record.get('display_name', self.name)
+        self.path = record['path']
+        self.leaf = record.get('leaf', False)
+        self.desc = record.get('desc')
+        self.default = record.get('default')
+        self.options = record.get('options', [])
+        self.type_name = record.get('type')
+        self.vdr = self.type_name
+        meta = record.get('meta')
+        if isinstance(meta, str):
+            meta = SpecPath(meta)
+        self.meta = meta
+
+    def __repr__(self):
+        return self.path
+
+    def __str__(self):
+        return self.display_name
+
+    def is_root(self):
+        return self.parent is None
+
+    def is_leaf(self):
+        return self.leaf
+
+    def parents(self):
+        item = self.parent
+        while item is not None:
+            yield item
+            item = item.parent
+
+
+def plain_value(value):
+    """Return a value which JSON will round-trip.
+
+    Subclasses of built-in types (e.g. ``DurationFloat``) are converted to
+    strings so that they represent themselves the same way once loaded.
+
+    Examples:
+        >>> plain_value([1, 'a', None])
+        [1, 'a', None]
+        >>> class Duration(float):
+        ...     def __str__(self):
+        ...         return 'PT1S'
+        >>> plain_value(Duration(1))
+        'PT1S'
+
+    """
+    if isinstance(value, list):
+        return [plain_value(item) for item in value]
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    return str(value)
+
+
+def iter_records(spec):
+    """Yield the dump records for a ``ConfigNode`` spec.
+
+    Examples:
+        >>> from cylc.flow.parsec.config import ConfigNode
+        >>> from cylc.flow.parsec.validate import ParsecValidator as VDR
+        >>> with ConfigNode('a') as spec:
+        ...     _ = ConfigNode('<b>', VDR.V_INTEGER, default=1, desc='x')
+        >>> for record in iter_records(spec):
+        ...     print(record)  # doctest: +NORMALIZE_WHITESPACE
+        {'level': 0, 'name': 'a', 'path': 'a'}
+        {'level': 1, 'name': '__MANY__', 'path': 'a|<b>', 'leaf': True,
+         'display_name': '<b>', 'desc': 'x', 'default': 1,
+         'type': 'integer'}
+
+    """
+    from cylc.sphinx_ext.cylc_lang.autodocumenters import get_vdr_info
+    for level, item in spec.walk():
+        record = {'level': level, 'name': item.name, 'path': repr(item)}
+        if item.is_leaf():
+            record['leaf'] = True
+        if item.display_name != item.name:
+            record['display_name'] = item.display_name
+        if item.desc:
+            record['desc'] = item.desc
+        if item.default not in (None, item.UNSET):
+            record['default'] = plain_value(item.default)
+        if item.options:
+            record['options'] = list(item.options)
+        if item.is_leaf() and item.vdr:
+            record['type'] = get_vdr_info(item.vdr)[0]
+        if item.meta is True:
+            record['meta'] = True
+        elif item.meta:
+            record['meta'] = repr(item.meta)
+        yield record
+
+
+def dump_spec(spec, filename):
+    """Write a ``ConfigNode`` spec to a file.
+
+    Files with a ``.gz`` extension are compressed.
+
+    Example:
+        Dump the workflow configuration from the installed cylc-flow::
+
+           $ python -c '
+           from cylc.flow.cfgspec.workflow import SPEC
+           from cylc.sphinx_ext.cylc_lang.spec_dump import dump_spec
+           dump_spec(SPEC, "flow.cylc.jsonl.gz")
+           '
+
+    """
+    from cylc.flow import __version__ as cylc_version
+    opener = gzip.open if str(filename).endswith('.gz') else open
+    with opener(filename, 'wt') as dump:
+        dump.write(json.dumps({
+            'cylc-spec': FORMAT_VERSION,
+            'cylc_version': cylc_version
+        }) + '\n')
+        for record in iter_records(spec):
+            dump.write(json.dumps(record) + '\n')
+
+
+class SpecDump:
+    """A spec (or part of one) read from a spec dump.
+
+    Provides the parts of the ``ConfigNode`` interface which the
+    auto-documenters use. The file is re-read each time the spec is walked.
+
+    Args:
+        filename (str):
+            Path to the dump file.
+        lines (list):
+            Lines of JSON to read instead of a file.
+        names (tuple):
+            The internal names of the path to the part of the spec this
+            represents (see ``SpecDump.get``).
+
+    """
+
+    def __init__(self, filename=None, lines=None, names=()):
+        self.filename = filename
+        self.lines = lines
+        self.names = names
+        self._root = None
+
+    def _open(self):
+        if self.lines is not None:
+            return iter(self.lines)
+        with open(self.filename, 'rb') as dump:
+            magic = dump.read(2)
+        if magic == GZIP_MAGIC:
+            return gzip.open(self.filename, 'rt')
+        return open(self.filename, 'r')
+
+    def _read(self):
+        """Yield the records in the dump."""
+        lines = self._open()
+        try:
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if 'cylc-spec' in record:
+                    if record['cylc-spec'] > FORMAT_VERSION:
+                        raise ValueError(
+                            f'Unsupported spec dump version: {line.strip()}'
+                        )
+                    continue
+                yield record
+        finally:
+            if hasattr(lines, 'close'):
+                lines.close()
+
+    def _walk_all(self):
+        """Yield (names, item) for every item in the dump."""
+        # the ancestors of the current item
+        stack = []
+        for record in self._read():
+            del stack[record['level']:]
+            item = SpecItem(record, stack[-1][1] if stack else None)
+            stack.append((item.name, item))
+            yield tuple(name for name, _ in stack[1:]), item
+
+    def walk(self):
+        """Yield (level, item) for items in this part of the spec."""
+        depth = len(self.names)
+        for names, item in self._walk_all():
+            if names[:depth] == self.names:
+                yield len(names) - depth, item
+
+    @property
+    def root(self):
+        """The item at the top of this part of the spec."""
+        if self._root is None:
+            for _, item in self.walk():
+                self._root = item
+                break
+            else:
+                raise KeyError(self.names[-1] if self.names else None)
+        return self._root
+
+    def get(self, *names):
+        """Return part of the spec.
+
+        Like ``ConfigNode.get`` names which are not present fall back to
+        ``__MANY__``.
+
+        """
+        names = self.names + names
+        depth = len(self.names)
+        # record the paths which might be what we are looking for
+        found = set()
+        for item_names, _ in self._walk_all():
+            if len(item_names) <= len(names) and all(
+                item_name in (name, '__MANY__')
+                for item_name, name in zip(item_names, names)
+            ):
+                found.add(item_names)
+        path = self.names
+        for name in names[depth:]:
+            if path + (name,) in found:
+                path += (name,)
+            elif path + ('__MANY__',) in found:
+                path += ('__MANY__',)
+            else:
+                raise KeyError(name)
+        return SpecDump(self.filename, self.lines, path)
+
+    def fingerprint(self):
+        """Return a hash of the contents of the dump."""
+        hasher = sha256(repr(self.names).encode())
+        if self.lines is not None:
+            for line in self.lines:
+                hasher.update(line.encode())
+        else:
+            with open(self.filename, 'rb') as dump:
+                for chunk in iter(lambda: dump.read(1 << 16), b''):
+                    hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def __repr__(self):
+        return repr(self.root)
+
+    def is_root(self):
+        return self.root.is_root()
+
+    def is_leaf(self):
+        return self.root.is_leaf()
+
+    def parents(self):
+        return self.root.parents()
+
+    def __getattr__(self, key):
+        if key in SpecItem.__slots__:
+            return getattr(self.root, key)
+        raise AttributeError(key)
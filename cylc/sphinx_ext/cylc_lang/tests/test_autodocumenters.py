@@ -1,16 +1,36 @@
+from html import unescape
+from importlib import import_module
+from io import StringIO
+import os
+import re
+import subprocess
+import sys
+from textwrap import dedent
+from types import SimpleNamespace
+
 import pytest
+from sphinx import addnodes
 
 from cylc.flow.parsec.config import ConfigNode
 from cylc.flow.parsec.validate import ParsecValidator as VDR
 
+from cylc.sphinx_ext.cylc_lang import autodocumenters
 from cylc.sphinx_ext.cylc_lang.autodocumenters import (
+    TypeRegistry,
     directive,
     doc_conf,
     doc_section,
     doc_setting,
     doc_spec,
-    doc_type
+    doc_spec_directives,
+    doc_type,
+    evict_rst_cache,
+    get_spec_directives,
+    import_obj,
+    iter_spec_fields
 )
+from cylc.sphinx_ext.cylc_lang.lazy import fragment_name, lazy_subtree
+from cylc.sphinx_ext.cylc_lang.spec_dump import dump_spec
 
 
 def test_directive():
@@ -272,6 +292,88 @@ def test_doc_spec(documented_spec):
     ]
 
 
+def test_iter_spec_fields(documented_spec):
+    """It should return the fields for each section and setting."""
+    assert list(iter_spec_fields(documented_spec)) == [
+        (
+            'documented-conf[documented-section]',
+            {'Path': 'documented-conf[documented-section]'}
+        ),
+        (
+            'documented-conf[documented-section]documented-setting',
+            {
+                'Path': (
+                    'documented-conf[documented-section]documented-setting'
+                ),
+                'type': 'string'
+            }
+        )
+    ]
+
+
+def test_get_spec_directives(documented_spec, tmp_path, monkeypatch):
+    """It should cache generated directives in memory and on disk."""
+    calls = []
+
+    def _doc_spec_directives(spec, depth=None, versions=None):
+        calls.append(spec)
+        return doc_spec_directives(spec, depth, versions)
+
+    monkeypatch.setattr(
+        autodocumenters, 'doc_spec_directives', _doc_spec_directives)
+    monkeypatch.setattr(autodocumenters, 'RST_CACHE', {})
+
+    expected = doc_spec_directives(documented_spec)
+    assert get_spec_directives(documented_spec, tmp_path) == expected
+    assert len(calls) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # in-memory cache
+    assert get_spec_directives(documented_spec, tmp_path) == expected
+    assert len(calls) == 1
+
+    # on-disk cache (e.g. a new Sphinx process)
+    monkeypatch.setattr(autodocumenters, 'RST_CACHE', {})
+    cache_file = next(tmp_path.iterdir())
+    os.utime(cache_file, (0, 0))
+    assert get_spec_directives(documented_spec, tmp_path) == expected
+    assert len(calls) == 1
+    # the entry is marked as recently used
+    assert cache_file.stat().st_mtime > 0
+
+    # changing the spec should invalidate the cache
+    documented_spec['documented-section'].desc = 'changed'
+    get_spec_directives(documented_spec, tmp_path)
+    assert len(calls) == 2
+
+
+def test_evict_rst_cache(tmp_path):
+    """It should remove the least recently used entries over the limit."""
+    cache_dir = tmp_path / 'auto-cylc-conf'
+    cache_dir.mkdir()
+    for ind in range(5):
+        path = cache_dir / f'{ind}.json'
+        path.write_text('x' * 10)
+        os.utime(path, (ind, ind))
+    app = SimpleNamespace(
+        doctreedir=str(tmp_path),
+        config=SimpleNamespace(cylc_conf_cache_size=25)
+    )
+    assert evict_rst_cache(app, None) == 3
+    assert sorted(path.name for path in cache_dir.iterdir()) == [
+        '3.json',
+        '4.json'
+    ]
+    assert evict_rst_cache(app, None) == 0
+    # not after failed builds
+    app.config.cylc_conf_cache_size = 0
+    assert evict_rst_cache(app, Exception()) == 0
+    assert evict_rst_cache(
+        SimpleNamespace(doctreedir=str(tmp_path / 'nope'), config=app.config),
+        None
+    ) == 0
+
+
 @pytest.fixture
 def basic_parsec_type():
     return {
@@ -305,3 +407,532 @@ def test_doc_type(basic_parsec_type):
         '',
 
     ]
+
+
+def test_lazy_import():
+    """It should not import cylc.flow until the auto-documenters run."""
+    proc = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'import sys, cylc.sphinx_ext.cylc_lang;'
+            ' print([m for m in sys.modules if m.startswith("cylc.flow")])'
+        ],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert proc.stdout.strip() == '[]'
+
+
+SPEC_MODULE = '''
+from cylc.flow.parsec.config import ConfigNode as Conf
+from cylc.flow.parsec.validate import ParsecValidator as VDR
+
+with Conf('my.cylc', desc='The *configuration*.') as SPEC:
+    with Conf('section', desc='See :cylc:conf:`[..]setting`.'):
+        Conf('setting', VDR.V_INTEGER, default=1, desc=\'\'\'
+            A setting.
+
+            .. note::
+
+               A note.
+        \'\'\')
+        with Conf('<name>') as Template:
+            Conf('x', VDR.V_STRING, options=['a', 'b'])
+            with Conf('nested'):
+                Conf('y')
+    with Conf('other', meta=Template):
+        Conf('z')
+'''
+
+
+def test_type_registry(basic_parsec_type):
+    """It should load the types once and cache the RST for each type."""
+    registry = TypeRegistry()
+    assert registry.info('V_STRING')[0] == 'string'
+    types = registry.types
+    assert registry.info('V_INTEGER')[0] == 'integer'
+    assert registry.types is types
+
+    rst = registry.rst(basic_parsec_type)
+    assert rst == doc_type(basic_parsec_type)
+    assert registry.rst(dict(basic_parsec_type)) is rst
+    assert registry.rst({**basic_parsec_type, 'help': 'other'}) is not rst
+
+
+@pytest.fixture
+def build(sphinx_build):
+    """Return a function which builds a document with Sphinx.
+
+    The function returns the Sphinx application.
+
+    """
+    def _build(
+        tmp_path, rst, builder='dummy', warning=None, confoverrides=None
+    ):
+        src = tmp_path / 'src'
+        sys.path.insert(0, str(src))
+        try:
+            return sphinx_build(
+                tmp_path,
+                {
+                    'conf.py': "extensions = ['cylc.sphinx_ext.cylc_lang']\n",
+                    'my_spec.py': SPEC_MODULE,
+                    'index.rst': dedent(rst)
+                },
+                builder=builder,
+                warning=warning,
+                confoverrides=confoverrides
+            )
+        finally:
+            sys.path.remove(str(src))
+            sys.modules.pop('my_spec', None)
+    return _build
+
+
+@pytest.fixture
+def read_doctree(build):
+    """Return a function which builds a document and returns its doctree.
+    """
+    return lambda tmp_path, rst: build(tmp_path, rst).env.get_doctree(
+        'index'
+    )
+
+
+def test_build_nodes(tmp_path, read_doctree):
+    """It should produce the same doctree as parsing the generated RST."""
+    direct = read_doctree(tmp_path / 'direct', '''
+        .. auto-cylc-conf:: my_spec.SPEC
+    ''')
+    parsed = read_doctree(tmp_path / 'parsed', '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :parse-rst:
+    ''')
+    assert direct.pformat().replace(str(tmp_path / 'direct'), '') == (
+        parsed.pformat().replace(str(tmp_path / 'parsed'), '')
+    )
+    assert 'my.cylc[section][<name>][nested]y' in direct.pformat()
+
+
+def test_path(tmp_path, read_doctree):
+    """It should document part of a spec in the right scope."""
+    doctree = read_doctree(tmp_path, '''
+        .. cylc-scope:: other.cylc[foo]
+
+        .. auto-cylc-conf:: my_spec.SPEC
+           :path: [section][<name>]
+           :depth: 1
+    ''').pformat()
+    assert 'ids="my.cylc[section][<name>]"' in doctree
+    assert 'ids="my.cylc[section][<name>]x"' in doctree
+    assert 'ids="my.cylc[section][<name>][nested]"' in doctree
+    # below the requested depth
+    assert 'my.cylc[section][<name>][nested]y' not in doctree
+    # outside of the requested path
+    assert 'ids="my.cylc[section]"' not in doctree
+
+
+def test_file(tmp_path, read_doctree):
+    """It should document spec dumps in the same way as modules."""
+    namespace = {}
+    exec(SPEC_MODULE, namespace)
+    (tmp_path / 'file' / 'src').mkdir(parents=True)
+    dump_spec(namespace['SPEC'], tmp_path / 'file' / 'src' / 'spec.jsonl.gz')
+    dumped = read_doctree(tmp_path / 'file', '''
+        .. auto-cylc-conf::
+           :file: spec.jsonl.gz
+           :path: [section]
+    ''')
+    imported = read_doctree(tmp_path / 'module', '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :path: [section]
+    ''')
+    assert dumped.pformat().replace(str(tmp_path / 'file'), '') == (
+        imported.pformat().replace(str(tmp_path / 'module'), '')
+    )
+
+
+def test_compare(tmp_path, read_doctree):
+    """It should mark up and list changes since an older spec."""
+    namespace = {}
+    exec(
+        SPEC_MODULE
+        .replace('A setting.', 'The old setting.')
+        .replace("Conf('z')", "Conf('old')"),
+        namespace
+    )
+    (tmp_path / 'src').mkdir()
+    dump_spec(namespace['SPEC'], tmp_path / 'src' / 'old.jsonl')
+    doctree = read_doctree(tmp_path, '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :compare: old.jsonl
+           :version: 2.0
+
+        .. auto-cylc-conf:: my_spec.SPEC
+           :compare: old.jsonl
+           :version: 2.0
+           :changelog:
+    ''')
+    changes = [
+        (node['type'], node.parent.parent[0]['ids'][0])
+        for node in doctree.findall(addnodes.versionmodified)
+    ]
+    assert changes == [
+        ('versionchanged', 'my.cylc[section]setting'),
+        ('versionadded', 'my.cylc[other]z'),
+    ]
+    changelog = doctree[-1].astext()
+    assert changelog == dedent('''
+        Added in 2.0
+
+        my.cylc[other]z
+
+        Changed in 2.0
+
+        my.cylc[section]setting
+
+        Removed in 2.0
+
+        my.cylc[other]old
+    ''').strip()
+
+
+def test_changelog_without_compare(tmp_path, build):
+    """It should report changelogs which have nothing to compare."""
+    warnings = StringIO()
+    build(tmp_path, '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :changelog:
+    ''', warning=warnings)
+    assert 'The "changelog" option requires "compare"' in (
+        warnings.getvalue()
+    )
+
+
+def test_lazy_depth(tmp_path, build):
+    """It should move deeper items out of the page for HTML output."""
+    build(tmp_path, '''
+        Reference to :cylc:conf:`my.cylc[section][<name>]x`.
+
+        .. auto-cylc-conf:: my_spec.SPEC
+           :lazy-depth: 1
+    ''', 'html')
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    fragments = {
+        path.name: path.read_text()
+        for path in (tmp_path / 'out' / '_static' / 'cylc-conf').iterdir()
+    }
+    assert len(fragments) == 2
+    for name, prefix in (
+        (fragment_name('index', 'my.cylc[section]'), 'my.cylc[section]'),
+        (fragment_name('index', 'my.cylc[other]'), 'my.cylc[other]'),
+    ):
+        assert (
+            f'<div class="cylc-lazy" data-src="_static/cylc-conf/{name}"'
+            f' data-prefix="{prefix}">'
+        ) in html
+    # the top levels are in the page
+    assert 'id="my.cylc[section]"' in html
+    # deeper items are in fragments
+    assert 'id="my.cylc[section][&lt;name&gt;]x"' not in html
+    assert 'id="my.cylc[section][&lt;name&gt;]x"' in fragments[
+        fragment_name('index', 'my.cylc[section]')
+    ]
+    # references to them still resolve
+    assert 'href="#my.cylc[section][&lt;name&gt;]x"' in html
+    assert (tmp_path / 'out' / '_static' / 'js' / 'cylc-conf.js').exists()
+
+
+def test_lazy_depth_other_builders(tmp_path, read_doctree):
+    """It should leave the content inline for other builders."""
+    doctree = read_doctree(tmp_path, '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :lazy-depth: 1
+    ''')
+    lazy = list(doctree.findall(lazy_subtree))
+    assert [node['prefix'] for node in lazy] == [
+        'my.cylc[section]',
+        'my.cylc[other]'
+    ]
+    assert 'ids="my.cylc[section][<name>]x"' in lazy[0].pformat()
+
+
+@pytest.mark.parametrize('builder, filename', [
+    ('epub', 'index.xhtml'),
+    ('singlehtml', 'index.html'),
+])
+def test_lazy_depth_other_html_builders(tmp_path, builder, filename, build):
+    """It should leave the content inline for other HTML builders."""
+    build(tmp_path, '''
+        .. auto-cylc-conf:: my_spec.SPEC
+           :lazy-depth: 1
+    ''', builder)
+    html = (tmp_path / 'out' / filename).read_text()
+    assert 'id="my.cylc[section][&lt;name&gt;]x"' in html
+    assert 'cylc-lazy' not in html
+    assert not (tmp_path / 'out' / '_static' / 'cylc-conf').exists()
+
+
+def test_import_obj(tmp_path, monkeypatch):
+    """It should cache resolved namespaces and names which aren't modules."""
+    monkeypatch.setattr(autodocumenters, 'IMPORT_CACHE', {
+        'resolved': {},
+        'not modules': set(),
+        'sys.path': []
+    })
+    cache = autodocumenters.IMPORT_CACHE
+    imports = []
+    monkeypatch.setattr(
+        autodocumenters,
+        'import_module',
+        lambda name: imports.append(name) or import_module(name)
+    )
+
+    namespace = 'cylc.flow.parsec.validate.ParsecValidator.V_TYPE_HELP'
+    assert import_obj(namespace)[1] is VDR.V_TYPE_HELP
+    assert imports == [
+        namespace,
+        'cylc.flow.parsec.validate.ParsecValidator',
+        'cylc.flow.parsec.validate'
+    ]
+    assert import_obj(namespace)[1] is VDR.V_TYPE_HELP
+    assert len(imports) == 3
+
+    # names which aren't modules shouldn't be re-tried
+    imports.clear()
+    import_obj('cylc.flow.parsec.validate.ParsecValidator.V_STRING')
+    assert imports == [
+        'cylc.flow.parsec.validate.ParsecValidator.V_STRING',
+        'cylc.flow.parsec.validate'
+    ]
+
+    # changing the path should clear the negative cache
+    (tmp_path / 'my_module.py').write_text('X = 1')
+    with pytest.raises(ImportError, match='no module found'):
+        import_obj('my_module.X')
+    assert 'my_module' in cache['not modules']
+    monkeypatch.syspath_prepend(str(tmp_path))
+    try:
+        assert import_obj('my_module.X')[1] == 1
+
+        # re-importing the module should invalidate the cache
+        sys.modules.pop('my_module')
+        (tmp_path / 'my_module.py').write_text('X = 22')
+        assert import_obj('my_module.X')[1] == 22
+    finally:
+        sys.modules.pop('my_module', None)
+
+
+def test_import_warnings(tmp_path, build):
+    """It should warn about namespaces which cannot be imported."""
+    warnings = StringIO()
+    build(tmp_path, '''
+        .. auto-cylc-conf:: my_spec.NOPE
+
+        .. auto-cylc-type:: nope.V_TYPE_HELP
+    ''', warning=warnings)
+    assert (
+        'index.rst:2: WARNING: auto-cylc-conf: Could not import'
+        ' "my_spec.NOPE": module "my_spec" has no attribute "NOPE"'
+    ) in warnings.getvalue()
+    assert (
+        'index.rst:4: WARNING: auto-cylc-type: Could not import'
+        ' "nope.V_TYPE_HELP": no module found'
+    ) in warnings.getvalue()
+
+
+@pytest.mark.parametrize('source', ['my_spec.SPEC', ':file: spec.jsonl'])
+def test_inheritance(tmp_path, source, build):
+    """It should link inherited items to their original definitions."""
+    namespace = {}
+    exec(SPEC_MODULE, namespace)
+    (tmp_path / 'src').mkdir()
+    dump_spec(namespace['SPEC'], tmp_path / 'src' / 'spec.jsonl')
+    if source.startswith(':file:'):
+        source = f'\n           {source}'
+    warnings = StringIO()
+    build(tmp_path, f'''
+        :cylc:conf:`my.cylc[other]x`
+        :cylc:conf:`my.cylc[other][nested]y`
+
+        .. auto-cylc-conf:: {source}
+    ''', 'html', warnings)
+    assert 'my.cylc[other]' not in warnings.getvalue()
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    refs = [
+        unescape(ref)
+        for ref in re.findall(r'"reference internal" href="#([^"]*)"', html)
+    ]
+    assert refs == [
+        # the references
+        'my.cylc[section][<name>]x',
+        'my.cylc[section][<name>][nested]y',
+        # the "Inherits" and "Inherited" fields of [other]
+        'my.cylc[section][<name>]',
+        'my.cylc[section][<name>]x',
+        'my.cylc[section][<name>][nested]',
+    ]
+
+
+def test_generate_split_pages(tmp_path, monkeypatch):
+    """It should generate one document per top-level section."""
+    (tmp_path / 'my_spec.py').write_text(SPEC_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    app = SimpleNamespace(
+        srcdir=str(tmp_path),
+        config=SimpleNamespace(cylc_conf_split={'conf': 'my_spec.SPEC'})
+    )
+    autodocumenters.generate_split_pages(app)
+    assert sorted(path.name for path in (tmp_path / 'conf').iterdir()) == [
+        '.cylc-conf-split',
+        'index.rst',
+        'other.rst',
+        'section.rst'
+    ]
+    assert (tmp_path / 'conf' / 'section.rst').read_text() == dedent('''
+        [section]
+        =========
+
+        .. auto-cylc-conf:: my_spec.SPEC
+           :path: [section]
+    ''').lstrip()
+
+    # unchanged documents should not be re-written
+    mtime = (tmp_path / 'conf' / 'index.rst').stat().st_mtime_ns
+    autodocumenters.generate_split_pages(app)
+    assert (tmp_path / 'conf' / 'index.rst').stat().st_mtime_ns == mtime
+
+    # documents for items removed from the spec should be deleted
+    manifest = tmp_path / 'conf' / '.cylc-conf-split'
+    manifest.write_text(manifest.read_text() + 'removed.rst\n')
+    (tmp_path / 'conf' / 'removed.rst').touch()
+    (tmp_path / 'conf' / 'handwritten.rst').touch()
+    autodocumenters.generate_split_pages(app)
+    assert not (tmp_path / 'conf' / 'removed.rst').exists()
+    assert (tmp_path / 'conf' / 'handwritten.rst').exists()
+    assert 'removed.rst' not in manifest.read_text()
+    sys.modules.pop('my_spec', None)
+
+
+def test_source_dependencies(tmp_path, monkeypatch, sphinx_build):
+    """It should re-read only documents whose spec has changed."""
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'conf.py').write_text(
+        "extensions = ['cylc.sphinx_ext.cylc_lang']\n"
+    )
+    (src / 'my_spec.py').write_text(SPEC_MODULE)
+    (src / 'index.rst').write_text(dedent('''
+        .. toctree::
+
+           section
+           other
+           types
+    '''))
+    for name in ('section', 'other'):
+        (src / f'{name}.rst').write_text(dedent(f'''
+            {name}
+            =====
+
+            .. auto-cylc-conf:: my_spec.SPEC
+               :path: [{name}]
+        '''))
+    (src / 'types.rst').write_text(dedent('''
+        types
+        =====
+
+        .. auto-cylc-type:: my_spec.TYPES
+    '''))
+    monkeypatch.syspath_prepend(str(src))
+    # don't let a stale .pyc mask changes made within the same second
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)
+
+    def build(spec_module):
+        """Build the docs, return the names of the documents read."""
+        (src / 'my_spec.py').write_text(
+            spec_module + '\nTYPES = {"t": ("T", "a type", ["x"])}\n'
+        )
+        sys.modules.pop('my_spec', None)
+        read = set()
+        sphinx_build(
+            tmp_path,
+            {},
+            builder='dummy',
+            freshenv=False,
+            events={
+                'env-before-read-docs':
+                    lambda app, env, docnames: read.update(docnames)
+            }
+        )
+        return read
+
+    try:
+        assert build(SPEC_MODULE) == {'index', 'section', 'other', 'types'}
+
+        # the module has been modified but the spec is unchanged
+        assert build(SPEC_MODULE + '\n# comment\n') == set()
+
+        # a change to one section should only affect its document
+        assert build(
+            SPEC_MODULE.replace('A setting.', 'A changed setting.')
+        ) == {'section'}
+    finally:
+        sys.modules.pop('my_spec', None)
+
+
+UNDEFINED_TYPES = '''
+    .. auto-cylc-conf:: my_spec.SPEC
+
+    :parsec:type:`nope`
+
+    .. auto-cylc-type::
+
+       [{"name": "integer"}]
+'''
+
+
+def test_undefined_types(tmp_path, build):
+    """It should warn once about each parsec:type which is not documented."""
+    warnings = StringIO()
+    build(
+        tmp_path,
+        UNDEFINED_TYPES,
+        builder='html',
+        warning=warnings,
+        confoverrides={'nitpicky': True}
+    )
+    warnings = warnings.getvalue()
+    # no "reference target not found" warnings for each reference
+    assert warnings.count('parsec:type') == 2
+    assert (
+        'parsec:type "string" is referenced 3 times but is not documented'
+        ' [ref.parsec]'
+    ) in warnings
+    assert (
+        'index.rst:4: WARNING: parsec:type "nope" is referenced 1 time'
+        ' but is not documented [ref.parsec]'
+    ) in warnings
+
+
+def test_undefined_types_suppressed(tmp_path, build):
+    """The undefined parsec:type warnings should be suppressible."""
+    warnings = StringIO()
+    build(
+        tmp_path,
+        UNDEFINED_TYPES,
+        builder='html',
+        warning=warnings,
+        confoverrides={
+            'nitpicky': True,
+            'suppress_warnings': ['ref.parsec']
+        }
+    )
+    assert 'parsec' not in warnings.getvalue()
+
+
+def test_undefined_types_nitpicky(tmp_path, build):
+    """Undefined types should only be reported in nitpicky mode."""
+    warnings = StringIO()
+    build(tmp_path, UNDEFINED_TYPES, warning=warnings)
+    assert 'is not documented' not in warnings.getvalue()
@@ -0,0 +1,148 @@
+"""Tests for the cylc domain.
+
+Run this file directly to time the domain with a large number of
+registered objects (as listed when Sphinx writes the search index and
+``objects.inv``)::
+
+    python cylc/sphinx_ext/cylc_lang/tests/test_domains.py
+
+"""
+
+from timeit import repeat
+from types import SimpleNamespace
+
+import pytest
+
+from cylc.sphinx_ext.cylc_lang.domains import (
+    CylcDomain,
+    tokenise
+)
+
+
+@pytest.fixture
+def cylc_domain():
+    """A CylcDomain attached to a minimal environment."""
+    return CylcDomain(SimpleNamespace(domaindata={}))
+
+
+def test_get_objects(cylc_domain):
+    """It should list registered objects with their name and type."""
+    cylc_domain.set(tokenise('x.cylc'), 'doc1')
+    cylc_domain.set(tokenise('x.cylc[a][b]'), 'doc1')
+    cylc_domain.set(tokenise('x.cylc[a]c'), 'doc2')
+    cylc_domain.set(tokenise('x.cylc|d'), 'doc2')
+    cylc_domain.set(tokenise('x.cylc[a]c=e'), 'doc2')
+    assert list(cylc_domain.get_objects()) == [
+        ('x.cylc', 'x.cylc', 'conf', 'doc1', 'x.cylc', 1),
+        ('x.cylc[a][b]', 'x.cylc[a][b]', 'section', 'doc1', 'x.cylc[a][b]', 1),
+        ('x.cylc[a]c', 'x.cylc[a]c', 'setting', 'doc2', 'x.cylc[a]c', 1),
+        ('x.cylc|d', 'x.cylc|d', 'setting', 'doc2', 'x.cylc|d', 1),
+        ('x.cylc[a]c=e', 'x.cylc[a]c=e', 'value', 'doc2', 'x.cylc[a]c=e', 1),
+    ]
+
+
+def test_get_and_clear_doc(cylc_domain):
+    """It should look up docnames and forget them when docs are cleared."""
+    cylc_domain.set(tokenise('x.cylc[a]b'), 'doc1')
+    cylc_domain.set(tokenise('x.cylc[a]c'), 'doc2')
+    assert cylc_domain.get(tokenise('x.cylc[a]b')) == 'doc1'
+    assert cylc_domain.get(tokenise('x.cylc[a]c')) == 'doc2'
+
+    cylc_domain.clear_doc('doc1')
+    with pytest.raises(KeyError):
+        cylc_domain.get(tokenise('x.cylc[a]b'))
+    assert cylc_domain.get(tokenise('x.cylc[a]c')) == 'doc2'
+
+
+def test_iter_export(cylc_domain):
+    """It should export objects along with any recorded fields."""
+    cylc_domain.set(tokenise('x.cylc[a]b'), 'doc1')
+    cylc_domain.set(tokenise('x.cylc[a]c'), 'doc2')
+    cylc_domain.set_fields([('x.cylc[a]b', {'type': 'string'})], 'doc1')
+    assert list(cylc_domain.iter_export()) == [
+        {
+            'name': 'x.cylc[a]b',
+            'objtype': 'setting',
+            'docname': 'doc1',
+            'anchor': 'x.cylc[a]b',
+            'type': 'string'
+        },
+        {
+            'name': 'x.cylc[a]c',
+            'objtype': 'setting',
+            'docname': 'doc2',
+            'anchor': 'x.cylc[a]c'
+        }
+    ]
+
+    cylc_domain.clear_doc('doc1')
+    assert cylc_domain.data['fields'] == {}
+
+
+def test_get_alias(cylc_domain):
+    """It should resolve old paths to their new locations."""
+    cylc_domain.set_alias(
+        tokenise('x.cylc[a]old'), tokenise('x.cylc[a]new'), 'doc1')
+    cylc_domain.set_alias(
+        tokenise('x.cylc[old]'), tokenise('x.cylc[b][new]'), 'doc1')
+    cylc_domain.set_alias(tokenise('x.rc'), tokenise('x.cylc'), 'doc2')
+
+    # the object itself has been renamed
+    assert cylc_domain.get_alias(tokenise('x.cylc[a]old')) == (
+        tokenise('x.cylc[a]new'))
+    # a parent section has been moved
+    assert cylc_domain.get_alias(tokenise('x.cylc[old][c]d=e')) == (
+        tokenise('x.cylc[b][new][c]d=e'))
+    # the configuration has been renamed
+    assert cylc_domain.get_alias(tokenise('x.rc[a]old')) == (
+        tokenise('x.cylc[a]old'))
+    # no alias
+    with pytest.raises(KeyError):
+        cylc_domain.get_alias(tokenise('x.cylc[a]b'))
+
+    cylc_domain.clear_doc('doc1')
+    with pytest.raises(KeyError):
+        cylc_domain.get_alias(tokenise('x.cylc[a]old'))
+
+
+def test_resolve_alias(cylc_domain):
+    """It should follow chains of aliases to registered objects."""
+    cylc_domain.set(tokenise('x.cylc[b]c'), 'doc1')
+    cylc_domain.set_alias(tokenise('x.rc'), tokenise('x.cylc'), 'doc1')
+    cylc_domain.set_alias(tokenise('x.cylc[a]'), tokenise('x.cylc[b]'), 'doc1')
+    assert cylc_domain.resolve_alias(tokenise('x.rc[a]c')) == (
+        tokenise('x.cylc[b]c'), 'doc1')
+
+    # circular aliases
+    cylc_domain.set_alias(tokenise('y.rc'), tokenise('y.cylc'), 'doc1')
+    cylc_domain.set_alias(tokenise('y.cylc'), tokenise('y.rc'), 'doc1')
+    with pytest.raises(KeyError):
+        cylc_domain.resolve_alias(tokenise('y.rc[a]b'))
+
+
+def benchmark(number=50000):
+    """Print the time taken to register and list ``number`` objects."""
+    paths = [
+        f'x.cylc[section{ind // 100}][sub{ind % 100 // 10}]setting{ind % 10}'
+        for ind in range(number)
+    ]
+    tokens = [tokenise(path) for path in paths]
+
+    def register():
+        domain = CylcDomain(SimpleNamespace(domaindata={}))
+        for ind, token in enumerate(tokens):
+            domain.set(token, f'doc{ind % 50}')
+        return domain
+
+    domain = register()
+    cases = [
+        ('register', register),
+        ('get_objects', lambda: list(domain.get_objects())),
+    ]
+    for name, fcn in cases:
+        time = min(repeat(fcn, number=1, repeat=5))
+        print(f'{name:<24} {time * 1e3:.1f} ms ({number} objects)')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,228 @@
+"""Property tests for the path algebra used by the cylc domain.
+
+Paths are generated at random (from fixed seeds so failures are
+reproducible) and checked against identities which should hold for
+any path.
+
+Run this file directly to time each of the path functions::
+
+    python cylc/sphinx_ext/cylc_lang/tests/test_paths.py
+
+"""
+
+from random import Random
+from string import ascii_lowercase, digits
+from timeit import repeat
+
+import pytest
+
+from cylc.sphinx_ext.cylc_lang.domains import (
+    detokenise,
+    partials_from_tokens,
+    tokenise,
+    tokens_from_partials,
+    tokens_relative
+)
+
+
+SEEDS = range(100)
+
+# the maximum number of sections the tokenise regex can capture
+MAX_TOKENISE_DEPTH = 4
+
+# the maximum number of sections for everything else
+MAX_DEPTH = 12
+
+
+def random_name(rand):
+    """Return a random section/setting name.
+
+    This may be a user-defined name e.g. ``<namespace>``.
+
+    """
+    name = rand.choice(ascii_lowercase)
+    name += ''.join(
+        rand.choice(ascii_lowercase + digits + ' -_/')
+        for _ in range(rand.randint(0, 8))
+    ).strip()
+    name += rand.choice(ascii_lowercase + digits)
+    if rand.random() > 0.8:
+        name = f'<{name}>'
+    return name
+
+
+def random_tokens(rand, max_depth):
+    """Return random tokens for an absolute path."""
+    tokens = {
+        'conf': rand.choice(['flow.cylc', 'global.cylc', 'a-b_c.rc']),
+        'section': tuple(
+            random_name(rand)
+            for _ in range(rand.randint(0, max_depth))
+        ) or None,
+        'setting': None,
+        'value': None
+    }
+    if rand.random() > 0.3:
+        tokens['setting'] = random_name(rand)
+        if rand.random() > 0.5:
+            tokens['value'] = random_name(rand)
+    return tokens
+
+
+def flatten(tokens):
+    """Return the path as a flat list of items."""
+    ret = [tokens['conf']]
+    ret.extend(tokens['section'] or ())
+    ret.extend(
+        tokens[key] for key in ('setting', 'value') if tokens[key]
+    )
+    return ret
+
+
+def normalise(tokens):
+    """Represent "no sections" consistently."""
+    return dict(tokens, section=tokens['section'] or None)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_tokenise_round_trip(seed):
+    """detokenise and tokenise should be inverses."""
+    tokens = random_tokens(Random(seed), MAX_TOKENISE_DEPTH)
+    path = detokenise(tokens)
+    assert tokenise(path) == tokens
+    assert detokenise(tokenise(path)) == path
+    # tokenise should be indifferent to surrounding whitespace
+    assert tokenise(f' {path} ') == tokens
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_partials_round_trip(seed):
+    """partials_from_tokens and tokens_from_partials should be inverses."""
+    tokens = random_tokens(Random(seed), MAX_DEPTH)
+    partials = partials_from_tokens(tokens)
+    assert normalise(tokens_from_partials(partials)) == tokens
+    assert partials_from_tokens(tokens_from_partials(partials)) == partials
+    assert detokenise(tokens_from_partials(partials)) == detokenise(tokens)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_partials_concatenation(seed):
+    """Splitting a path into several partials should not change it."""
+    rand = Random(seed)
+    tokens = random_tokens(rand, MAX_DEPTH)
+    sections = tokens['section'] or ()
+    split = rand.randint(0, len(sections))
+    partials = [
+        ('conf', tokens['conf']),
+        ('section', sections[:split]),
+        ('section', sections[split:]),
+    ]
+    if tokens['setting']:
+        partials.append(('setting', tokens['setting']))
+    if tokens['value']:
+        partials.append(('value', tokens['value']))
+    assert normalise(tokens_from_partials(partials)) == tokens
+
+
+def relative_tokens(base, target):
+    """Return a relative path from base to target.
+
+    Returns None if the target cannot be expressed relative to the base.
+
+    """
+    base_path = flatten(base)
+    target_path = flatten(target)
+    common = 0
+    for base_item, target_item in zip(base_path, target_path):
+        if base_item != target_item:
+            break
+        common += 1
+    if common == 0:
+        return None
+    ups = ['..'] * (len(base_path) - common)
+    rest = target_path[common:]
+    tokens = {'conf': None, 'section': None, 'setting': None, 'value': None}
+    if target['value'] and target['value'] in rest[-1:]:
+        tokens['value'] = rest.pop()
+        if target['setting'] and target['setting'] in rest[-1:]:
+            tokens['setting'] = rest.pop()
+        elif ups:
+            # e.g. `..=value`
+            tokens['setting'] = ups.pop()
+        else:
+            return None
+    elif target['setting'] and target['setting'] in rest[-1:]:
+        tokens['setting'] = rest.pop()
+    if not rest and not ups and not tokens['setting']:
+        return None
+    tokens['section'] = tuple(ups + rest) or None
+    return tokens
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_tokens_relative(seed):
+    """Relative paths from one path to another should resolve to it."""
+    rand = Random(seed)
+    base = random_tokens(rand, MAX_DEPTH)
+    # pick a target which shares some of its path with the base
+    target = random_tokens(rand, MAX_DEPTH)
+    target['conf'] = base['conf']
+    shared = rand.randint(0, len(base['section'] or ()))
+    target['section'] = (
+        (base['section'] or ())[:shared] + (target['section'] or ())
+    ) or None
+    override = relative_tokens(base, target)
+    if override is None:
+        pytest.skip('target cannot be expressed relative to base')
+    assert normalise(tokens_relative(base, override)) == target
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_tokens_relative_absolute(seed):
+    """Absolute paths should be returned unchanged."""
+    rand = Random(seed)
+    base = random_tokens(rand, MAX_DEPTH)
+    override = random_tokens(rand, MAX_DEPTH)
+    assert tokens_relative(base, override) == override
+
+
+def benchmark(number=10000):
+    """Print the time taken by each of the path functions."""
+    rand = Random(0)
+    paths = [
+        detokenise(random_tokens(rand, MAX_TOKENISE_DEPTH))
+        for _ in range(100)
+    ]
+    tokens = [tokenise(path) for path in paths]
+    partials = [partials_from_tokens(token) for token in tokens]
+    relative = [
+        (base, override)
+        for base, override in (
+            (tokens[ind], relative_tokens(tokens[ind], tokens[ind - 1]))
+            for ind in range(len(tokens))
+        )
+        if override
+    ]
+    cases = [
+        ('tokenise', tokenise, paths),
+        ('detokenise', detokenise, tokens),
+        ('partials_from_tokens', partials_from_tokens, tokens),
+        ('tokens_from_partials', tokens_from_partials, partials),
+    ]
+    for name, fcn, args in cases:
+        time = min(repeat(
+            lambda: [fcn(arg) for arg in args],
+            number=number // len(args),
+            repeat=5
+        ))
+        print(f'{name:<24} {time / number * 1e6:.2f} us')
+    time = min(repeat(
+        lambda: [tokens_relative(*args) for args in relative],
+        number=number // len(relative),
+        repeat=5
+    ))
+    print(f'{"tokens_relative":<24} {time / number * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,99 @@
+import pytest
+
+from cylc.flow.parsec.config import ConfigNode
+from cylc.flow.parsec.validate import ParsecValidator as VDR
+
+from cylc.sphinx_ext.cylc_lang.spec_diff import (
+    diff_specs,
+    spec_hashes
+)
+from cylc.sphinx_ext.cylc_lang.spec_dump import SpecDump, dump_spec
+
+
+def make_spec(**changes):
+    """Return a spec, keyword arguments override the descriptions."""
+    def desc(name):
+        return changes.get(name, name)
+
+    with ConfigNode('my.cylc') as spec:
+        with ConfigNode('a', desc=desc('a')):
+            ConfigNode('b', VDR.V_INTEGER, default=1, desc=desc('b'))
+            with ConfigNode('<name>', desc=desc('name')) as template:
+                ConfigNode('c', desc=desc('c'))
+        with ConfigNode('d', meta=template):
+            ConfigNode('e', desc=desc('e'))
+        if 'f' in changes:
+            with ConfigNode('f', desc=desc('f')):
+                ConfigNode('g')
+        with ConfigNode('h'):
+            for x in range(10):
+                with ConfigNode(f'h{x}'):
+                    for y in range(10):
+                        ConfigNode(f'i{y}', desc=desc(f'i{x}{y}'))
+    return spec
+
+
+class CountingDict(dict):
+    """Dictionary which counts lookups."""
+
+    def __init__(self, *args):
+        dict.__init__(self, *args)
+        self.lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return dict.get(self, key, default)
+
+
+def test_no_changes():
+    """It should not descend into unchanged subtrees."""
+    old = CountingDict(spec_hashes(make_spec()))
+    assert diff_specs(old, spec_hashes(make_spec())) == []
+    assert old.lookups == 1
+
+
+def test_changes():
+    """It should report changes in the order of the spec."""
+    old = CountingDict(spec_hashes(make_spec()))
+    new = make_spec(b='changed', i55='changed', c='changed', f='new')
+    new['a'].get('b').default = 2
+    assert diff_specs(old, spec_hashes(new)) == [
+        ('changed', 'my.cylc[a]b'),
+        ('changed', 'my.cylc[a][<name>]c'),
+        ('added', 'my.cylc[f]'),
+        ('changed', 'my.cylc[h][h5]i5'),
+    ]
+    # the siblings of changed items are compared but not their contents
+    assert old.lookups < len(old) / 3
+
+
+def test_removed():
+    """It should report removed items, but not their contents."""
+    old = make_spec(f='old')
+    new = make_spec()
+    assert diff_specs(spec_hashes(old), spec_hashes(new)) == [
+        ('removed', 'my.cylc[f]'),
+    ]
+
+
+def test_inherited():
+    """It should not report inherited settings (which aren't documented)."""
+    old = make_spec()
+    new = make_spec(c='changed')
+    # my.cylc[d]c has changed too, but is not documented
+    assert [path for _, path in diff_specs(
+        spec_hashes(old), spec_hashes(new)
+    )] == ['my.cylc[a][<name>]c']
+
+
+@pytest.mark.parametrize('changes, expected', [
+    ({}, []),
+    ({'e': 'changed'}, [('changed', 'my.cylc[d]e')]),
+])
+def test_dump(tmp_path, changes, expected):
+    """Dumps and imported specs should be comparable."""
+    dump_spec(make_spec(), tmp_path / 'spec.jsonl')
+    assert diff_specs(
+        spec_hashes(SpecDump(tmp_path / 'spec.jsonl')),
+        spec_hashes(make_spec(**changes))
+    ) == expected
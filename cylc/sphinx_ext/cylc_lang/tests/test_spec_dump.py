@@ -0,0 +1,102 @@
+import sys
+
+import pytest
+
+from cylc.flow.parsec.config import ConfigNode
+from cylc.flow.parsec.validate import ParsecValidator as VDR
+
+from cylc.sphinx_ext.cylc_lang.autodocumenters import (
+    doc_spec,
+    get_subtree,
+    iter_spec_fields,
+    spec_fingerprint
+)
+from cylc.sphinx_ext.cylc_lang.spec_dump import (
+    SpecDump,
+    dump_spec,
+    iter_records
+)
+
+
+@pytest.fixture
+def spec():
+    """A spec with user-defined and inherited sections."""
+    with ConfigNode('my.cylc', desc='The configuration.') as spec:
+        with ConfigNode('section', desc='A section.'):
+            ConfigNode('setting', VDR.V_INTEGER, default=1, desc='Setting.')
+            ConfigNode('list', VDR.V_INTEGER_LIST, default=[1, 2, 3])
+            with ConfigNode('<name>') as template:
+                ConfigNode('x', VDR.V_STRING, options=['a', 'b'])
+                with ConfigNode('nested'):
+                    ConfigNode('y', VDR.V_BOOLEAN, default=False)
+            with ConfigNode('special'):
+                ConfigNode('z')
+        with ConfigNode('other', meta=template):
+            ConfigNode('z')
+    return spec
+
+
+@pytest.mark.parametrize('filename', ['spec.jsonl', 'spec.jsonl.gz'])
+def test_round_trip(spec, tmp_path, filename):
+    """Dumps should be documented in the same way as the spec."""
+    dump_spec(spec, tmp_path / filename)
+    dump = SpecDump(tmp_path / filename)
+    assert doc_spec(dump) == doc_spec(spec)
+    assert list(iter_spec_fields(dump)) == list(iter_spec_fields(spec))
+
+
+def test_inline(spec):
+    """Dumps can be provided as lines of JSON."""
+    import json
+    lines = [json.dumps(record) for record in iter_records(spec)]
+    assert doc_spec(SpecDump(lines=lines)) == doc_spec(spec)
+
+
+@pytest.mark.parametrize('path', [
+    '[section]',
+    '[section]setting',
+    '[section][special]',
+    '[section][foo]',
+    '[section][foo][nested]',
+    '[other]',
+])
+def test_get(spec, tmp_path, path):
+    """It should select the same part of the spec as ConfigNode.get."""
+    dump_spec(spec, tmp_path / 'spec.jsonl')
+    dump = get_subtree(SpecDump(tmp_path / 'spec.jsonl'), path)
+    item = get_subtree(spec, path)
+    assert repr(dump) == repr(item)
+    assert repr(next(dump.parents())) == repr(next(item.parents()))
+    assert dump.is_root() is False
+    assert doc_spec(dump) == doc_spec(item)
+
+
+def test_get_missing(spec, tmp_path):
+    """It should raise KeyError for paths which are not in the spec."""
+    dump_spec(spec, tmp_path / 'spec.jsonl')
+    dump = SpecDump(tmp_path / 'spec.jsonl')
+    with pytest.raises(KeyError):
+        get_subtree(dump, '[nope]')
+    with pytest.raises(KeyError):
+        get_subtree(dump, '[section][special]nope')
+
+
+def test_without_cylc_flow(spec, tmp_path, monkeypatch):
+    """Dumps should be documented without importing cylc.flow."""
+    dump_spec(spec, tmp_path / 'spec.jsonl')
+    expected = doc_spec(spec)
+    monkeypatch.setitem(sys.modules, 'cylc.flow', None)
+    dump = SpecDump(tmp_path / 'spec.jsonl')
+    assert doc_spec(dump) == expected
+    assert spec_fingerprint(dump) == spec_fingerprint(dump)
+
+
+def test_fingerprint(spec, tmp_path):
+    """The fingerprint should change with the dump."""
+    dump_spec(spec, tmp_path / 'spec.jsonl')
+    dump = SpecDump(tmp_path / 'spec.jsonl')
+    key = spec_fingerprint(dump)
+    assert key != spec_fingerprint(dump.get('section'))
+    spec['section']['setting'].desc = 'Changed.'
+    dump_spec(spec, tmp_path / 'spec.jsonl')
+    assert key != spec_fingerprint(dump)
@@ -34,7 +34,16 @@ Directives
    Renders a visualisation of a simple Cylc graph.
 
    In HTML documents this will display an animated graph,
-   otherwise a plain graph will be displayed as an image.
+   otherwise a plain graph will be displayed as an image. Animations only
+   run while they are on screen.
+
+   Graph strings may use ``&``, ``|`` and brackets, output qualifiers
+   (``foo:fail``), optional outputs (``foo?``), parameterised tasks
+   (``foo<m>``) and intercycle offsets (``foo[-P1D]``). Xtriggers
+   (``@wall_clock``) are taken as satisfied and suicide triggers
+   (``!foo``) are not drawn. The animation assumes every task succeeds, it
+   is simulated at build time and graphs which stall (e.g. due to
+   dependency loops) are reported as build warnings.
 
    .. rst:directive:option:: snippet
       :type: flag
@@ -45,6 +54,21 @@ Directives
 
       Sets the `graphviz size attribute`_.
 
+   .. rst:directive:option:: cycles
+
+      Unroll a cycling graph over this many cycle points (default ``3`` if
+      ``recurrence`` is set). Tasks are named ``<point>/<task>`` and grouped
+      by cycle point, intercycle offsets (e.g. ``foo[-P1]``) are resolved
+      between the unrolled points and dependencies on points outside of
+      them are taken as satisfied.
+
+   .. rst:directive:option:: recurrence
+
+      The interval between cycle points of a cycling graph, either an
+      integer (e.g. ``P1``, the default) or a datetime duration (e.g.
+      ``PT6H``). Integer cycling starts at ``1``, datetime cycling at
+      ``20000101T0000Z``.
+
    .. rst:directive:option:: theme
 
       The name of the colour theme for animation, currently supported:
@@ -81,10 +105,52 @@ extensions
 graphviz_dot_args
     ``['-Gfontname=sans', '-Nfontname=sans', '-Gbgcolor=none']``
 
+Optional
+^^^^^^^^
+
+minicylc_cache_dir
+   Directory to keep rendered graphs in between builds, unlike the output
+   directory this survives ``make clean``. Entries are keyed by the dot code
+   and graphviz version. Defaults to ``None`` (no cache), e.g. set to
+   ``os.path.expanduser('~/.cache/cylc-sphinx-extensions/minicylc')``
+   to share rendered graphs between builds and projects.
+minicylc_cache_size
+   The maximum size of the cache in bytes, the least recently used
+   graphs are removed at the end of the build to keep the cache within
+   this size. Defaults to 64MiB.
+minicylc_render_jobs
+   For HTML builds, the graphs of the whole project are rendered before
+   the documents are written using up to this many concurrent ``dot``
+   processes, graphs which appear in multiple documents are rendered once.
+   Defaults to the number of CPUs, set to ``0`` to render each graph as
+   its document is written.
+minicylc_layout_max_nodes
+   Graphs with up to this many tasks are laid out by a built-in Python
+   layered layout rather than graphviz which saves running ``dot`` for each
+   graph (and allows documentation with only small graphs to be built
+   without graphviz). The layout is simpler than graphviz's. Only used for
+   HTML output with ``graphviz_output_format = 'svg'``. Defaults to ``0``
+   (always use graphviz).
+minicylc_inline_svg
+   If ``True`` the SVG markup of each graph is written into the HTML page
+   rather than being loaded from a separate file. This saves a request per
+   graph and allows the animation to start as soon as the page has loaded.
+   Only used with ``graphviz_output_format = 'svg'``. Defaults to ``False``.
+minicylc_max_unrolled_tasks
+   Cycling graphs which would unroll to more than this many tasks are
+   rejected with an error. Defaults to ``200``.
+
 """
 
 
+from cylc.sphinx_ext.minicylc.cache import evict
 from cylc.sphinx_ext.minicylc.minicylc import MiniCylc, MiniCylcDirective
+from cylc.sphinx_ext.minicylc.render import (
+    collect_graphs,
+    merge_graphs,
+    purge_graphs,
+    render_graphs
+)
 
 from sphinx.ext.graphviz import (
     latex_visit_graphviz,
@@ -109,5 +175,26 @@ def setup(app):
                  text=(text_visit_graphviz, None),
                  man=(man_visit_graphviz, None))
     app.add_directive('minicylc', MiniCylcDirective)
+    app.add_config_value(
+        'minicylc_cache_dir',
+        None,
+        '',
+        types=[str, type(None)]
+    )
+    app.add_config_value('minicylc_cache_size', 64 * 1024 ** 2, '')
+    app.add_config_value(
+        'minicylc_render_jobs',
+        None,
+        '',
+        types=[int, type(None)]
+    )
+    app.add_config_value('minicylc_layout_max_nodes', 0, '')
+    app.add_config_value('minicylc_inline_svg', False, '')
+    app.add_config_value('minicylc_max_unrolled_tasks', 200, '')
+    app.connect('doctree-read', collect_graphs)
+    app.connect('env-purge-doc', purge_graphs)
+    app.connect('env-merge-info', merge_graphs)
+    app.connect('env-updated', render_graphs)
+    app.connect('build-finished', evict)
     register_static(app, __name__)
     return {'version': __version__, 'parallel_read_safe': True}
@@ -45,15 +45,115 @@ var minicylc_demo_theme = {
 }
 
 
+class MiniCylcScheduler {
+    /**
+     * Advance all running MiniCylc animations on a shared clock.
+     *
+     * Every interval the animations are stepped in a single animation
+     * frame, their style changes are queued and written together so the
+     * page is restyled once however many graphs it contains.
+     */
+
+    constructor(interval) {
+        /**
+         * @param interval The time between steps in milliseconds.
+         */
+        this.interval = interval;
+        this.graphs = new Set();
+        this.writes = new Map();
+        this.due = false;
+        this.timer = null;
+        this.frame = null;
+    }
+
+    start(graph) {
+        /**
+         * Step a graph with each tick of the clock.
+         * @param graph A MiniCylc instance.
+         */
+        this.graphs.add(graph);
+        if (this.timer === null) {
+            const self = this;
+            this.timer = setInterval(function() {
+                self.due = true;
+                self._request_frame();
+            }, this.interval);
+        }
+    }
+
+    stop(graph) {
+        /**
+         * Stop stepping a graph.
+         * @param graph A MiniCylc instance.
+         */
+        this.graphs.delete(graph);
+        if (!this.graphs.size && this.timer !== null) {
+            clearInterval(this.timer);
+            this.timer = null;
+        }
+    }
+
+    style(element, fill, stroke) {
+        /**
+         * Queue a style change, to be written in the next frame.
+         * @param element The SVG element.
+         * @param fill The fill colour.
+         * @param stroke The stroke colour.
+         */
+        if (element) {
+            this.writes.set(element, [fill, stroke]);
+            this._request_frame();
+        }
+    }
+
+    _request_frame() {
+        if (this.frame === null) {
+            const self = this;
+            this.frame = requestAnimationFrame(function() {
+                self._frame();
+            });
+        }
+    }
+
+    _frame() {
+        /**
+         * Step the graphs (if due) then write all queued style changes.
+         */
+        this.frame = null;
+        if (this.due) {
+            this.due = false;
+            for (let graph of this.graphs) {
+                graph._main_loop();
+            }
+        }
+        for (let [element, [fill, stroke]] of this.writes) {
+            element.setAttribute('fill', fill);
+            element.setAttribute('stroke', stroke);
+        }
+        this.writes.clear();
+    }
+}
+
+var minicylc_scheduler = new MiniCylcScheduler(3000);
+
+
 class MiniCylc {
     /**
      * Class for animating SVG graphs.
      *
+     * The animation is simulated at build time, this class replays it.
+     *
      * Attributes:
      *   - nodes: A dictionary of task names against a list of SVG nodes.
+     *   - ellipses: A dictionary of task names against the SVG elements
+     *     which are styled to show the task state.
      *   - edges: A dictionary of task edges against a list SVG nodes.
-     *   - dependencies: A dictionary of task names against a list of
-     *     conditional expressions.
+     *   - timeline: The tasks which start running at each step
+     *     (see minicylc/timeline.py).
+     *
+     * The animation only runs while the graph is visible, it is loaded
+     * when the graph is first scrolled into view (see set_visible). The
+     * animation is stepped by minicylc_scheduler.
      */
 
     constructor(div) {
@@ -62,43 +162,74 @@ class MiniCylc {
          * @param div The <div> element containing the SVG.
          * */
         this.div = div;
-        this.load();
+        this.visible = false;
+        this.loading = false;
+    }
+
+    active() {
+        /**
+         * @return true if the graph is on screen in a visible page.
+         */
+        return this.visible && !document.hidden;
+    }
+
+    set_visible(visible) {
+        /**
+         * Record whether the graph is within the viewport.
+         * @param visible true if any part of the graph is visible.
+         */
+        this.visible = visible;
+        this.update();
+    }
+
+    update() {
+        /**
+         * Start, pause or resume the animation to match the visibility.
+         */
+        if (!this.active()) {
+            // pause
+            minicylc_scheduler.stop(this);
+        } else if (!this.timeline) {
+            // first time on screen
+            this.load();
+        } else if (!this.stalled) {
+            // resume
+            minicylc_scheduler.start(this);
+        }
     }
 
     load() {
         /**
          * Obtain nodes and edges from svg.
          *
-         * This function calls itself recursively until the SVG is loaded.
+         * Inline SVG (see minicylc_inline_svg) is available straight away,
+         * otherwise this function waits for the <object> to load.
          *
          * This function starts the animation when finished.
          */
-        const svg = ($(this.div).find('object:first')[0]).contentDocument;
-        const self = this;
-
-        if (!svg) {
-          console.log('Wait for SVG load: Gecko');
-          // this retry loop works for Firefox, etc
-          setTimeout(function() {
-            self.load();
-          }, 500)
-          return;
+        if (this.loading) {
+            return;
         }
-        var eles = $(svg).find('g');
-        if (!eles.length) {
-          console.log('Wait for SVG load: Blink');
-          // this retry loop works for Chrome, etc
-          setTimeout(function() {
-            self.load();
-          }, 500)
-          return;
+        var svg = $(this.div).find('svg:first')[0];
+        if (!svg) {
+            const object = $(this.div).find('object:first')[0];
+            const self = this;
+            svg = object.contentDocument;
+            if (!svg || !$(svg).find('g').length) {
+                // wait for the SVG to load
+                this.loading = true;
+                object.addEventListener('load', function() {
+                    self.loading = false;
+                    self.load();
+                }, {once: true});
+                return;
+            }
         }
 
         this._find_svg_elements(svg);
 
-        // Parse dependencies.
-        var deps = this._get_dependencies_from_graph(this.div);
-        this._construct_dependency_map(deps);
+        // Load the precomputed animation.
+        this.timeline = $(this.div).data('timeline');
 
         // Process colour theme.
         this.setup_colours($(this.div).data('theme'));
@@ -133,99 +264,21 @@ class MiniCylc {
          */
         var nodes = {};
         var edges = {};
+        var ellipses = {};
         $(svg).find('g').each(function() {
             var node = $(this)[0];
             var node_class = $(node).attr('class');
+            var name = node.textContent.trim().split('\n')[0];
             if (node_class == 'node') {
-                nodes[node.textContent.trim().split('\n')[0]] = node;
+                nodes[name] = node;
+                ellipses[name] = $(node).find('ellipse:first')[0];
             } else if (node_class == 'edge') {
-                edges[node.textContent.trim().split('\n')[0]] = node;
+                edges[name] = node;
             }
         });
         this.nodes = nodes;
         this.edges = edges;
-    }
-
-    _get_dependencies_from_graph(div) {
-        /**
-         * Extract, parse and return a list of dependencies.
-         * @param div The minicylc <div> element.
-         * @return A list of [left, right] lists e.g. ['a & b', 'c'].
-         */
-        var deps = [];
-        var ind = 0;
-        var parts;
-        for (let dep of $(div).data('dependencies').split('//')) {
-            parts = dep.split('=>');
-            if (parts.length == 0) {
-                continue;  // Graph line does not contain a dependency => skip.
-            }
-            for(ind = 0; ind < parts.length-1; ind++) {
-                deps.push([parts[ind].trim(), parts[ind + 1].trim()]);  // [left, right].
-            }
-        }
-
-        return deps;
-    }
-
-    _construct_dependency_map(deps) {
-        /**
-         * Associate tasks with conditional expressions.
-         *
-         * Associations stored as a dictionary - this.dependencies.
-         * @param deps A list of dependencies in the form [[left, right], ...].
-         */
-        var condition;
-        var conditional_regex = /[()&]/;
-        var conditional_regex2 = /([()&|])/;
-        var conditional_chars = ['(', ')', '|', '&'];
-        this.dependencies = {};
-        for (let dep of deps) {
-            // Build a javascript parsable conditional statement.
-            condition = [];
-            for (let left of dep[0].split(conditional_regex2)) {
-                left = left.trim();
-                if (left) {
-                    if (!conditional_chars.includes(left)) {
-                        // All dependencies are :succeed by default,
-                        // dependencies are checked using
-                        // this.succeed.has(task).
-                        condition.push('this.succeed.has("' + left + '")');
-                    } else {
-                        // conditional character.
-                        condition.push(left);
-                    }
-                }
-            }
-            condition = condition.join(' ');
-
-            // Associate conditional statements with tasks.
-            for (let right of dep[1].split(conditional_regex)) {
-                right = right.trim();
-                if (!this.dependencies[right]) {
-                    this.dependencies[right] = [];
-                }
-                this.dependencies[right].push(condition);
-            }
-        }
-    }
-
-    evaluate_dependencies(task) {
-        /**
-         * Check if a task's dependencies are satisfied.
-         * @param task The name of the task to evaluate.
-         * @return true if satisfied else false.
-         */
-        var deps = this.dependencies[task];
-        if (!deps) {
-            return true;
-        }
-        for (let dep of deps) {
-            if (eval(dep) == 0) {
-                return false;
-            }
-        }
-        return true;
+        this.ellipses = ellipses;
     }
 
     _style_node(node, fill, stroke) {
@@ -240,31 +293,20 @@ class MiniCylc {
         if (!stroke) {
             stroke = 'black';  // Default to a black border.
         }
-        // Style nodes.
-        $($(this.nodes[node]).find('ellipse:first')).attr({
-            'fill': fill,
-            'stroke': stroke
-        });
+        // Style nodes (in the next frame).
+        minicylc_scheduler.style(this.ellipses[node], fill, stroke);
     }
 
-    _style() {
+    _style(tasks, state) {
         /**
-         * Refresh the style of graph nodes based on their state.
+         * Style graph nodes to reflect their state.
+         * @param tasks An array of task names.
+         * @param state The task state e.g. 'waiting'.
          */
-        for (let task of this.waiting) {
-            this._style_node(task,
-                             this.theme['waiting_fill'],
-                             this.theme['waiting_stroke']);
-        }
-        for (let task of this.running) {
-            this._style_node(task,
-                             this.theme['running_fill'],
-                             this.theme['running_stroke']);
-        }
-        for (let task of this.succeed) {
+        for (let task of tasks) {
             this._style_node(task,
-                             this.theme['succeed_fill'],
-                             this.theme['succeed_stroke']);
+                             this.theme[state + '_fill'],
+                             this.theme[state + '_stroke']);
         }
     }
 
@@ -272,65 +314,41 @@ class MiniCylc {
         /**
          * Initiate the simulation / animation.
          */
-        this.waiting = new Set();
-        this.running = new Set();
-        this.succeed = new Set();
-        for (let task in this.nodes) {
-            this.waiting.add(task);
-        }
-        this._style();
+        this.step = 0;
+        this.running = [];
+        this._style(this.timeline.tasks, 'waiting');
     }
 
     _advance() {
         /*
-         * To be called with each main loop.
-         * @return true if the task pool has changed else false.
+         * To be called with each main loop, applies the next step.
+         * @return true if there was a step to apply else false.
          */
-        var changed = false;
-        for (let task of this.running) {
-            this.running.delete(task);
-            this.succeed.add(task);
-            changed = true;
-        }
-        for (let task of this.waiting) {
-            if (this.evaluate_dependencies(task)) {
-                this.waiting.delete(task);
-                this.running.add(task);
-                changed = true;
-            }
+        if (this.step >= this.timeline.steps.length) {
+            return false;
         }
-        return changed;
+        const tasks = this.timeline.tasks;
+        this._style(this.running, 'succeed');
+        this.running = this.timeline.steps[this.step].map(ind => tasks[ind]);
+        this._style(this.running, 'running');
+        this.step++;
+        return true;
     }
 
-    _main_loop(itt) {
+    _main_loop() {
         /*
-         * The main loop - runs the simulation and handles restyling of nodes.
-         * Note function calls itself recursively.
+         * The main loop - steps through the animation.
+         * Called by minicylc_scheduler at each tick.
          */
-        var exit = false;
-
-        // Action.
-        if (this._advance()) {  // Advance the task pool.
-            // If anything has changed restyle.
-            this._style();
-        } else {
-            // If nothing has changed...
-            if (this.waiting.size == 0 && this.running.size == 0) {
-                // The simulation has ended, reset and restart.
-                this._init();
-            } else {
-                // The worklfow stalled, log a console message and do nothing.
-                exit = true;
-                console.log('Workflow stalled :(');
+        if (!this._advance()) {
+            if (this.timeline.stalled) {
+                // The workflow stalled (reported at build time), stop here.
+                this.stalled = true;
+                minicylc_scheduler.stop(this);
+                return;
             }
-        }
-
-        // Callback.
-        if (!exit) {
-            var self_ref = this;
-            setTimeout(function(){
-               self_ref._main_loop(itt + 1);
-            }, 3000);
+            // The simulation has ended, reset and restart.
+            this._init();
         }
     }
 
@@ -339,7 +357,10 @@ class MiniCylc {
          * Run this simulation.
          */
         this._init();
-        this._main_loop(0);
+        if (this.active()) {
+            this._main_loop();
+        }
+        this.update();
     }
 
 }
@@ -347,8 +368,31 @@ class MiniCylc {
 
 // Activate minicylc.
 $(document).ready(function() {
+    const graphs = new Map();
     $('.minicylc').each(function() {
-        var obj = this;
-        new MiniCylc(obj);
+        graphs.set(this, new MiniCylc(this));
+    });
+
+    // Run graphs while they are within the viewport.
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(function(entries) {
+            for (let entry of entries) {
+                graphs.get(entry.target).set_visible(entry.isIntersecting);
+            }
+        });
+        for (let div of graphs.keys()) {
+            observer.observe(div);
+        }
+    } else {
+        for (let graph of graphs.values()) {
+            graph.set_visible(true);
+        }
+    }
+
+    // Pause graphs while the page is hidden (e.g. in a background tab).
+    document.addEventListener('visibilitychange', function() {
+        for (let graph of graphs.values()) {
+            graph.update();
+        }
     });
 });
@@ -0,0 +1,230 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""A cache of rendered graphs which persists between builds.
+
+``sphinx.ext.graphviz`` re-uses images left in the output directory by
+previous builds, this cache lives outside of the output directory so
+images survive ``make clean`` (and can be shared between projects).
+
+Entries are keyed by the dot code, output format, dot arguments and
+graphviz version. The least recently used entries are removed when the
+cache grows beyond its size limit.
+
+"""
+
+from functools import lru_cache
+from hashlib import sha1, sha256
+import os
+from pathlib import Path
+import shutil
+import subprocess
+
+from sphinx.util import logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+@lru_cache()
+def graphviz_version(dot):
+    """Return the version string of a dot executable (or None)."""
+    try:
+        proc = subprocess.run(
+            [dot, '-V'],
+            capture_output=True,
+            check=True,
+            text=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return (proc.stderr or proc.stdout).strip() or None
+
+
+def output_files(builder, code, options, format, prefix='graphviz'):
+    """Return the files ``sphinx.ext.graphviz`` renders a graph to.
+
+    This follows the naming of ``sphinx.ext.graphviz.render_dot`` which is
+    private to Sphinx, it is unchanged from Sphinx 2.1 (the minimum version
+    supported) to 9.0. If it changes, graphs rendered in advance are not
+    found and ``sphinx.ext.graphviz`` renders them again (as if this
+    extension did not pre-render or cache graphs), so this must be kept in
+    step with Sphinx.
+
+    """
+    dot = options.get('graphviz_dot', builder.config.graphviz_dot)
+    hashkey = ''.join((
+        code,
+        str(options),
+        str(dot),
+        str(builder.config.graphviz_dot_args),
+    )).encode()
+    fname = f'{prefix}-{sha1(hashkey).hexdigest()}.{format}'
+    outfn = Path(builder.outdir, builder.imagedir, fname)
+    if format == 'png':
+        # the image map
+        return [outfn, outfn.with_name(f'{fname}.map')]
+    return [outfn]
+
+
+class RenderCache:
+    """A directory of rendered graphs.
+
+    Args:
+        path:
+            The cache directory.
+        max_size:
+            The maximum size of the cache in bytes.
+
+    """
+
+    def __init__(self, path, max_size):
+        self.path = Path(path).expanduser()
+        self.max_size = max_size
+
+    @staticmethod
+    def key(code, format, dot_args, version):
+        """Return the cache key for a rendering.
+
+        Examples:
+            >>> key = RenderCache.key('digraph {a}', 'svg', [], 'dot 1')
+            >>> key == RenderCache.key('digraph {a}', 'svg', [], 'dot 2')
+            False
+
+        """
+        return sha256(
+            repr((code, format, list(dot_args), version)).encode()
+        ).hexdigest()
+
+    def _entries(self, key, outfns):
+        # e.g. <key>.png, <key>.png.map
+        return [
+            self.path / f'{key}{"".join(outfn.suffixes)}'
+            for outfn in outfns
+        ]
+
+    def fetch(self, key, outfns):
+        """Copy a cached rendering to the output files.
+
+        Returns:
+            bool - True if the rendering was in the cache.
+
+        """
+        entries = self._entries(key, outfns)
+        if not all(entry.is_file() for entry in entries):
+            return False
+        for entry, outfn in zip(entries, outfns):
+            outfn.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry, outfn)
+            # mark the entry as recently used
+            os.utime(entry)
+        return True
+
+    def store(self, key, outfns):
+        """Add rendered output files to the cache."""
+        entries = self._entries(key, outfns)
+        if (
+            all(entry.is_file() for entry in entries)
+            or not all(outfn.is_file() for outfn in outfns)
+        ):
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        for entry, outfn in zip(entries, outfns):
+            # copy then rename so readers never see partial files
+            tmp = entry.with_name(f'.{entry.name}.{os.getpid()}')
+            shutil.copyfile(outfn, tmp)
+            os.replace(tmp, entry)
+
+    def evict(self):
+        """Remove the least recently used entries until under the limit.
+
+        Returns:
+            int - The number of files removed.
+
+        """
+        try:
+            entries = [
+                (path.stat(), path)
+                for path in self.path.iterdir()
+                if path.is_file()
+            ]
+        except FileNotFoundError:
+            return 0
+        size = sum(stat.st_size for stat, _ in entries)
+        removed = 0
+        for stat, path in sorted(entries, key=lambda x: x[0].st_mtime_ns):
+            if size <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= stat.st_size
+            removed += 1
+        return removed
+
+
+def get_cache(builder):
+    """Return the render cache for a build (or None if disabled)."""
+    path = builder.config.minicylc_cache_dir
+    if not path:
+        return None
+    return RenderCache(path, builder.config.minicylc_cache_size)
+
+
+def fetch_rendering(builder, code, options, format):
+    """Populate the output files for a graph from the cache.
+
+    Returns:
+        tuple - (cache, key, output_files) or None if the cache is not in
+        use for this graph.
+
+    """
+    cache = get_cache(builder)
+    if cache is None:
+        return None
+    dot = options.get('graphviz_dot', builder.config.graphviz_dot)
+    version = graphviz_version(dot)
+    if version is None:
+        # we can't tell which graphviz would render this
+        return None
+    outfns = output_files(builder, code, options, format)
+    key = cache.key(code, format, builder.config.graphviz_dot_args, version)
+    if not outfns[0].is_file():
+        cache.fetch(key, outfns)
+    return cache, key, outfns
+
+
+def store_rendering(cached):
+    """Add a rendering to the cache (see ``fetch_rendering``)."""
+    if cached is None:
+        return
+    cache, key, outfns = cached
+    try:
+        cache.store(key, outfns)
+    except OSError as exc:
+        LOG.warning(f'minicylc: could not write to the render cache: {exc}')
+
+
+def evict(app, exception):
+    """Trim the render cache at the end of the build."""
+    if exception or not app.config.minicylc_cache_dir:
+        return
+    RenderCache(
+        app.config.minicylc_cache_dir,
+        app.config.minicylc_cache_size
+    ).evict()
@@ -0,0 +1,218 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Unroll cycling graphs over a number of cycle points.
+
+The graph is repeated at each cycle point with tasks named
+``<point>/<task>`` as in Cylc. Intercycle offsets (``foo[-P1]``) are
+resolved by looking up the offset point in a map of the unrolled points,
+dependencies on points outside of the unrolled range (e.g. before the
+first point) are taken as satisfied.
+
+Integer cycling starts at point ``1``, datetime cycling starts at
+``20000101T0000Z``. Datetime intervals may use weeks, days, hours, minutes
+and seconds (years and months vary in length so are not supported).
+
+"""
+
+from datetime import datetime, timedelta, timezone
+import re
+
+from cylc.sphinx_ext.minicylc.graph import (
+    And,
+    Or,
+    Task,
+    XTrigger,
+    iter_tasks,
+    parse_lines
+)
+
+
+INTEGER_REGEX = re.compile(r'^([+-])?P(\d+)$')
+
+DURATION_REGEX = re.compile(
+    r'''
+    ^([+-])?P
+    (?:(?P<W>\d+)W)?
+    (?:(?P<D>\d+)D)?
+    (?:T
+        (?:(?P<H>\d+)H)?
+        (?:(?P<M>\d+)M)?
+        (?:(?P<S>\d+)S)?
+    )?$
+    ''',
+    re.X
+)
+
+DURATION_SECONDS = {'W': 604800, 'D': 86400, 'H': 3600, 'M': 60, 'S': 1}
+
+INITIAL_DATETIME = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+class CyclingError(ValueError):
+    """Raised for cycling graphs which cannot be unrolled."""
+
+
+def parse_interval(interval):
+    """Return an interval as a number.
+
+    Returns:
+        tuple - (value, datetime) where ``value`` is a number of cycles
+        for integer intervals or seconds for datetime intervals.
+
+    Examples:
+        >>> parse_interval('P2')
+        (2, False)
+        >>> parse_interval('-P1DT6H')
+        (-108000, True)
+
+    """
+    match = INTEGER_REGEX.match(interval)
+    if match:
+        sign, value = match.groups()
+        return (-1 if sign == '-' else 1) * int(value), False
+    match = DURATION_REGEX.match(interval)
+    if match and any(match.groupdict().values()):
+        value = sum(
+            int(number) * DURATION_SECONDS[unit]
+            for unit, number in match.groupdict().items()
+            if number
+        )
+        return (-1 if match.group(1) == '-' else 1) * value, True
+    raise CyclingError(
+        f'Invalid interval "{interval}", expected an integer (e.g. "P1")'
+        ' or datetime (e.g. "PT6H") duration.'
+    )
+
+
+def format_point(value, is_datetime):
+    """Return the Cylc representation of a cycle point.
+
+    Examples:
+        >>> format_point(3, False)
+        '3'
+        >>> format_point(21600, True)
+        '20000101T0600Z'
+
+    """
+    if is_datetime:
+        point = INITIAL_DATETIME + timedelta(seconds=value)
+        return point.strftime('%Y%m%dT%H%MZ')
+    return str(value)
+
+
+def count_tasks(graph_lines):
+    """Return the number of tasks at each cycle point.
+
+    Examples:
+        >>> count_tasks(['foo[-P1] => foo => bar', '@x => !baz'])
+        3
+
+    """
+    return len({
+        task.name
+        for exprs in parse_lines(graph_lines)
+        for expr in exprs
+        for task, _ in iter_tasks(expr)
+    })
+
+
+def unroll(graph_lines, cycles, recurrence='P1', max_tasks=None):
+    """Repeat a graph over a number of cycle points.
+
+    Args:
+        graph_lines:
+            The graph.
+        cycles:
+            The number of cycle points to unroll.
+        recurrence:
+            The interval between cycle points.
+        max_tasks:
+            Raise CyclingError if the unrolled graph would contain more
+            than this many tasks.
+
+    Returns:
+        tuple - (points, lines) where ``points`` are the names of the
+        cycle points and ``lines`` are the parsed lines of the unrolled
+        graph.
+
+    Examples:
+        >>> from cylc.sphinx_ext.minicylc.graph import get_triggers
+        >>> points, lines = unroll(['foo[-P1] => foo'], 3)
+        >>> points
+        ['1', '2', '3']
+        >>> [(left, right) for left, right, _ in get_triggers(lines)]
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [(None, '1/foo'), ('1/foo', '2/foo'), (None, '2/foo'),
+         ('2/foo', '3/foo'), (None, '3/foo')]
+
+    """
+    step, is_datetime = parse_interval(recurrence)
+    if step <= 0:
+        raise CyclingError(
+            f'The recurrence must be a positive interval: {recurrence}'
+        )
+    parsed = list(parse_lines(graph_lines))
+    if max_tasks is not None:
+        total = count_tasks(parsed) * cycles
+        if total > max_tasks:
+            raise CyclingError(
+                f'Unrolling this graph over {cycles} cycles would create'
+                f' {total} tasks, the limit is {max_tasks}.'
+            )
+
+    # {point value: index}
+    start = 0 if is_datetime else 1
+    values = [start + ind * step for ind in range(cycles)]
+    point_map = {value: ind for ind, value in enumerate(values)}
+    points = [format_point(value, is_datetime) for value in values]
+
+    def resolve(expr, value):
+        if isinstance(expr, Task):
+            target = value
+            offset = expr.offset
+            if offset and offset.startswith('^'):
+                target = start
+                offset = offset[1:]
+            if offset:
+                offset_value, offset_datetime = parse_interval(offset)
+                if offset_datetime != is_datetime:
+                    raise CyclingError(
+                        f'The offset "{expr.offset}" does not match the'
+                        f' recurrence "{recurrence}".'
+                    )
+                target += offset_value
+            ind = point_map.get(target)
+            if ind is None:
+                # outside of the unrolled points (taken as satisfied)
+                return XTrigger(f'@{expr.name}[{expr.offset}]')
+            return expr._replace(
+                name=f'{points[ind]}/{expr.name}',
+                offset=None
+            )
+        if isinstance(expr, (And, Or)):
+            return type(expr)(
+                tuple(resolve(item, value) for item in expr.items)
+            )
+        return expr
+
+    lines = [
+        [resolve(expr, value) for expr in exprs]
+        for value in values
+        for exprs in parsed
+    ]
+    return points, lines
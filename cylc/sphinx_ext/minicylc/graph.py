@@ -0,0 +1,316 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Parser for Cylc graph strings.
+
+Graph lines are tokenised then parsed (recursive descent) into a list of
+expressions, one for each side of each ``=>``::
+
+   line := expr ('=>' expr)*
+   expr := and ('|' and)*
+   and  := atom ('&' atom)*
+   atom := '(' expr ')' | task | xtrigger | '!' task
+
+Both steps are linear in the length of the line.
+
+"""
+
+from collections import namedtuple
+import re
+
+
+Task = namedtuple(
+    'Task',
+    [
+        # the task name including any parameters e.g. "foo<m>"
+        'name',
+        # the intercycle offset e.g. "-P1D" (or None)
+        'offset',
+        # the output qualifier e.g. "fail" (or None for "succeed")
+        'output',
+        # True if the output is optional i.e. "foo?"
+        'optional',
+        # True for suicide triggers i.e. "!foo"
+        'suicide'
+    ]
+)
+
+XTrigger = namedtuple('XTrigger', ['name'])
+
+And = namedtuple('And', ['items'])
+
+Or = namedtuple('Or', ['items'])
+
+
+class GraphParseError(ValueError):
+    """Raised for graph strings which cannot be parsed."""
+
+
+TOKEN_REGEX = re.compile(
+    r'''
+    (?P<space>\s+)
+    | (?P<comment>\#.*)
+    | (?P<arrow>=>)
+    | (?P<and>&)
+    | (?P<or>\|)
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<suicide>!)
+    | (?P<xtrigger>@\w+)
+    | (?P<task>
+        (?P<name>[\w\-+%]+(?:<[^<>]+>)?|<[^<>]+>)
+        (?:\[(?P<offset>[^\]]*)\])?
+        (?::(?P<output>[\w\-]+))?
+        (?P<optional>\?)?
+    )
+    ''',
+    re.X
+)
+
+
+def tokenise(line):
+    """Split a graph line into tokens.
+
+    Returns:
+        list - [(kind, value, column), ...] where ``value`` is a ``Task``
+        for "task" tokens, otherwise the text of the token.
+
+    Examples:
+        >>> [kind for kind, *_ in tokenise('a & (b | @c) => !d')]
+        ... # doctest: +NORMALIZE_WHITESPACE
+        ['task', 'and', 'open', 'task', 'or', 'xtrigger', 'close', 'arrow',
+         'suicide', 'task']
+        >>> tokenise('foo<m>[-P1D]:fail?')[0][1]
+        ... # doctest: +NORMALIZE_WHITESPACE
+        Task(name='foo<m>', offset='-P1D', output='fail', optional=True,
+             suicide=False)
+
+    """
+    tokens = []
+    pos = 0
+    while pos < len(line):
+        match = TOKEN_REGEX.match(line, pos)
+        if not match:
+            raise GraphParseError(
+                f'Invalid character "{line[pos]}" at column {pos + 1}:'
+                f' {line}'
+            )
+        kind = match.lastgroup
+        if match.group('task'):
+            value = Task(
+                match.group('name'),
+                match.group('offset'),
+                match.group('output'),
+                bool(match.group('optional')),
+                False
+            )
+            tokens.append(('task', value, pos + 1))
+        elif kind not in ('space', 'comment'):
+            tokens.append((kind, match.group(), pos + 1))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser for a single graph line."""
+
+    def __init__(self, line):
+        self.line = line
+        self.tokens = tokenise(line)
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][0]
+        return None
+
+    def error(self, msg):
+        if self.pos < len(self.tokens):
+            column = self.tokens[self.pos][2]
+        else:
+            column = len(self.line) + 1
+        return GraphParseError(f'{msg} at column {column}: {self.line}')
+
+    def expect(self, kind):
+        if self.peek() != kind:
+            raise self.error(f'Expected "{kind}"')
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def line_(self):
+        exprs = [self.expr()]
+        while self.peek() == 'arrow':
+            self.pos += 1
+            exprs.append(self.expr())
+        if self.peek() is not None:
+            column = self.tokens[self.pos][2]
+            raise self.error(
+                f'Unexpected "{self.line[column - 1:].split()[0]}"'
+            )
+        return exprs
+
+    def expr(self):
+        items = [self.and_()]
+        while self.peek() == 'or':
+            self.pos += 1
+            items.append(self.and_())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def and_(self):
+        items = [self.atom()]
+        while self.peek() == 'and':
+            self.pos += 1
+            items.append(self.atom())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def atom(self):
+        kind = self.peek()
+        if kind == 'open':
+            self.pos += 1
+            ret = self.expr()
+            self.expect('close')
+            return ret
+        if kind == 'task':
+            return self.expect('task')
+        if kind == 'xtrigger':
+            return XTrigger(self.expect('xtrigger'))
+        if kind == 'suicide':
+            self.pos += 1
+            return self.expect('task')._replace(suicide=True)
+        raise self.error('Expected a task')
+
+
+def parse(line):
+    """Parse a graph line.
+
+    Returns:
+        list - The expressions either side of each ``=>``.
+
+    Examples:
+        >>> parse('a => b')
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [Task(name='a', offset=None, output=None, optional=False,
+              suicide=False),
+         Task(name='b', offset=None, output=None, optional=False,
+              suicide=False)]
+        >>> [type(expr).__name__ for expr in parse('a | b & c => d')]
+        ['Or', 'Task']
+
+    """
+    parser = _Parser(line)
+    if parser.peek() is None:
+        return []
+    exprs = parser.line_()
+    for expr in exprs[1:]:
+        if not isinstance(expr, (Task, And)) or (
+            isinstance(expr, And)
+            and not all(isinstance(item, Task) for item in expr.items)
+        ):
+            raise GraphParseError(
+                'The right hand side of a dependency must be a task or'
+                f' tasks joined by "&": {line}'
+            )
+    return exprs
+
+
+def parse_lines(graph_lines):
+    """Yield the parsed form of each graph line.
+
+    Lines may be strings or already parsed (e.g. the lines of an unrolled
+    cycling graph).
+
+    Examples:
+        >>> [len(exprs) for exprs in parse_lines(['a => b', parse('c')])]
+        [2, 1]
+
+    """
+    for line in graph_lines:
+        yield parse(line) if isinstance(line, str) else line
+
+
+def task_id(task):
+    """Return the graph node name for a task.
+
+    Examples:
+        >>> task_id(tokenise('foo[-P1D]:fail?')[0][1])
+        'foo[-P1D]'
+
+    """
+    if task.offset:
+        return f'{task.name}[{task.offset}]'
+    return task.name
+
+
+def iter_tasks(expr, conditional=False):
+    """Yield the tasks in an expression.
+
+    Yields:
+        tuple - (task, conditional) where ``conditional`` is True if the
+        task is within an "|" expression.
+
+    """
+    if isinstance(expr, Task):
+        yield expr, conditional
+    elif isinstance(expr, (And, Or)):
+        conditional = conditional or isinstance(expr, Or)
+        for item in expr.items:
+            yield from iter_tasks(item, conditional)
+
+
+def get_triggers(graph_lines):
+    """Return the edges of a graph.
+
+    Suicide triggers and xtriggers are not drawn.
+
+    Returns:
+        list - [(left, right, conditional), ...] where ``left`` is None for
+        the tasks at the end of each line. Edges are listed once, in the
+        order they first appear in the graph, so the same graph always
+        produces the same dot code.
+
+    Examples:
+        >>> get_triggers(['a & (b | c) => d'])
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [('a', 'd', False), ('b', 'd', True), ('c', 'd', True),
+         (None, 'd', False)]
+
+        Tasks which only trigger suicides are still drawn:
+        >>> get_triggers(['a => !b'])
+        [(None, 'a', False)]
+
+    """
+    # {trigger: None} (a set which remembers the insertion order)
+    trigs = {}
+    for exprs in parse_lines(graph_lines):
+        for left, right in zip(exprs, exprs[1:]):
+            right_tasks = [
+                right_task
+                for right_task, _ in iter_tasks(right)
+                if not right_task.suicide
+            ]
+            for left_task, conditional in iter_tasks(left):
+                for right_task in right_tasks:
+                    trigs[
+                        (task_id(left_task), task_id(right_task), conditional)
+                    ] = None
+                if not right_tasks:
+                    trigs[(None, task_id(left_task), False)] = None
+        if exprs:
+            for task, _ in iter_tasks(exprs[-1]):
+                if not task.suicide:
+                    trigs[(None, task_id(task), False)] = None
+    return list(trigs)
@@ -0,0 +1,481 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""A layered (Sugiyama style) graph layout and SVG writer.
+
+This lays out small graphs without running graphviz:
+
+1. Cycles are broken by reversing edges.
+2. Nodes are assigned to layers by longest path.
+3. Edges which span multiple layers are split up with dummy nodes.
+4. Crossings are reduced by barycentre ordering, sweeping up and down.
+5. Nodes are positioned under the average of their neighbours.
+
+The SVG has the same structure as graphviz output (``g.node`` and
+``g.edge`` elements with ``<title>`` elements naming them) so it can be
+animated by ``minicylc.js``. Sizes are in points, as with graphviz.
+
+"""
+
+from collections import namedtuple
+from html import escape
+import re
+
+
+# node height and minimum width (as graphviz)
+NODE_HEIGHT = 36
+NODE_MIN_WIDTH = 54
+# approximate width of a character in the node font
+CHAR_WIDTH = 8.4
+FONT_SIZE = 14
+# the space between layers and between nodes in a layer
+RANK_SEP = 36
+NODE_SEP = 18
+# the space around the graph
+MARGIN = 4
+# the length and half width of arrowheads
+ARROW_LENGTH = 10
+ARROW_WIDTH = 3.5
+# the number of up/down sweeps used to reduce crossings
+ORDER_SWEEPS = 8
+# the number of passes used to position nodes
+POSITION_PASSES = 8
+
+Layout = namedtuple(
+    'Layout',
+    [
+        # {name: (x, y, rx, ry)}
+        'nodes',
+        # [(left, right, conditional, [(x, y), ...]), ...]
+        'edges',
+        'width',
+        'height'
+    ]
+)
+
+
+def get_graph(triggers):
+    """Return the nodes and edges from ``graph.get_triggers`` output.
+
+    Examples:
+        >>> get_graph([('a', 'b', False), (None, 'b', False), ('c', 'c', 0)])
+        (['a', 'b', 'c'], [('a', 'b', False), ('c', 'c', 0)])
+
+    """
+    nodes = {}
+    edges = []
+    for left, right, conditional in triggers:
+        if left is not None:
+            nodes[left] = None
+            edges.append((left, right, conditional))
+        nodes[right] = None
+    return list(nodes), edges
+
+
+def acyclic(nodes, edges):
+    """Return the edges with those which close cycles reversed.
+
+    Examples:
+        >>> acyclic(['a', 'b'], [('a', 'b'), ('b', 'a'), ('a', 'a')])
+        [('a', 'b'), ('a', 'b')]
+
+    """
+    succs = {node: [] for node in nodes}
+    for left, right in edges:
+        succs[left].append(right)
+    # depth first search, edges to nodes on the stack are back edges
+    state = dict.fromkeys(nodes, 0)  # 0: new, 1: on stack, 2: done
+    back = set()
+    for root in nodes:
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(succs[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state[child] == 1:
+                    back.add((node, child))
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(succs[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return [
+        (right, left) if (left, right) in back else (left, right)
+        for left, right in edges
+        if left != right
+    ]
+
+
+def assign_layers(nodes, edges):
+    """Assign each node to a layer by longest path from the sources.
+
+    Examples:
+        >>> assign_layers(
+        ...     ['a', 'b', 'c'], [('a', 'b'), ('b', 'c'), ('a', 'c')])
+        {'a': 0, 'b': 1, 'c': 2}
+
+    """
+    succs = {node: [] for node in nodes}
+    indegree = dict.fromkeys(nodes, 0)
+    for left, right in edges:
+        succs[left].append(right)
+        indegree[right] += 1
+    layers = dict.fromkeys(nodes, 0)
+    ready = [node for node in nodes if not indegree[node]]
+    while ready:
+        node = ready.pop()
+        for child in succs[node]:
+            layers[child] = max(layers[child], layers[node] + 1)
+            indegree[child] -= 1
+            if not indegree[child]:
+                ready.append(child)
+    return layers
+
+
+def node_radii(name):
+    """Return the radii of the ellipse for a node."""
+    width = max(NODE_MIN_WIDTH, len(name) * CHAR_WIDTH + 2 * NODE_SEP)
+    return width / 2, NODE_HEIGHT / 2
+
+
+def count_crossings(rows, succs):
+    """Return the number of edge crossings between adjacent layers.
+
+    Examples:
+        >>> count_crossings(
+        ...     [['a', 'b'], ['c', 'd']], {'a': ['d'], 'b': ['c']})
+        1
+
+    """
+    total = 0
+    for upper, lower in zip(rows, rows[1:]):
+        pos = {node: ind for ind, node in enumerate(lower)}
+        ends = [
+            end
+            for node in upper
+            for end in sorted(pos[child] for child in succs[node])
+        ]
+        # edges cross where their ends are out of order
+        total += sum(
+            1
+            for ind, end in enumerate(ends)
+            for other in ends[ind + 1:]
+            if other < end
+        )
+    return total
+
+
+def order_layers(rows, preds, succs):
+    """Reduce edge crossings by ordering the nodes in each layer by the
+    barycentre of their neighbours, alternately sweeping down and up."""
+    def sweep(inds, neighbours, step):
+        for ind in inds:
+            pos = {node: x for x, node in enumerate(rows[ind - step])}
+            current = {node: x for x, node in enumerate(rows[ind])}
+
+            def barycentre(node):
+                adjacent = [pos[other] for other in neighbours[node]]
+                if not adjacent:
+                    return current[node]
+                return sum(adjacent) / len(adjacent)
+
+            rows[ind].sort(key=lambda node: (barycentre(node), current[node]))
+
+    best = [list(row) for row in rows]
+    best_crossings = count_crossings(rows, succs)
+    for ind in range(ORDER_SWEEPS):
+        if not best_crossings:
+            break
+        if ind % 2:
+            sweep(range(len(rows) - 2, -1, -1), succs, -1)
+        else:
+            sweep(range(1, len(rows)), preds, 1)
+        crossings = count_crossings(rows, succs)
+        if crossings < best_crossings:
+            best = [list(row) for row in rows]
+            best_crossings = crossings
+    rows[:] = best
+
+
+def pack(desired, widths):
+    """Position nodes as close as possible to where they want to be
+    without overlapping or changing their order.
+
+    Examples:
+        >>> pack([0, 0, 0], [10, 10, 10])
+        [-28.0, 0.0, 28.0]
+
+    """
+    gaps = [
+        (widths[ind - 1] + widths[ind]) / 2 + NODE_SEP
+        for ind in range(1, len(widths))
+    ]
+    # push nodes right of their left neighbour
+    left = list(desired)
+    for ind, gap in enumerate(gaps, 1):
+        left[ind] = max(left[ind], left[ind - 1] + gap)
+    # push nodes left of their right neighbour
+    right = list(desired)
+    for ind in range(len(gaps) - 1, -1, -1):
+        right[ind] = min(right[ind], right[ind + 1] - gaps[ind])
+    # both are valid positions, so is their average
+    return [(x + y) / 2 for x, y in zip(left, right)]
+
+
+def layout(triggers):
+    """Lay out a graph.
+
+    Args:
+        triggers (list):
+            The output of ``graph.get_triggers``.
+
+    Returns:
+        Layout
+
+    """
+    nodes, all_edges = get_graph(triggers)
+    # (edges in both directions become one edge)
+    edges = list(dict.fromkeys(
+        acyclic(nodes, [(left, right) for left, right, _ in all_edges])
+    ))
+    layers = assign_layers(nodes, edges)
+
+    # split long edges with dummy nodes
+    rows = [[] for _ in range(max(layers.values(), default=-1) + 1)]
+    for node in nodes:
+        rows[layers[node]].append(node)
+    preds = {node: [] for node in nodes}
+    succs = {node: [] for node in nodes}
+    chains = {}
+    for left, right in edges:
+        chain = [left]
+        for layer in range(layers[left] + 1, layers[right]):
+            dummy = (left, right, layer)
+            rows[layer].append(dummy)
+            preds[dummy] = []
+            succs[dummy] = []
+            chain.append(dummy)
+        chain.append(right)
+        for upper, lower in zip(chain, chain[1:]):
+            succs[upper].append(lower)
+            preds[lower].append(upper)
+        chains[(left, right)] = chain
+
+    order_layers(rows, preds, succs)
+
+    # horizontal positions
+    widths = {}
+    for node in preds:
+        if isinstance(node, tuple):
+            widths[node] = 0
+        else:
+            widths[node] = node_radii(node)[0] * 2
+    xpos = {}
+    for row in rows:
+        xs = pack([0] * len(row), [widths[node] for node in row])
+        xpos.update(zip(row, xs))
+    for ind in range(POSITION_PASSES):
+        down = ind % 2 == 0
+        for row in (rows if down else reversed(rows)):
+            desired = []
+            for node in row:
+                adjacent = preds[node] if down else succs[node]
+                if adjacent:
+                    desired.append(
+                        sum(xpos[x] for x in adjacent) / len(adjacent)
+                    )
+                else:
+                    desired.append(xpos[node])
+            xs = pack(desired, [widths[node] for node in row])
+            xpos.update(zip(row, xs))
+
+    # move the graph into view
+    min_x = min(
+        (xpos[node] - widths[node] / 2 for node in xpos),
+        default=0
+    )
+    max_x = max(
+        (xpos[node] + widths[node] / 2 for node in xpos),
+        default=0
+    )
+    offset = MARGIN - min_x
+    ypos = {}
+    for ind, row in enumerate(rows):
+        y = MARGIN + NODE_HEIGHT / 2 + ind * (NODE_HEIGHT + RANK_SEP)
+        for node in row:
+            ypos[node] = y
+            xpos[node] += offset
+
+    ret_nodes = {
+        node: (xpos[node], ypos[node], *node_radii(node))
+        for node in nodes
+    }
+    ret_edges = []
+    for left, right, conditional in all_edges:
+        if left == right:
+            # self edges are not drawn
+            continue
+        if (left, right) in chains:
+            chain = chains[(left, right)]
+        else:
+            # reversed edge
+            chain = list(reversed(chains[(right, left)]))
+        points = [(xpos[node], ypos[node]) for node in chain]
+        ret_edges.append((left, right, conditional, points))
+
+    return Layout(
+        ret_nodes,
+        ret_edges,
+        max_x - min_x + 2 * MARGIN,
+        len(rows) * (NODE_HEIGHT + RANK_SEP) - RANK_SEP + 2 * MARGIN
+    )
+
+
+def edge_path(points, ry):
+    """Return the SVG path and arrowhead points for an edge.
+
+    The edge runs between the centres of the nodes at either end via the
+    given points, it is clipped to the top/bottom of the end nodes.
+
+    """
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    down = 1 if y1 > y0 else -1
+    points = list(points)
+    points[0] = (x0, y0 + down * ry)
+    points[-1] = (x1, y1 - down * ry)
+    # leave room for the arrowhead
+    tip = points[-1]
+    points[-1] = (tip[0], tip[1] - down * ARROW_LENGTH)
+
+    path = [f'M{fmt(points[0][0])},{fmt(points[0][1])}']
+    for (ax, ay), (bx, by) in zip(points, points[1:]):
+        mid = (ay + by) / 2
+        path.append(
+            f'C{fmt(ax)},{fmt(mid)} {fmt(bx)},{fmt(mid)} {fmt(bx)},{fmt(by)}'
+        )
+    base_y = points[-1][1]
+    arrow = [
+        (tip[0] - ARROW_WIDTH, base_y),
+        tip,
+        (tip[0] + ARROW_WIDTH, base_y),
+    ]
+    return ' '.join(path), arrow
+
+
+def fmt(number):
+    """Format a coordinate.
+
+    Examples:
+        >>> fmt(1), fmt(1.256), fmt(-0.001)
+        ('1', '1.26', '0')
+
+    """
+    ret = f'{number:.2f}'.rstrip('0').rstrip('.')
+    return '0' if ret == '-0' else ret
+
+
+def parse_size(size):
+    """Return the graphviz size attribute as a maximum (width, height).
+
+    Examples:
+        >>> parse_size('7,3')
+        (504.0, 216.0)
+        >>> parse_size('5!')
+        (360.0, 360.0)
+
+    """
+    values = [float(x) * 72 for x in re.findall(r'[\d.]+', size)]
+    if len(values) == 1:
+        values.append(values[0])
+    return tuple(values[:2])
+
+
+def to_svg(graph, size=None, title='Mini_Cylc'):
+    """Write a layout as an SVG document.
+
+    Args:
+        graph (Layout):
+            The layout.
+        size (str):
+            The graphviz size attribute, graphs larger than this are
+            scaled down.
+        title (str):
+            The title of the graph.
+
+    """
+    width, height = graph.width, graph.height
+    scale = 1
+    if size:
+        max_width, max_height = parse_size(size)
+        scale = min(1, max_width / width, max_height / height)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+        f'<svg width="{fmt(width * scale)}pt"'
+        f' height="{fmt(height * scale)}pt"'
+        f' viewBox="0 0 {fmt(width)} {fmt(height)}"'
+        ' xmlns="http://www.w3.org/2000/svg">',
+        '<g id="graph0" class="graph">',
+        f'<title>{escape(title)}</title>',
+    ]
+    for ind, (name, (x, y, rx, ry)) in enumerate(graph.nodes.items(), 1):
+        lines.extend([
+            f'<g id="node{ind}" class="node">',
+            f'<title>{escape(name)}</title>',
+            f'<ellipse fill="none" stroke="black" cx="{fmt(x)}"'
+            f' cy="{fmt(y)}" rx="{fmt(rx)}" ry="{fmt(ry)}"/>',
+            f'<text text-anchor="middle" x="{fmt(x)}"'
+            f' y="{fmt(y + FONT_SIZE * 0.35)}" font-family="sans-serif"'
+            f' font-size="{FONT_SIZE}">{escape(name)}</text>',
+            '</g>',
+        ])
+    for ind, (left, right, conditional, points) in enumerate(graph.edges, 1):
+        path, arrow = edge_path(points, NODE_HEIGHT / 2)
+        fill = 'none' if conditional else 'black'
+        lines.extend([
+            f'<g id="edge{ind}" class="edge">',
+            f'<title>{escape(left)}&#45;&gt;{escape(right)}</title>',
+            f'<path fill="none" stroke="black" d="{path}"/>',
+            f'<polygon fill="{fill}" stroke="black" points="'
+            + ' '.join(f'{fmt(x)},{fmt(y)}' for x, y in arrow)
+            + '"/>',
+            '</g>',
+        ])
+    lines.extend(['</g>', '</svg>', ''])
+    return '\n'.join(lines)
+
+
+def render_svg(triggers, size=None):
+    """Lay out a graph and return it as an SVG document.
+
+    Examples:
+        >>> svg = render_svg([('a', 'b', False), (None, 'b', False)])
+        >>> svg.count('class="node"'), svg.count('class="edge"')
+        (2, 1)
+        >>> '<title>a&#45;&gt;b</title>' in svg
+        True
+
+    """
+    return to_svg(layout(triggers), size)
+
+
+def node_count(triggers):
+    """Return the number of nodes in a graph."""
+    return len(get_graph(triggers)[0])
@@ -17,17 +17,73 @@
 # -----------------------------------------------------------------------------
 """Provides the minicylc directive and its associated node as sphinx
 extensions."""
+from hashlib import sha1
+from html import escape
+from pathlib import Path
+import posixpath
 import re
 import types
 
 from docutils import nodes
 from docutils.parsers.rst import directives
 from sphinx.ext.graphviz import (
+    GraphvizError,
     GraphvizSimple,
     graphviz,
-    html_visit_graphviz
+    html_visit_graphviz,
+    render_dot
 )
 from sphinx.directives.code import CodeBlock
+from sphinx.util import logging
+
+from cylc.sphinx_ext.minicylc.cache import (
+    fetch_rendering,
+    store_rendering
+)
+from cylc.sphinx_ext.minicylc.cycling import CyclingError, unroll
+from cylc.sphinx_ext.minicylc.graph import (
+    GraphParseError,
+    get_triggers
+)
+from cylc.sphinx_ext.minicylc.layout import (
+    get_graph,
+    node_count,
+    render_svg
+)
+from cylc.sphinx_ext.minicylc.timeline import simulate, to_json
+
+
+LOG = logging.getLogger(__name__)
+
+
+def dot_id(name):
+    """Return a task name as a dot identifier.
+
+    Examples:
+        >>> dot_id('foo<m=1>[-P1D]')
+        '"foo<m=1>[-P1D]"'
+
+    """
+    return '"%s"' % name.replace('"', '\\"')
+
+
+def inline_svg(svg):
+    """Return SVG markup for inclusion in an HTML page.
+
+    Removes the XML prolog, comments and the ids of groups (which are
+    repeated in each graph).
+
+    Examples:
+        >>> inline_svg(
+        ...     '<?xml version="1.0"?>\\n<!DOCTYPE svg>\\n<!-- x -->\\n'
+        ...     '<svg><g id="node1" class="node"></g></svg>'
+        ... )
+        '<svg><g class="node"></g></svg>'
+
+    """
+    svg = re.sub(r'<\?xml.*?\?>|<!DOCTYPE.*?>|<!--.*?-->', '', svg, flags=re.S)
+    svg = re.sub(r'(<g)\s+id="[^"]*"', r'\1', svg)
+    return svg.strip()
 
 
 class MiniCylc(graphviz):
@@ -81,14 +137,44 @@ class MiniCylc(graphviz):
         # Theme.
         theme = node.get('theme', 'default')
 
-        # Graphing.
-        data = '//'.join(node['graph_lines'])
+        # Animation.
+        data = escape(node['timeline'])
 
         # Construct <div> element.
         builder.body.append(
-            ('<div class="minicylc" style="{0}" data-dependencies="{1}" '
+            ('<div class="minicylc" style="{0}" data-timeline="{1}" '
              'data-theme="{2}" >').format(style, data, theme))
 
+        config = builder.builder.config
+        python_layout = MiniCylc.use_python_layout(config, node)
+
+        # Put the SVG in the page.
+        if (
+            config.graphviz_output_format == 'svg'
+            and config.minicylc_inline_svg
+        ):
+            svg = MiniCylc.get_svg(builder, node, python_layout)
+            if svg is not None:
+                builder.body.append(
+                    '<div class="graphviz">%s</div>\n' % inline_svg(svg)
+                )
+                builder.body.append('</div>')
+                raise nodes.SkipNode
+
+        # Lay out small graphs in Python.
+        if python_layout:
+            MiniCylc.visit_html_layout(builder, node)
+            builder.body.append('</div>')
+            raise nodes.SkipNode
+
+        # Re-use previous renderings of this graph.
+        cached = fetch_rendering(
+            builder.builder,
+            node['code'],
+            node['options'],
+            builder.builder.config.graphviz_output_format
+        )
+
         # Call graphviz html builder.
         try:
             # This method raises nodes.SkipNode in the success and fail case!
@@ -96,8 +182,80 @@ class MiniCylc(graphviz):
         except nodes.SkipNode:
             # Close <div> element (we are not using an exit_html function.
             builder.body.append('</div>')
+            store_rendering(cached)
             raise
 
+    @staticmethod
+    def get_svg(builder, node, python_layout):
+        """Return the SVG markup of the graph.
+
+        Returns None if graphviz cannot render the graph, the graph will
+        then be rendered as normal so the error is reported.
+
+        """
+        if python_layout:
+            return render_svg(node['triggers'], node.get('size'))
+        cached = fetch_rendering(
+            builder.builder,
+            node['code'],
+            node['options'],
+            'svg'
+        )
+        try:
+            _, outfn = render_dot(
+                builder,
+                node['code'],
+                node['options'],
+                'svg'
+            )
+        except GraphvizError:
+            return None
+        if outfn is None:
+            return None
+        store_rendering(cached)
+        return Path(outfn).read_text()
+
+    @staticmethod
+    def use_python_layout(config, node):
+        """Return True if the graph should be laid out without graphviz.
+
+        See the ``minicylc_layout_max_nodes`` configuration.
+
+        """
+        return (
+            config.graphviz_output_format == 'svg'
+            and 'triggers' in node
+            and 0 < node_count(node['triggers'])
+            <= config.minicylc_layout_max_nodes
+        )
+
+    @staticmethod
+    def visit_html_layout(builder, node):
+        """Write the graph as an SVG image using the Python layout.
+
+        The HTML is the same as ``sphinx.ext.graphviz`` writes for SVG.
+
+        """
+        svg = render_svg(node['triggers'], node.get('size'))
+        fname = 'minicylc-%s.svg' % sha1(svg.encode()).hexdigest()
+        outfn = Path(builder.builder.outdir, builder.builder.imagedir, fname)
+        if not outfn.is_file():
+            outfn.parent.mkdir(parents=True, exist_ok=True)
+            outfn.write_text(svg)
+        src = posixpath.join(builder.builder.imgpath, fname)
+        alt = node.get('alt', builder.encode(node['code']).strip())
+        if 'align' in node:
+            builder.body.append('<div align="%s" class="align-%s">' % (
+                node['align'], node['align']))
+        builder.body.append(
+            '<div class="graphviz">'
+            '<object data="%s" type="image/svg+xml" class="graphviz">\n'
+            '<p class="warning">%s</p>'
+            '</object></div>\n' % (src, alt)
+        )
+        if 'align' in node:
+            builder.body.append('</div>\n')
+
 
 class MiniCylcDirective(GraphvizSimple):
     """Implement the ``mini-cylc`` directive for animating Cylc graphs.
@@ -109,50 +267,15 @@ class MiniCylcDirective(GraphvizSimple):
     option_spec['snippet'] = directives.flag
     option_spec['theme'] = directives.unchanged
     option_spec['size'] = directives.unchanged
+    option_spec['cycles'] = directives.positive_int
+    option_spec['recurrence'] = directives.unchanged
     required_arguments = 0  # Arg will be provided in run().
 
-    CONDITIONAL_CHARS = ['&', '|', '(', ')']
-    CONDITIONAL_REGEX = re.compile(r'([()|&])')
-
     @staticmethod
-    def extract_or_deps(dep):
-        """Return a list of tasks which have an OR dependency in a string."""
-        ors = set([])
-        ind = 0
-        while ind < len(dep):
-            if dep[ind] == '|':
-                # Scan backwards.
-                lvl = 0
-                tmp_ind = ind
-                while lvl >= 0 and tmp_ind > 0:
-                    if dep[tmp_ind] == '(':
-                        lvl -= 1
-                    elif dep[tmp_ind] == ')':
-                        lvl += 1
-                    else:
-                        if dep[tmp_ind] not in ['&', '|']:
-                            ors.add(dep[tmp_ind])
-                    tmp_ind -= 1
-                # Scan forwards.
-                lvl = 0
-                tmp_ind = ind
-                while lvl >= 0 and tmp_ind < len(dep):
-                    if dep[tmp_ind] == '(':
-                        lvl += 1
-                    elif dep[tmp_ind] == ')':
-                        lvl -= 1
-                    else:
-                        if dep[tmp_ind] not in ['&', '|']:
-                            ors.add(dep[tmp_ind])
-                    tmp_ind += 1
-            ind += 1
-        return ors
-
-    @classmethod
-    def get_triggers(cls, graph_lines):
-        """Return a set of triggers for the provided graph code.
-
-        Return set of the form (left, right, conditional).
+    def get_triggers(graph_lines):
+        """Return the triggers for the provided graph code.
+
+        Return a list of the form (left, right, conditional).
 
         Examples:
             >>> sorted(
@@ -163,29 +286,10 @@ class MiniCylcDirective(GraphvizSimple):
             ...     ),
             ...     key=str
             ... )
-            [('bar', 'baz', True), ('foo', 'baz', False), (None, 'baz', False)]
+            [('bar', 'baz', True), ('foo', 'baz', True), (None, 'baz', False)]
 
         """
-        trigs = set()
-
-        for line in graph_lines:
-            deps = [[y.strip() for y in cls.CONDITIONAL_REGEX.split(x)]
-                    for x in line.split('=>')]
-            for itt, dep in enumerate(deps):
-                if itt < len(deps) - 1:
-                    ors = cls.extract_or_deps(dep)
-                    # There is a RHS to this dep.
-                    for left in (i for i in dep if i not in
-                                 cls.CONDITIONAL_CHARS):
-                        for right in (i for i in deps[itt + 1] if i not in
-                                      cls.CONDITIONAL_CHARS):
-                            trigs.add((left, right, left in ors))
-                elif len(dep) == 1:
-                    # No dependent task.
-                    for left in (i for i in dep if i not in
-                                 cls.CONDITIONAL_CHARS):
-                        trigs.add((None, left, False))
-        return trigs
+        return get_triggers(graph_lines)
 
     def rationalise_graphing(self):
         """Reduces a graph string to a list of individual dependency
@@ -225,24 +329,62 @@ class MiniCylcDirective(GraphvizSimple):
 
         # Clean up graphing.
         self.rationalise_graphing()
-        clean_graphing = self.content
+        graph = self.content
+        points = None
+        try:
+            if 'cycles' in self.options or 'recurrence' in self.options:
+                points, graph = unroll(
+                    graph,
+                    self.options.get('cycles', 3),
+                    self.options.get('recurrence', 'P1'),
+                    self.config.minicylc_max_unrolled_tasks
+                )
+            triggers = self.get_triggers(graph)
+            tasks = get_graph(triggers)[0]
+            timeline = simulate(graph, tasks)
+        except (CyclingError, GraphParseError) as exc:
+            raise self.error(f'minicylc: {exc}')
+        if timeline.stalled:
+            LOG.warning(
+                'minicylc: the workflow stalls, these tasks never run: '
+                + ', '.join(timeline.stalled),
+                location=(self.env.docname, self.lineno)
+            )
 
         # Generate dotcode for graphviz.
         # dotcode = ['bgcolor=none'] now set in conf.py:graphviz_dot_args
         dotcode = []
         if 'size' in self.options:
             dotcode.append('size="%s"' % self.options['size'])
-        for left, right, conditional in self.get_triggers(self.content):
+        for left, right, conditional in triggers:
             if left:
                 dotcode.append('%s -> %s%s' % (
-                    left, right, ' [arrowhead=o]' if conditional else ''))
+                    dot_id(left),
+                    dot_id(right),
+                    ' [arrowhead=o]' if conditional else ''
+                ))
             else:
-                dotcode.append(right)
+                dotcode.append(dot_id(right))
+        if points:
+            # group the tasks of each cycle point
+            for ind, point in enumerate(points):
+                dotcode.append('subgraph %s {label=%s; %s}' % (
+                    dot_id(f'cluster_{ind}'),
+                    dot_id(point),
+                    ' '.join(
+                        dot_id(task)
+                        for task in tasks
+                        if task.startswith(f'{point}/')
+                    )
+                ))
         self.content = dotcode
 
         # Get MiniCylc node.
         node = MiniCylc.promote_graphviz(GraphvizSimple.run(self)[0])
-        node['graph_lines'] = clean_graphing
+        node['timeline'] = to_json(timeline)
+        node['triggers'] = triggers
+        if 'size' in self.options:
+            node['size'] = self.options['size']
         if 'theme' in self.options:
             node['theme'] = self.options['theme']
         ret.append(node)
@@ -0,0 +1,197 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Render all minicylc graphs in one batch before the write phase.
+
+Otherwise ``sphinx.ext.graphviz`` renders each graph as it is written,
+one ``dot`` process at a time. Here the graphs of the whole project are
+collected as documents are read, then, once reading is complete, the
+missing images are rendered by a pool of concurrent ``dot`` processes.
+Graphs which appear in multiple documents are only rendered once.
+
+The images are written where ``sphinx.ext.graphviz`` looks for them so it
+picks them up when the documents are written.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import shutil
+import subprocess
+
+from sphinx.util import logging
+
+from cylc.sphinx_ext.minicylc.cache import (
+    fetch_rendering,
+    output_files,
+    store_rendering
+)
+from cylc.sphinx_ext.minicylc.minicylc import MiniCylc
+
+
+LOG = logging.getLogger(__name__)
+
+
+def collect_graphs(app, doctree):
+    """Record the graphs in a document (doctree-read handler)."""
+    env = app.env
+    graphs = [
+        (node['code'], node['options'])
+        for node in doctree.findall(MiniCylc)
+        if not MiniCylc.use_python_layout(app.config, node)
+    ]
+    if not hasattr(env, 'minicylc_graphs'):
+        env.minicylc_graphs = {}
+    if graphs:
+        env.minicylc_graphs[env.docname] = graphs
+    else:
+        env.minicylc_graphs.pop(env.docname, None)
+
+
+def purge_graphs(app, env, docname):
+    """Forget the graphs of a document (env-purge-doc handler)."""
+    getattr(env, 'minicylc_graphs', {}).pop(docname, None)
+
+
+def merge_graphs(app, env, docnames, other):
+    """Merge graphs from a parallel read (env-merge-info handler)."""
+    if not hasattr(env, 'minicylc_graphs'):
+        env.minicylc_graphs = {}
+    env.minicylc_graphs.update(
+        (docname, graphs)
+        for docname, graphs in getattr(other, 'minicylc_graphs', {}).items()
+        if docname in docnames
+    )
+
+
+def run_dot(dot, dot_args, code, format, outfns, cwd):
+    """Render a graph the way ``sphinx.ext.graphviz.render_dot`` would.
+
+    Relative links in SVG files are not re-written as minicylc graphs do
+    not contain links.
+
+    Returns:
+        bool - True if the graph was rendered.
+
+    """
+    args = [dot, *dot_args, f'-T{format}', f'-o{outfns[0]}']
+    if format == 'png':
+        args.extend(['-Tcmapx', f'-o{outfns[1]}'])
+    outfns[0].parent.mkdir(parents=True, exist_ok=True)
+    try:
+        subprocess.run(
+            args,
+            input=code.encode(),
+            capture_output=True,
+            cwd=cwd,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        # leave it to sphinx.ext.graphviz to report the problem
+        for outfn in outfns:
+            try:
+                outfn.unlink()
+            except FileNotFoundError:
+                pass
+        return False
+    return outfns[0].is_file()
+
+
+def copy_rendering(src, dest):
+    """Copy the output files of one graph to those of another."""
+    for src_fn, dest_fn in zip(src, dest):
+        shutil.copyfile(src_fn, dest_fn)
+
+
+def render_graphs(app, env):
+    """Render graphs missing from the output (env-updated handler)."""
+    builder = app.builder
+    config = app.config
+    format = config.graphviz_output_format
+    jobs = config.minicylc_render_jobs
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if builder.format != 'html' or format not in ('svg', 'png') or not jobs:
+        return
+
+    # {(code, options): [(options, output_files), ...]}
+    # the docname option only affects the file name, not the rendering
+    batches = {}
+    for graphs in getattr(env, 'minicylc_graphs', {}).values():
+        for code, options in graphs:
+            batch = (
+                code,
+                repr(sorted(
+                    (name, value)
+                    for name, value in options.items()
+                    if name != 'docname'
+                ))
+            )
+            batches.setdefault(batch, []).append(
+                (options, output_files(builder, code, options, format))
+            )
+
+    todo = []
+    for (code, _), graphs in batches.items():
+        missing = [
+            (options, outfns)
+            for options, outfns in graphs
+            if not outfns[0].is_file()
+        ]
+        if not missing:
+            continue
+        done = [outfns for _, outfns in graphs if outfns[0].is_file()]
+        if not done:
+            options, outfns = missing[0]
+            fetch_rendering(builder, code, options, format)
+            if outfns[0].is_file():
+                done.append(outfns)
+        if done:
+            for _, outfns in missing:
+                if outfns != done[0]:
+                    copy_rendering(done[0], outfns)
+        else:
+            todo.append((code, missing))
+
+    if not todo:
+        return
+    LOG.info(
+        f'minicylc: rendering {len(todo)} graph(s)'
+        f' with {min(jobs, len(todo))} dot process(es)'
+    )
+
+    def render(item):
+        code, graphs = item
+        options, outfns = graphs[0]
+        dot = options.get('graphviz_dot', config.graphviz_dot)
+        cwd = Path(builder.srcdir, options.get('docname', 'index')).parent
+        if run_dot(dot, config.graphviz_dot_args, code, format, outfns, cwd):
+            return item
+        return None
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for item in executor.map(render, todo):
+            if item is None:
+                continue
+            code, graphs = item
+            options, outfns = graphs[0]
+            for _, other in graphs[1:]:
+                copy_rendering(outfns, other)
+            store_rendering(
+                fetch_rendering(builder, code, options, format)
+            )
@@ -0,0 +1,78 @@
+from pathlib import Path
+import sys
+from textwrap import dedent
+
+import pytest
+
+from cylc.sphinx_ext.minicylc.cache import graphviz_version
+
+
+FAKE_DOT = '''
+import sys
+with open(sys.argv[0] + '.log', 'a') as log:
+    log.write(' '.join(sys.argv[1:]) + '\\n')
+if '-V' in sys.argv:
+    sys.stderr.write('dot - graphviz version 0.0\\n')
+    sys.exit(0)
+code = sys.stdin.read()
+for arg in sys.argv:
+    if arg.startswith('-o'):
+        with open(arg[2:], 'w') as svg:
+            svg.write(
+                '<svg xmlns="http://www.w3.org/2000/svg">'
+                f'<!-- {len(code)} --></svg>'
+            )
+'''
+
+
+@pytest.fixture
+def fake_dot(tmp_path):
+    """A "dot" executable which logs its calls to "<path>.log"."""
+    path = tmp_path / 'dot'
+    path.write_text(f'#!{sys.executable}\n{FAKE_DOT}')
+    path.chmod(0o755)
+    yield path
+    graphviz_version.cache_clear()
+
+
+@pytest.fixture
+def dot_calls(fake_dot):
+    """Return a function which lists the renderings the fake dot has done.
+    """
+    def _dot_calls():
+        log = Path(f'{fake_dot}.log')
+        if not log.exists():
+            return []
+        return [
+            line
+            for line in log.read_text().splitlines()
+            if line != '-V'
+        ]
+    return _dot_calls
+
+
+@pytest.fixture
+def build(tmp_path, fake_dot, sphinx_build):
+    """Return a function which builds documents in HTML format.
+
+    The documents can be provided as a string (index.rst) or a dict of
+    {docname: rst}, configurations are provided as kwargs. Warnings are
+    written to the ``warning`` stream if provided.
+
+    """
+    def _build(rst, warning=None, **config):
+        if isinstance(rst, str):
+            rst = {'index': rst}
+        files = {
+            f'{docname}.rst': dedent(text)
+            for docname, text in rst.items()
+        }
+        files['conf.py'] = dedent(f'''
+            extensions = ['sphinx.ext.graphviz', 'cylc.sphinx_ext.minicylc']
+            graphviz_output_format = 'svg'
+            graphviz_dot = {str(fake_dot)!r}
+        ''') + ''.join(
+            f'{key} = {value!r}\n' for key, value in config.items()
+        )
+        return sphinx_build(tmp_path, files, warning=warning)
+    return _build
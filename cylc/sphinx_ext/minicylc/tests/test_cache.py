@@ -0,0 +1,80 @@
+import os
+
+from cylc.sphinx_ext.minicylc.cache import RenderCache
+
+
+def test_render_cache(tmp_path, fake_dot, build, dot_calls):
+    """Renderings should be re-used after the output is removed."""
+    cache_dir = tmp_path / 'cache'
+    rst = '''
+        .. minicylc::
+
+           a => b
+
+        .. minicylc::
+
+           a => c
+    '''
+    build(rst, minicylc_cache_dir=str(cache_dir))
+    assert len(dot_calls()) == 2
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # "make clean"
+    for path in (tmp_path / 'out' / '_images').iterdir():
+        path.unlink()
+    build(rst, minicylc_cache_dir=str(cache_dir))
+    assert len(dot_calls()) == 2
+    assert len(list((tmp_path / 'out' / '_images').iterdir())) == 2
+
+
+def test_render_cache_disabled(tmp_path, fake_dot, build, dot_calls):
+    """It should be possible to turn the cache off."""
+    build('''
+        .. minicylc::
+
+           a => b
+    ''', minicylc_cache_dir=None)
+    assert len(dot_calls()) == 1
+    assert (tmp_path / 'out' / '_images').exists()
+
+
+def test_fetch_store(tmp_path):
+    """It should copy renderings into and out of the cache."""
+    cache = RenderCache(tmp_path / 'cache', 1000)
+    outfns = [tmp_path / 'out' / 'x.png', tmp_path / 'out' / 'x.png.map']
+    assert not cache.fetch('key', outfns)
+
+    # nothing to store
+    cache.store('key', outfns)
+    assert not (tmp_path / 'cache').exists()
+
+    outfns[0].parent.mkdir()
+    outfns[0].write_text('png')
+    outfns[1].write_text('map')
+    cache.store('key', outfns)
+    assert sorted(path.name for path in (tmp_path / 'cache').iterdir()) == [
+        'key.png',
+        'key.png.map'
+    ]
+
+    for outfn in outfns:
+        outfn.unlink()
+    assert cache.fetch('key', outfns)
+    assert [outfn.read_text() for outfn in outfns] == ['png', 'map']
+
+
+def test_evict(tmp_path):
+    """It should remove the least recently used entries."""
+    cache = RenderCache(tmp_path, 25)
+    for ind in range(5):
+        path = tmp_path / f'{ind}.svg'
+        path.write_text('x' * 10)
+        os.utime(path, ns=(ind * 10 ** 9, ind * 10 ** 9))
+    # use an old entry
+    cache.fetch('1', [tmp_path / 'out' / 'x.svg'])
+    assert cache.evict() == 3
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        '1.svg', '4.svg', 'out'
+    ]
+    assert cache.evict() == 0
+    assert RenderCache(tmp_path / 'nope', 0).evict() == 0
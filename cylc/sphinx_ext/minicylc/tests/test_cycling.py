@@ -0,0 +1,124 @@
+from io import StringIO
+import json
+import re
+
+import pytest
+
+from cylc.sphinx_ext.minicylc.cycling import (
+    CyclingError,
+    parse_interval,
+    unroll
+)
+from cylc.sphinx_ext.minicylc.graph import get_triggers
+from cylc.sphinx_ext.minicylc.layout import get_graph
+from cylc.sphinx_ext.minicylc.timeline import simulate
+
+
+def edges(lines):
+    return [
+        (left, right)
+        for left, right, _ in get_triggers(lines)
+        if left
+    ]
+
+
+def test_unroll():
+    """It should repeat the graph at each point and resolve offsets."""
+    points, lines = unroll(
+        ['foo[-P1] => foo => bar', 'bar[-P2] | baz => qux', 'foo[^] => pub'],
+        3
+    )
+    assert points == ['1', '2', '3']
+    assert edges(lines) == [
+        ('1/foo', '1/bar'),
+        ('1/baz', '1/qux'),
+        ('1/foo', '1/pub'),
+        ('1/foo', '2/foo'),
+        ('2/foo', '2/bar'),
+        ('2/baz', '2/qux'),
+        ('1/foo', '2/pub'),
+        ('2/foo', '3/foo'),
+        ('3/foo', '3/bar'),
+        ('1/bar', '3/qux'),
+        ('3/baz', '3/qux'),
+        ('1/foo', '3/pub'),
+    ]
+    # dependencies before the first point are satisfied
+    timeline = simulate(lines, get_graph(get_triggers(lines))[0])
+    assert not timeline.stalled
+    first = {timeline.tasks[ind] for ind in timeline.steps[0]}
+    assert first == {'1/foo', '1/qux', '2/qux', '1/baz', '2/baz', '3/baz'}
+
+
+def test_unroll_datetime():
+    """It should support datetime recurrences."""
+    points, lines = unroll(
+        ['foo[-P1D] => foo', 'foo[-PT6H] => bar'],
+        3,
+        'PT12H'
+    )
+    assert points == ['20000101T0000Z', '20000101T1200Z', '20000102T0000Z']
+    # offsets which are not cycle points are taken as satisfied
+    assert edges(lines) == [('20000101T0000Z/foo', '20000102T0000Z/foo')]
+
+
+@pytest.mark.parametrize('interval, expected', [
+    ('P1', (1, False)),
+    ('+P3', (3, False)),
+    ('-P1W', (-604800, True)),
+    ('PT1M30S', (90, True)),
+])
+def test_parse_interval(interval, expected):
+    assert parse_interval(interval) == expected
+
+
+@pytest.mark.parametrize('graph, kwargs, message', [
+    (['a'], {'recurrence': 'P1Y'}, 'Invalid interval "P1Y"'),
+    (['a'], {'recurrence': 'PT'}, 'Invalid interval "PT"'),
+    (['a'], {'recurrence': 'P0'}, 'must be a positive interval'),
+    (['a[-P1D] => a'], {}, 'does not match the recurrence "P1"'),
+    (['a[$] => a'], {}, 'Invalid interval "$"'),
+    (
+        ['a => b => c'],
+        {'max_tasks': 10},
+        'would create 12 tasks, the limit is 10'
+    ),
+])
+def test_unroll_errors(graph, kwargs, message):
+    with pytest.raises(CyclingError, match=re.escape(message)):
+        unroll(graph, 4, **kwargs)
+
+
+def test_build(tmp_path, build):
+    """It should unroll graphs in documents."""
+    warnings = StringIO()
+    build(
+        '''
+        .. minicylc::
+           :cycles: 2
+
+           foo[-P1] => foo => bar
+
+        .. minicylc::
+           :cycles: 101
+
+           foo[-P1] => foo => bar
+        ''',
+        warning=warnings,
+        minicylc_cache_dir=None,
+        minicylc_inline_svg=True,
+        minicylc_layout_max_nodes=10
+    )
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    data = re.search(r'data-timeline="([^"]*)"', html).group(1)
+    timeline = json.loads(data.replace('&quot;', '"'))
+    assert timeline == {
+        'tasks': ['1/foo', '1/bar', '2/foo', '2/bar'],
+        'steps': [[0], [1, 2], [3], []],
+    }
+    assert '<title>1/foo&#45;&gt;2/foo</title>' in html
+    # the large graph was rejected
+    assert html.count('class="minicylc"') == 1
+    assert (
+        'would create 202 tasks, the limit is 200' in warnings.getvalue()
+    )
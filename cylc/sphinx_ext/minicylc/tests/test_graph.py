@@ -0,0 +1,142 @@
+import pytest
+
+from cylc.sphinx_ext.minicylc.graph import (
+    And,
+    GraphParseError,
+    Or,
+    Task,
+    XTrigger,
+    get_triggers,
+    parse
+)
+
+
+def task(name, offset=None, output=None, optional=False, suicide=False):
+    return Task(name, offset, output, optional, suicide)
+
+
+@pytest.mark.parametrize('line, expected', [
+    pytest.param(
+        'foo',
+        [task('foo')],
+        id='single-task'
+    ),
+    pytest.param(
+        'a => b => c',
+        [task('a'), task('b'), task('c')],
+        id='chain'
+    ),
+    pytest.param(
+        'a | b & c => d',
+        [Or((task('a'), And((task('b'), task('c'))))), task('d')],
+        id='precedence'
+    ),
+    pytest.param(
+        '((a | b) & (c | (d & e))) => f',
+        [
+            And((
+                Or((task('a'), task('b'))),
+                Or((task('c'), And((task('d'), task('e')))))
+            )),
+            task('f')
+        ],
+        id='nested'
+    ),
+    pytest.param(
+        'foo:fail? => bar?',
+        [
+            task('foo', output='fail', optional=True),
+            task('bar', optional=True)
+        ],
+        id='qualifiers'
+    ),
+    pytest.param(
+        '@wall_clock => foo<m=1>',
+        [XTrigger('@wall_clock'), task('foo<m=1>')],
+        id='xtrigger-and-parameters'
+    ),
+    pytest.param(
+        'foo[-P1D] => foo & <a::b>',
+        [task('foo', offset='-P1D'), And((task('foo'), task('<a::b>')))],
+        id='offset-and-inter-workflow'
+    ),
+    pytest.param(
+        'foo:fail => !bar  # comment',
+        [task('foo', output='fail'), task('bar', suicide=True)],
+        id='suicide-and-comment'
+    ),
+    pytest.param(
+        '   ',
+        [],
+        id='blank'
+    ),
+])
+def test_parse(line, expected):
+    """It should parse graph lines into expressions."""
+    assert parse(line) == expected
+
+
+@pytest.mark.parametrize('line, message', [
+    ('a => $', 'Invalid character "$" at column 6'),
+    ('a & => b', 'Expected a task at column 5'),
+    ('(a | b => c', 'Expected "close" at column 8'),
+    ('a b => c', 'Unexpected "b" at column 3'),
+    ('a => b | c', 'The right hand side of a dependency'),
+    ('a => (b | c) & d', 'The right hand side of a dependency'),
+])
+def test_parse_errors(line, message):
+    """It should report where graph lines are invalid."""
+    with pytest.raises(GraphParseError) as exc_ctx:
+        parse(line)
+    assert message in str(exc_ctx.value)
+
+
+def test_get_triggers():
+    """It should find edges and mark those from conditional expressions."""
+    assert set(get_triggers([
+        'foo | bar => baz',
+        '(a & b) | c => d => !e',
+        'a & (b | c:fail?) => f',
+        '@wall_clock => g',
+        'h[-P1D] => h',
+    ])) == {
+        # "foo" was missed by the old backward scan
+        ('foo', 'baz', True),
+        ('bar', 'baz', True),
+        (None, 'baz', False),
+        ('a', 'd', True),
+        ('b', 'd', True),
+        ('c', 'd', True),
+        # "d" only triggers a suicide
+        (None, 'd', False),
+        ('a', 'f', False),
+        ('b', 'f', True),
+        ('c', 'f', True),
+        (None, 'f', False),
+        (None, 'g', False),
+        ('h[-P1D]', 'h', False),
+        (None, 'h', False),
+    }
+
+
+def test_get_triggers_order():
+    """It should list edges in the order they appear in the graph."""
+    lines = ['c => b', 'b | a => d', 'c => b & e']
+    assert get_triggers(lines) == [
+        ('c', 'b', False),
+        (None, 'b', False),
+        ('b', 'd', True),
+        ('a', 'd', True),
+        (None, 'd', False),
+        ('c', 'e', False),
+        (None, 'e', False),
+    ]
+
+
+def test_linear():
+    """It should handle long expressions without quadratic behaviour."""
+    names = [f't{ind}' for ind in range(20000)]
+    line = ' | '.join(names) + ' => end'
+    triggers = get_triggers([line])
+    assert len(triggers) == len(names) + 1
+    assert all(conditional for left, _, conditional in triggers if left)
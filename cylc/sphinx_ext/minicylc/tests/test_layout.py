@@ -0,0 +1,130 @@
+from xml.etree import ElementTree
+
+import pytest
+
+from cylc.sphinx_ext.minicylc.graph import get_triggers
+from cylc.sphinx_ext.minicylc.layout import (
+    NODE_SEP,
+    count_crossings,
+    layout,
+    render_svg
+)
+
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+@pytest.mark.parametrize('graph', [
+    pytest.param(['a => b => c'], id='chain'),
+    pytest.param(['a => b & c', 'b & c => d'], id='diamond'),
+    pytest.param(['a => b => c => d', 'a => d', 'b => e'], id='long-edge'),
+    pytest.param(['a => b => c => a'], id='cycle'),
+    pytest.param(['a => a', 'b'], id='self-edge'),
+    pytest.param(
+        ['foo[-P1D] => foo => bar', 'bar | baz => qux', '@x => pub'],
+        id='cylc-features'
+    ),
+])
+def test_layout(graph):
+    """It should place nodes in layers without overlaps."""
+    triggers = get_triggers(graph)
+    result = layout(triggers)
+    nodes = result.nodes
+
+    # every edge goes between layers (except in cycles)
+    for left, right, _, points in result.edges:
+        assert points[0] == nodes[left][:2]
+        assert points[-1] == nodes[right][:2]
+        ys = [y for _, y in points]
+        assert ys == sorted(ys) or ys == sorted(ys, reverse=True)
+        assert len(set(ys)) == len(ys)
+
+    # nodes in the same layer do not overlap
+    rows = {}
+    for x, y, rx, _ in nodes.values():
+        rows.setdefault(y, []).append((x - rx, x + rx))
+    for row in rows.values():
+        row.sort()
+        for (_, right), (left, _) in zip(row, row[1:]):
+            assert left - right >= NODE_SEP - 1e-6
+
+    # everything is within the graph
+    for x, y, rx, ry in nodes.values():
+        assert 0 < x - rx and x + rx < result.width
+        assert 0 < y - ry and y + ry < result.height
+
+
+def test_long_edges():
+    """Edges spanning multiple layers should be routed via dummy nodes."""
+    result = layout(get_triggers(['a => b => c => d', 'a => d']))
+    edges = {(left, right): points for left, right, _, points in result.edges}
+    assert len(edges[('a', 'b')]) == 2
+    assert len(edges[('a', 'd')]) == 4
+
+
+def test_crossings():
+    """It should reorder nodes to remove crossings."""
+    graph = ['a => d', 'b => c', 'a => x', 'b => y']
+    result = layout(get_triggers(graph))
+    rows = {}
+    for name, (x, y, _, _) in result.nodes.items():
+        rows.setdefault(y, []).append((x, name))
+    rows = [
+        [name for _, name in sorted(row)]
+        for _, row in sorted(rows.items())
+    ]
+    succs = {'a': ['d', 'x'], 'b': ['c', 'y']}
+    assert count_crossings(rows, succs) == 0
+
+
+def test_svg():
+    """It should write SVG in the structure minicylc.js expects."""
+    svg = render_svg(get_triggers(['a | b => c-d', 'c-d => e']), '1,1')
+    root = ElementTree.fromstring(svg)
+    groups = {}
+    for group in root.iter(f'{SVG}g'):
+        groups.setdefault(group.get('class'), []).append(group)
+
+    def first_line(element):
+        # as minicylc.js finds the name of a node or edge
+        return ''.join(element.itertext()).strip().split('\n')[0]
+
+    assert [first_line(node) for node in groups['node']] == [
+        'a', 'c-d', 'b', 'e'
+    ]
+    assert [first_line(edge) for edge in groups['edge']] == [
+        'a->c-d', 'b->c-d', 'c-d->e'
+    ]
+    for node in groups['node']:
+        assert node.find(f'{SVG}ellipse') is not None
+
+    # conditional edges have open arrowheads
+    assert [
+        edge.find(f'{SVG}polygon').get('fill')
+        for edge in groups['edge']
+    ] == ['none', 'none', 'black']
+
+    # the size option scales the graph down
+    assert root.get('width') == '72pt' or root.get('height') == '72pt'
+
+
+def test_build(tmp_path, build, dot_calls):
+    """Small graphs should be laid out without graphviz."""
+    build('''
+        .. minicylc::
+
+           a => b
+
+        .. minicylc::
+
+           a => b => c => d
+    ''', minicylc_cache_dir=None, minicylc_layout_max_nodes=3)
+    # only the larger graph was rendered by graphviz
+    assert len(dot_calls()) == 1
+    images = sorted(
+        path.name for path in (tmp_path / 'out' / '_images').iterdir()
+    )
+    assert len(images) == 2
+    assert images[1].startswith('minicylc-')
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    assert f'<object data="_images/{images[1]}"' in html
@@ -0,0 +1,35 @@
+GRAPHS = '''
+    .. minicylc::
+
+       a => b
+
+    .. minicylc::
+
+       a => b => c => d
+'''
+
+
+def test_inline_svg(tmp_path, build, dot_calls):
+    """It should write the SVG into the page."""
+    build(
+        GRAPHS,
+        minicylc_cache_dir=None,
+        minicylc_inline_svg=True,
+        minicylc_layout_max_nodes=3
+    )
+    # only the larger graph was rendered by graphviz
+    assert len(dot_calls()) == 1
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    assert '<object' not in html
+    assert html.count('<div class="graphviz"><svg') == 2
+    assert '<?xml' not in html
+    assert '<!--' not in html
+    assert ' id="node' not in html
+
+
+def test_inline_svg_off(tmp_path, build):
+    """Graphs should be loaded from files by default."""
+    build(GRAPHS, minicylc_cache_dir=None)
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    assert html.count('<object') == 2
+    assert '<svg' not in html
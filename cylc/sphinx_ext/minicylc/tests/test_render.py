@@ -0,0 +1,65 @@
+DOCS = {
+    'index': '''
+        .. toctree::
+
+           a
+           b
+
+        .. minicylc::
+
+           x => y
+    ''',
+    'a': '''
+        a
+        =
+
+        .. minicylc::
+
+           x => y
+
+        .. minicylc::
+
+           x => z
+    ''',
+    'b': '''
+        b
+        =
+
+        .. minicylc::
+
+           x => y
+    '''
+}
+
+
+def test_render_graphs(tmp_path, build, dot_calls):
+    """It should render each graph once before the write phase."""
+    app = build(DOCS, minicylc_cache_dir=None)
+    # there are four graphs but only two are different
+    assert len(dot_calls()) == 2
+    images = sorted((tmp_path / 'out' / '_images').iterdir())
+    assert len(images) == 4
+    for docname in DOCS:
+        html = (tmp_path / 'out' / f'{docname}.html').read_text()
+        assert html.count('<div class="minicylc"') == (
+            2 if docname == 'a' else 1
+        )
+    assert set(app.env.minicylc_graphs) == {'index', 'a', 'b'}
+
+
+def test_render_graphs_disabled(tmp_path, build, dot_calls):
+    """It should be possible to render graphs as they are written."""
+    build(DOCS, minicylc_cache_dir=None, minicylc_render_jobs=0)
+    assert len(dot_calls()) == 4
+
+
+def test_render_graphs_cache(tmp_path, build, dot_calls):
+    """It should take renderings from the cache."""
+    cache_dir = str(tmp_path / 'cache')
+    build(DOCS, minicylc_cache_dir=cache_dir)
+    assert len(dot_calls()) == 2
+    for path in (tmp_path / 'out' / '_images').iterdir():
+        path.unlink()
+    build(DOCS, minicylc_cache_dir=cache_dir)
+    assert len(dot_calls()) == 2
+    assert len(list((tmp_path / 'out' / '_images').iterdir())) == 4
@@ -0,0 +1,196 @@
+from io import StringIO
+import json
+import random
+import re
+
+import pytest
+
+from cylc.sphinx_ext.minicylc.graph import (
+    And,
+    Task,
+    XTrigger,
+    get_triggers,
+    task_id
+)
+from cylc.sphinx_ext.minicylc.layout import get_graph
+from cylc.sphinx_ext.minicylc.timeline import (
+    Conditions,
+    get_conditions,
+    simulate
+)
+
+
+def run(graph):
+    """Return the names of the tasks which start at each step."""
+    timeline = simulate(graph, get_graph(get_triggers(graph))[0])
+    return (
+        [
+            sorted(timeline.tasks[ind] for ind in step)
+            for step in timeline.steps
+        ],
+        timeline.stalled
+    )
+
+
+@pytest.mark.parametrize('graph, steps, stalled', [
+    pytest.param(
+        ['a => b => c'],
+        [['a'], ['b'], ['c'], []],
+        [],
+        id='chain'
+    ),
+    pytest.param(
+        ['a => b & c', 'b & c => d'],
+        [['a'], ['b', 'c'], ['d'], []],
+        [],
+        id='and'
+    ),
+    pytest.param(
+        ['a => b => c', 'a | c => d'],
+        [['a'], ['b', 'd'], ['c'], []],
+        [],
+        id='or'
+    ),
+    pytest.param(
+        ['a:fail? => b?', '@x => c', '(@x | a) & b => d & !e'],
+        [['a', 'c'], ['b'], ['d'], []],
+        [],
+        id='qualifiers'
+    ),
+    pytest.param(
+        ['foo[-P1D] => foo => bar'],
+        [['foo[-P1D]'], ['foo'], ['bar'], []],
+        [],
+        id='intercycle'
+    ),
+    pytest.param(
+        ['a => b => c => b', 'a => d'],
+        [['a'], ['d'], []],
+        ['b', 'c'],
+        id='stall'
+    ),
+])
+def test_simulate(graph, steps, stalled):
+    """It should simulate the animation."""
+    assert run(graph) == (steps, stalled)
+
+
+def satisfied(expr, succeeded):
+    if isinstance(expr, Task):
+        return task_id(expr) in succeeded
+    if isinstance(expr, XTrigger):
+        return True
+    if isinstance(expr, And):
+        return all(satisfied(item, succeeded) for item in expr.items)
+    return any(satisfied(item, succeeded) for item in expr.items)
+
+
+def simulate_naive(graph, tasks):
+    """Simulate by evaluating every waiting task at every step."""
+    conditions = get_conditions(graph)
+    waiting = list(tasks)
+    running = []
+    succeeded = set()
+    steps = []
+    while True:
+        succeeded.update(running)
+        started = [
+            task
+            for task in waiting
+            if all(satisfied(expr, succeeded) for expr in conditions.get(
+                task, []
+            ))
+        ]
+        if not started and not running:
+            break
+        waiting = [task for task in waiting if task not in started]
+        steps.append(sorted(tasks.index(task) for task in started))
+        running = started
+    return steps, waiting
+
+
+def test_simulate_random():
+    """It should match a naive simulation."""
+    rand = random.Random(1)
+    for _ in range(200):
+        names = [f't{ind}' for ind in range(rand.randint(2, 12))]
+        graph = []
+        for _ in range(rand.randint(1, 12)):
+            left = ''
+            for ind in range(rand.randint(1, 4)):
+                if ind:
+                    left += rand.choice([' & ', ' | '])
+                left += rand.choice(names + ['@x'])
+            if rand.random() < 0.3:
+                left = f'({left}) & {rand.choice(names)}'
+            graph.append(f'{left} => {rand.choice(names)}')
+        tasks = get_graph(get_triggers(graph))[0]
+        timeline = simulate(graph, tasks)
+        assert (timeline.steps, timeline.stalled) == simulate_naive(
+            graph, tasks
+        ), graph
+
+
+def test_linear(monkeypatch):
+    """The work should be proportional to the size of the graph."""
+    decrements = []
+
+    class CountingList(list):
+        # counts gate decrements in Conditions.succeed
+        def __setitem__(self, key, value):
+            decrements.append(key)
+            super().__setitem__(key, value)
+
+    original_init = Conditions.__init__
+
+    def init(self, conditions):
+        original_init(self, conditions)
+        self.remaining = CountingList(self.remaining)
+
+    monkeypatch.setattr(Conditions, '__init__', init)
+
+    def work(length):
+        # every task waits on all of the tasks before it via an "|" chain
+        graph = [
+            ' | '.join(f't{left}' for left in range(ind)) + f' => t{ind}'
+            for ind in range(1, length)
+        ]
+        decrements.clear()
+        nodes, edges = get_graph(get_triggers(graph))
+        timeline = simulate(graph, nodes)
+        assert not timeline.stalled
+        return len(decrements), len(edges)
+
+    for length in (20, 40, 80):
+        count, edges = work(length)
+        # each edge decrements its gate once, which may satisfy the gate
+        # and decrement its parent once
+        assert edges <= count <= 2 * edges
+
+
+def test_build(tmp_path, build):
+    """It should write the timeline into the page and report stalls."""
+    warnings = StringIO()
+    build('''
+        .. minicylc::
+
+           a => b
+
+        .. minicylc::
+
+           a => b => a
+    ''', warning=warnings, minicylc_cache_dir=None)
+    html = (tmp_path / 'out' / 'index.html').read_text()
+    timelines = [
+        json.loads(data.replace('&quot;', '"'))
+        for data in re.findall(r'data-timeline="([^"]*)"', html)
+    ]
+    assert timelines == [
+        {'tasks': ['a', 'b'], 'steps': [[0], [1], []]},
+        {'tasks': ['a', 'b'], 'steps': [], 'stalled': True},
+    ]
+    assert (
+        'minicylc: the workflow stalls, these tasks never run: a, b'
+        in warnings.getvalue()
+    )
+    assert warnings.getvalue().count('stalls') == 1
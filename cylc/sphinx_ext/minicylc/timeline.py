@@ -0,0 +1,231 @@
+# -----------------------------------------------------------------------------
+# THIS FILE IS PART OF THE CYLC WORKFLOW ENGINE.
+# Copyright (C) NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Simulate the minicylc animation at build time.
+
+The animation runs in steps, at each step the running tasks succeed and
+the waiting tasks whose dependencies are satisfied start running. Every
+task succeeds, xtriggers are taken as satisfied.
+
+The result is written into the page as JSON::
+
+   {"tasks": ["a", "b"], "steps": [[0], [1], []]}
+
+Where ``steps`` lists the tasks (by index) which start running at each
+step (the tasks which were running succeed). If the workflow stalls,
+``"stalled": true`` is added and the animation stops at the last step,
+otherwise it starts again from the beginning.
+
+"""
+
+from collections import namedtuple
+import json
+
+from cylc.sphinx_ext.minicylc.graph import (
+    And,
+    Task,
+    XTrigger,
+    iter_tasks,
+    parse_lines,
+    task_id
+)
+
+
+Timeline = namedtuple(
+    'Timeline',
+    [
+        # the task names
+        'tasks',
+        # the indices of the tasks which start running at each step
+        'steps',
+        # the names of the tasks which never run
+        'stalled'
+    ]
+)
+
+
+def get_conditions(graph_lines):
+    """Return the expressions each task depends on.
+
+    Returns:
+        dict - {task: [expr, ...]}, a task may run once all of its
+        expressions are satisfied.
+
+    Examples:
+        >>> conditions = get_conditions(['a => b => c', 'x => c & !y'])
+        >>> {task: len(exprs) for task, exprs in conditions.items()}
+        {'b': 1, 'c': 2}
+
+    """
+    conditions = {}
+    for exprs in parse_lines(graph_lines):
+        for left, right in zip(exprs, exprs[1:]):
+            for task, _ in iter_tasks(right):
+                if not task.suicide:
+                    conditions.setdefault(task_id(task), []).append(left)
+    return conditions
+
+
+class Conditions:
+    """The dependencies of a graph compiled into a network of counters.
+
+    Each ``&`` / ``|`` expression becomes a gate which counts down the
+    inputs it still needs (all for ``&``, one for ``|``), each task has a
+    gate which counts down its expressions. When a task succeeds only the
+    gates it feeds are decremented, so the cost of a simulation is
+    proportional to the size of the graph rather than the number of
+    waiting tasks at each step.
+
+    Args:
+        conditions:
+            The output of ``get_conditions``.
+
+    Examples:
+        >>> conds = Conditions(get_conditions(['a & (b | @x) => c']))
+        >>> conds.ready
+        []
+        >>> conds.succeed('a')
+        ['c']
+
+    """
+
+    def __init__(self, conditions):
+        # the number of inputs each gate still needs
+        self.remaining = []
+        # the gate (int) or task (str) each gate feeds
+        self.parents = []
+        # {task: [gate, ...]} the gates fed by each task
+        self.watchers = {}
+        # the tasks which have no unsatisfied dependencies
+        self.ready = []
+        for task, exprs in conditions.items():
+            gate = self._gate(task)
+            self.remaining[gate] = sum(
+                self._add(expr, gate) for expr in exprs
+            )
+            if not self.remaining[gate]:
+                self.ready.append(task)
+
+    def _gate(self, parent):
+        self.remaining.append(0)
+        self.parents.append(parent)
+        return len(self.remaining) - 1
+
+    def _add(self, expr, parent):
+        """Compile an expression which feeds a gate.
+
+        Returns:
+            bool - False if the expression is always satisfied, in which
+            case the parent gate should not wait for it.
+
+        """
+        if isinstance(expr, Task):
+            self.watchers.setdefault(task_id(expr), []).append(parent)
+            return True
+        if isinstance(expr, XTrigger):
+            return False
+        gate = self._gate(parent)
+        counted = [self._add(item, gate) for item in expr.items]
+        if isinstance(expr, And):
+            self.remaining[gate] = sum(counted)
+        elif all(counted):
+            self.remaining[gate] = 1
+        # else an "|" containing an xtrigger, inputs take the gate negative
+        return bool(self.remaining[gate])
+
+    def succeed(self, task):
+        """Mark a task as succeeded.
+
+        Returns:
+            list - The tasks whose dependencies became satisfied.
+
+        """
+        ready = []
+        for gate in self.watchers.get(task, []):
+            while True:
+                self.remaining[gate] -= 1
+                if self.remaining[gate]:
+                    # not satisfied yet (or satisfied already)
+                    break
+                gate = self.parents[gate]
+                if isinstance(gate, str):
+                    ready.append(gate)
+                    break
+        return ready
+
+
+def simulate(graph_lines, tasks):
+    """Run the animation.
+
+    Args:
+        graph_lines:
+            The graph.
+        tasks:
+            The names of the tasks in the graph.
+
+    Returns:
+        Timeline
+
+    Examples:
+        >>> simulate(['a => b'], ['a', 'b'])
+        Timeline(tasks=['a', 'b'], steps=[[0], [1], []], stalled=[])
+        >>> simulate(['a => b & c', 'c => b'], ['a', 'b', 'c'])
+        Timeline(tasks=['a', 'b', 'c'], steps=[[0], [2], [1], []], stalled=[])
+        >>> simulate(['a => b => c => b'], ['a', 'b', 'c'])
+        Timeline(tasks=['a', 'b', 'c'], steps=[[0], []], stalled=['b', 'c'])
+
+    """
+    conditions = get_conditions(graph_lines)
+    index = {task: ind for ind, task in enumerate(tasks)}
+    compiled = Conditions(conditions)
+    waiting = set(tasks)
+    started = {task for task in tasks if task not in conditions}
+    started.update(task for task in compiled.ready if task in waiting)
+    running = set()
+    steps = []
+    while True:
+        # the running tasks succeed
+        for task in running:
+            started.update(
+                ready
+                for ready in compiled.succeed(task)
+                if ready in waiting
+            )
+        if not started and not running:
+            break
+        waiting.difference_update(started)
+        steps.append(sorted(index[task] for task in started))
+        running, started = started, set()
+    return Timeline(
+        list(tasks),
+        steps,
+        [task for task in tasks if task in waiting]
+    )
+
+
+def to_json(timeline):
+    """Return the timeline in the form ``minicylc.js`` reads.
+
+    Examples:
+        >>> to_json(simulate(['a => b'], ['a', 'b']))
+        '{"tasks":["a","b"],"steps":[[0],[1],[]]}'
+
+    """
+    data = {'tasks': timeline.tasks, 'steps': timeline.steps}
+    if timeline.stalled:
+        data['stalled'] = True
+    return json.dumps(data, separators=(',', ':'))